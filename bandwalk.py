@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 from decimal import Decimal, getcontext
 import warnings
+from fund_store import open_default_store
 warnings.filterwarnings('ignore')
 
 # 精度設定
@@ -33,11 +34,17 @@ def colored_print(text, color=Colors.WHITE):
     """色付きprint"""
     print(f"{color}{text}{Colors.END}")
 
-def load_and_prepare_data(filename, fund_title):
-    """CSVファイルを読み込んで前処理を行う"""
+def load_and_prepare_data(filename, fund_title, fund_id=None):
+    """CSVファイル（環境変数FUND_DB設定時はストア）を読み込んで前処理を行う"""
     try:
-        # CSVファイル読み込み
-        df = pd.read_csv(filename, encoding='utf-8')
+        store = open_default_store() if fund_id else None
+        if store is not None:
+            # ストアから読み込み
+            df = pd.DataFrame(store.read_rows(fund_id))
+            store.close()
+        else:
+            # CSVファイル読み込み
+            df = pd.read_csv(filename, encoding='utf-8')
         
         # 列名を標準化
         df.columns = ['date', 'nav', 'daily_change', 'total_assets']
@@ -329,7 +336,7 @@ def main():
     fund_title = sys.argv[3]
 
     filename = f"{id}_.csv"
-    df = load_and_prepare_data(filename, fund_title)
+    df = load_and_prepare_data(filename, fund_title, fund_id=id)
     
     if df is None:
         return
@@ -3,6 +3,9 @@ import csv
 import math
 from datetime import datetime
 import warnings
+from fund_store import open_default_store
+from sentiment_store import SENTIMENT_SERIES, align_to_trading_days, format_row, open_default_index
+from structured_analysis import BULLISH_THRESHOLD
 warnings.filterwarnings('ignore')
 
 # 定数定義
@@ -98,35 +101,52 @@ def parse_number(value_str):
     except:
         return 0.0
 
-def load_and_prepare_data(filename, fund_title):
-    """CSVファイルを読み込んで前処理を行う"""
+def build_data_rows(rows):
+    """CSV形式の行リスト（年月日, 基準価額, 前日比, 純資産総額）からDataRowのリストを作成"""
+    data = []
+    
+    for row in rows:
+        if len(row) >= 4:
+            date = parse_date(row[0])
+            if date is not None:
+                nav = parse_number(row[1])
+                daily_change = parse_number(row[2])
+                total_assets = parse_number(row[3])
+                
+                data_row = DataRow(date, nav, daily_change, total_assets)
+                data.append(data_row)
+    
+    # 日付順にソート
+    data.sort(key=lambda x: x.date)
+    return data
+
+def read_source_rows(filename, fund_id=None):
+    """時系列の行を読み込む（環境変数FUND_DB設定時はストア、それ以外はCSV）"""
+    store = open_default_store() if fund_id else None
+    if store is not None:
+        try:
+            return store.read_rows(fund_id)
+        finally:
+            store.close()
+    
+    with open(filename, 'r', encoding='utf-8') as file:
+        csv_reader = csv.reader(file)
+        header = next(csv_reader)  # ヘッダー行をスキップ
+        return list(csv_reader)
+
+def print_data_summary(data, fund_title):
+    """ロードしたデータの件数と期間を表示"""
+    colored_print(f"=== {fund_title} ===", Colors.BOLD + Colors.MAGENTA)
+    colored_print(f"データロード完了: {len(data)}日分のデータ", Colors.GREEN)
+    
+    if data:
+        colored_print(f"データ期間: {data[0].date.strftime('%Y/%m/%d')} ～ {data[-1].date.strftime('%Y/%m/%d')}", Colors.BLUE)
+
+def load_and_prepare_data(filename, fund_title, fund_id=None):
+    """CSVファイル（またはストア）を読み込んで前処理を行う"""
     try:
-        data = []
-        
-        with open(filename, 'r', encoding='utf-8') as file:
-            csv_reader = csv.reader(file)
-            header = next(csv_reader)  # ヘッダー行をスキップ
-            
-            for row in csv_reader:
-                if len(row) >= 4:
-                    date = parse_date(row[0])
-                    if date is not None:
-                        nav = parse_number(row[1])
-                        daily_change = parse_number(row[2])
-                        total_assets = parse_number(row[3])
-                        
-                        data_row = DataRow(date, nav, daily_change, total_assets)
-                        data.append(data_row)
-        
-        # 日付順にソート
-        data.sort(key=lambda x: x.date)
-        
-        colored_print(f"=== {fund_title} ===", Colors.BOLD + Colors.MAGENTA)
-        colored_print(f"データロード完了: {len(data)}日分のデータ", Colors.GREEN)
-        
-        if data:
-            colored_print(f"データ期間: {data[0].date.strftime('%Y/%m/%d')} ～ {data[-1].date.strftime('%Y/%m/%d')}", Colors.BLUE)
-        
+        data = build_data_rows(read_source_rows(filename, fund_id))
+        print_data_summary(data, fund_title)
         return data
         
     except Exception as e:
@@ -422,8 +442,41 @@ def get_macd_color(value):
     else:
         return Colors.RED
 
-def analyze_recent_data(data, fund_title, days=15):
-    """過去N日の分析結果を表示"""
+def load_sentiment(data, days):
+    """
+    表示する期間のニュースセンチメント指数をローカルDBから読み込む（ネットワークアクセスなし）
+
+    指数は実行日で保存されているため、align_to_trading_days で基準価額の日付に結合する
+    （前の基準日の翌日〜その基準日に実行した最新の記録。休日に実行した記録は次の基準日に表示）。
+
+    Returns:
+        tuple: (指数の一覧, 基準日 -> 指数) 。DBがない・記録がなければ None
+    """
+    store = open_default_index()
+    if store is None or not data:
+        return None
+    start_idx = max(0, len(data) - days)
+    dates = [row.date.strftime('%Y/%m/%d') for row in data[start_idx:]]
+    # 最初の基準日には前の基準日の翌日以降の記録を結合する
+    since = data[start_idx - 1].date.strftime('%Y/%m/%d') if start_idx > 0 else None
+    series = store.series(SENTIMENT_SERIES or None)
+    index = store.read_range(since, dates[-1])
+    store.close()
+    return (series, align_to_trading_days(index, dates, since)) if series else None
+
+def print_sentiment(sentiment, date_str):
+    """その日のニュースセンチメント指数を表示（記録のない日は「記録なし」と表示し、取得はしない）"""
+    series, index = sentiment
+    print(f"  ニュース: ", end="")
+    parts = format_row(series, index.get(date_str, {}))
+    for i, (text, score) in enumerate(parts):
+        color = (Colors.WHITE if score is None else Colors.GREEN if score >= BULLISH_THRESHOLD
+                 else Colors.RED if score <= -BULLISH_THRESHOLD else Colors.CYAN)
+        end = " / " if i + 1 < len(parts) else "\n"
+        print(f"{color}{text}{Colors.END}", end=end)
+
+def analyze_recent_data(data, fund_title, days=15, sentiment=None):
+    """過去N日の分析結果を表示（sentiment を渡すと日付ごとのニュースセンチメント指数も表示）"""
     colored_print(f"\n=== {fund_title} - 過去{days}日の分析結果 ===", Colors.BOLD + Colors.MAGENTA)
     colored_print(f"MACD設定: 上限閾値={UPPER_THRESHOLD}, 下限閾値={LOWER_THRESHOLD}, 上限クロス率={UPPER_CROSS_RATE*100:.0f}%, 下限クロス率={LOWER_CROSS_RATE*100:.0f}%", Colors.BLUE)
     colored_print("-" * 80, Colors.WHITE)
@@ -468,6 +521,10 @@ def analyze_recent_data(data, fund_title, days=15):
         print(f"価格: {row.nav:,.0f}円 ", end="")
         colored_print(f"(前日比: {row.daily_change:+.0f}円)", change_color)
         
+        # ニュースセンチメント指数（newspickの実行時に保存したもの）
+        if sentiment is not None:
+            print_sentiment(sentiment, date_str)
+        
         # バンド位置表示（色分け）
         if position > 1.0:
             position_color = Colors.RED
@@ -672,6 +729,27 @@ def draw_recent_chart(data, fund_title, days=7):
     
     print()
 
+def set_macd_params(upper_threshold, lower_threshold, upper_cross_rate, lower_cross_rate):
+    """MACDシグナル設定を変更"""
+    global UPPER_THRESHOLD, LOWER_THRESHOLD, UPPER_CROSS_RATE, LOWER_CROSS_RATE
+    UPPER_THRESHOLD = upper_threshold
+    LOWER_THRESHOLD = lower_threshold
+    UPPER_CROSS_RATE = upper_cross_rate
+    LOWER_CROSS_RATE = lower_cross_rate
+
+def run_analysis(data, fund_title):
+    """指標を計算して分析結果とチャートを表示"""
+    # ボリンジャーバンドとMACDの計算
+    data = calculate_indicators(data)
+    
+    # 過去10日の分析（ニュースセンチメント指数があれば日付で結合して表示）
+    analyze_recent_data(data, fund_title, days=100, sentiment=load_sentiment(data, days=100))
+
+    # 7日間のチャート表示を追加
+    draw_recent_chart(data, fund_title, days=25)
+    
+    return data
+
 def main():
     """メイン処理"""
     # 引数チェック
@@ -698,19 +776,12 @@ def main():
     fund_title = sys.argv[3]
 
     filename = f"{id}_.csv"
-    data = load_and_prepare_data(filename, fund_title)
+    data = load_and_prepare_data(filename, fund_title, fund_id=id)
     
     if data is None:
         return
     
-    # ボリンジャーバンドとMACDの計算
-    data = calculate_indicators(data)
-    
-    # 過去10日の分析
-    analyze_recent_data(data, fund_title, days=100)
-
-    # 7日間のチャート表示を追加
-    draw_recent_chart(data, fund_title, days=25)
+    run_analysis(data, fund_title)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,1356 @@
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(REPO_DIR, 'fixtures')
+
+# 負荷計測で使う (アナライザー, 分析タイプ, クエリ)
+LOAD_QUERIES = [
+    ('china', 'global', "US economy news"),
+    ('spac', 'us_economy', "Federal Reserve interest rate decision"),
+    ('china', 'china', "China economy news"),
+    ('spac', 'msci_acwi', "MSCI ACWI"),
+    ('spac', 'sp500', "S&P 500"),
+    ('china', 'global', "US China trade deal"),
+    ('spac', 'us_economy', "US employment jobs report"),
+    ('china', 'china', "Chinese stock market news"),
+    ('spac', 'msci_acwi', "MSCI ACWI price target forecast"),
+    ('spac', 'sp500', "S&P 500 price target forecast"),
+]
+
+
+def load_fixture(*parts, mode='rb'):
+    """fixtures配下のファイルを読み込む"""
+    encoding = None if 'b' in mode else 'utf-8'
+    with open(os.path.join(FIXTURE_DIR, *parts), mode, encoding=encoding) as f:
+        return f.read()
+
+
+def bench_parser(args):
+    """
+    時系列テーブルのパーサーをバックエンド別に計測し、結果の一致を検証する
+
+    Returns:
+        int: 終了コード（不一致があれば1）
+    """
+    from fund_parser import PARSER_BACKENDS, HAS_LXML
+
+    pages = sorted(glob.glob(os.path.join(FIXTURE_DIR, 'yahoo', '*_history_p*.html')))
+    if not pages:
+        print("フィクスチャが見つかりません")
+        return 1
+
+    print(f"lxml: {'あり' if HAS_LXML else 'なし（strainer方式）'} / 反復回数: {args.repeat}")
+    totals = {name: 0.0 for name in PARSER_BACKENDS}
+    mismatches = 0
+
+    for path in pages:
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        results = {}
+        timings = {}
+        for name, parse in PARSER_BACKENDS.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results[name] = parse(content)
+            timings[name] = (time.perf_counter() - start) / args.repeat
+            totals[name] += timings[name]
+
+        same = results['fast'] == results['bs4']
+        if not same:
+            mismatches += 1
+        rows = len(results['bs4'] or [])
+        detail = ", ".join(f"{name}={sec * 1000:.2f}ms" for name, sec in timings.items())
+        print(f"{os.path.basename(path)}: {rows}行 {detail} {'一致' if same else '不一致!'}")
+
+    print("\n平均解析時間（1ページあたり）:")
+    for name, total in totals.items():
+        print(f"  {name}: {total / len(pages) * 1000:.2f}ms")
+    print(f"  速度比: {totals['bs4'] / totals['fast']:.1f}倍")
+
+    return 1 if mismatches else 0
+
+
+def read_csv_rows(path):
+    """CSVのデータ行を読み込む（ヘッダー除く）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.reader(f))[1:]
+
+
+def bench_backfill(args):
+    """
+    スタンドインサーバーのページ送りに対してバックフィルを実行し、結果を検証する
+
+    既存CSVの末尾を削って欠損期間を作り、同時取得数ごとの所要時間を計測する。
+
+    Returns:
+        int: 終了コード（検証失敗があれば1）
+    """
+    import requests
+    import update
+    from fund_parser import parse_table_fast
+    from standin_server import start_server
+
+    fund_id = args.fund_id
+    original = read_csv_rows(os.path.join(REPO_DIR, f"{fund_id}_.csv"))
+
+    # 期待値: 元のCSV + フィクスチャにある新しい日付の行
+    fixture_rows = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'yahoo', f'{fund_id}_history_p*.html'))):
+        for cell_texts in parse_table_fast(load_fixture('yahoo', os.path.basename(path))) or []:
+            row = update.convert_cell_row(cell_texts)
+            if row:
+                fixture_rows[row[0]] = row
+    known = {row[0] for row in original}
+    expected = original + sorted((row for row in fixture_rows.values() if row[0] not in known), key=lambda r: r[0])
+
+    server = start_server(latency=args.latency)
+    update.YAHOO_BASE_URL = server.base_url
+    failures = 0
+    cwd = os.getcwd()
+    try:
+        for workers in args.workers:
+            work_dir = tempfile.mkdtemp(prefix='backfill_')
+            try:
+                os.chdir(work_dir)
+                with open(f"{fund_id}_.csv", 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(update.CSV_HEADER)
+                    writer.writerows(original[:len(original) - args.gap_rows])
+
+                server.reset_counts()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    added = update.backfill_fund_data(fund_id, max_workers=workers)
+                elapsed = time.perf_counter() - start
+
+                result = read_csv_rows(f"{fund_id}_.csv")
+                ok = result == expected
+                failures += 0 if ok else 1
+                requests_made = sum(server.request_counts.values())
+                print(f"同時取得{workers}: {elapsed:.2f}秒 追加{added}件 リクエスト{requests_made}件 {'一致' if ok else '不一致!'}")
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        # 2ページ目の取得に失敗した場合は保存せず、再実行で欠損期間がすべて埋まること
+        work_dir = tempfile.mkdtemp(prefix='backfill_')
+        fetch_history_page = update.fetch_history_page
+        try:
+            os.chdir(work_dir)
+            with open(f"{fund_id}_.csv", 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(update.CSV_HEADER)
+                writer.writerows(original[:len(original) - args.gap_rows])
+            before = read_csv_rows(f"{fund_id}_.csv")
+
+            def failing_fetch(fund_id, page, **kwargs):
+                if page == 2:
+                    raise requests.ConnectionError("計測用の取得エラー")
+                return fetch_history_page(fund_id, page, **kwargs)
+
+            update.fetch_history_page = failing_fetch
+            with contextlib.redirect_stdout(io.StringIO()):
+                failed = update.backfill_fund_data(fund_id, max_workers=max(args.workers))
+            unchanged = read_csv_rows(f"{fund_id}_.csv") == before
+            update.fetch_history_page = fetch_history_page
+            with contextlib.redirect_stdout(io.StringIO()):
+                added = update.backfill_fund_data(fund_id, max_workers=max(args.workers))
+            ok = failed is None and unchanged and read_csv_rows(f"{fund_id}_.csv") == expected
+            failures += 0 if ok else 1
+            print(f"取得エラー: {'保存せず' if failed is None and unchanged else '途中まで保存!'} / "
+                  f"再実行で追加{added}件 {'一致' if ok else '不一致!'}")
+        finally:
+            update.fetch_history_page = fetch_history_page
+            os.chdir(cwd)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return 1 if failures else 0
+
+
+def start_load_server(args):
+    """計測用のスタンドインサーバーを起動し、各モジュールの接続先を向ける"""
+    import http_client
+    from rate_limiter import HostRateLimiter
+    from standin_server import start_server
+
+    server = start_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          rate_429=args.rate_429, retry_after=args.retry_after,
+                          llm_latency=args.llm_latency, llm_ttft=args.llm_ttft,
+                          failing_models=getattr(args, 'failing_models', ()),
+                          model_latency=getattr(args, 'model_latency', None),
+                          llm_tail_rate=getattr(args, 'llm_tail_rate', 0.0),
+                          llm_tail_latency=getattr(args, 'llm_tail_latency', 0.0),
+                          llm_prompt_latency=getattr(args, 'llm_prompt_latency', 0.0), seed=args.seed)
+    # newspickモジュールはimport時に接続先を読むため先に設定する
+    os.environ['GOOGLE_NEWS_BASE_URL'] = server.base_url
+    os.environ['OPENROUTER_BASE_URL'] = server.openrouter_base_url
+    # 学習したレートはファイルに保存しない
+    http_client.SHARED_CLIENT = http_client.HttpClient(limiter=HostRateLimiter(path=None))
+    return server
+
+
+def bench_load(args):
+    """
+    スタンドインサーバーに対してN件のファンド更新とM件のニュース分析を実行し、スループットを計測する
+
+    Returns:
+        int: 終了コード
+    """
+    server = start_load_server(args)
+
+    import update
+    import newspick_china
+    import newspick_spac
+    import http_client
+    from http_cache import ResponseCache
+    from llm_cache import LLMCache
+    from rate_limiter import HostRateLimiter
+
+    update.YAHOO_BASE_URL = server.base_url
+    http_client.SHARED_CLIENT = http_client.HttpClient(limiter=HostRateLimiter(path=None))
+    fund_ids = sorted({os.path.basename(path).split('_')[0]
+                       for path in glob.glob(os.path.join(FIXTURE_DIR, 'yahoo', '*_history_p1.html'))})
+    analyzers = {
+        'china': newspick_china.RealTimeNewsAnalyzer('standin', cache=LLMCache(bypass=True)),
+        'spac': newspick_spac.IndexPredictionAnalyzer('standin', cache=LLMCache(bypass=True)),
+    }
+
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='load_')
+    try:
+        os.chdir(work_dir)
+
+        # 1. ファンド更新
+        server.reset_counts()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.funds):
+                fund_id = fund_ids[i % len(fund_ids)]
+                shutil.copy(os.path.join(REPO_DIR, f"{fund_id}_.csv"), f"{fund_id}_.csv")
+                # 毎回フルに取得・解析させるため、ファンドごとに空のキャッシュを使う
+                update.RESPONSE_CACHE = ResponseCache(cache_dir=os.path.join(work_dir, f'cache_{i}'), ttl=0)
+                update.scrape_fund_data(fund_id)
+        fund_elapsed = time.perf_counter() - start
+        fund_status = dict(server.status_counts)
+
+        # 2. ニュース検索 + LLM分析
+        server.reset_counts()
+        analyzed = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.queries):
+                name, analysis_type, query = LOAD_QUERIES[i % len(LOAD_QUERIES)]
+                analyzer = analyzers[name]
+                news_data = analyzer.search_google_news_single(query, max_results=25)
+                if news_data and analyzer.analyze_news_with_llm(news_data, query, analysis_type):
+                    analyzed += 1
+        query_elapsed = time.perf_counter() - start
+        query_status = dict(server.status_counts)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+        server.server_close()
+
+    print(f"注入設定: 遅延={args.latency}s(+{args.jitter}s) LLM遅延={args.llm_latency}s "
+          f"エラー率={args.error_rate} 429率={args.rate_429}")
+    print(f"ファンド更新: {args.funds}件 {fund_elapsed:.2f}秒 "
+          f"({args.funds / fund_elapsed:.2f}件/秒) ステータス={fund_status}")
+    print(f"ニュース分析: {args.queries}件 (成功{analyzed}件) {query_elapsed:.2f}秒 "
+          f"({args.queries / query_elapsed:.2f}件/秒) ステータス={query_status}")
+    print(f"合計: {fund_elapsed + query_elapsed:.2f}秒")
+    http_client.print_stats()
+    return 0
+
+
+def bench_http(args):
+    """
+    リクエストごとに接続する requests.get と、共有クライアント（keep-alive + 再試行）を比較する
+
+    Returns:
+        int: 終了コード
+    """
+    import requests
+    import http_client
+
+    server = start_load_server(args)
+    urls = [f"{server.base_url}/quote/03311187/history", f"{server.base_url}/search?q=US+economy+news"]
+    try:
+        results = {}
+        for name in ('requests.get', 'HttpClient'):
+            client = http_client.HttpClient()
+            server.reset_counts()
+            ok = 0
+            start = time.perf_counter()
+            for i in range(args.requests):
+                url = urls[i % len(urls)]
+                if name == 'requests.get':
+                    response = requests.get(url, headers=http_client.BROWSER_HEADERS, timeout=30)
+                else:
+                    response = client.get(url)
+                ok += response.status_code == 200
+            elapsed = time.perf_counter() - start
+            results[name] = (elapsed, ok, dict(server.status_counts), client.connection_stats(), client.stats)
+            client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"注入設定: 遅延={args.latency}s エラー率={args.error_rate} 429率={args.rate_429}")
+    for name, (elapsed, ok, status, connections, stats) in results.items():
+        line = f"{name}: {args.requests}件 {elapsed:.2f}秒 成功{ok}件 ステータス={status}"
+        if name == 'HttpClient':
+            line += (f" / 新規接続{connections['opened']}件・再利用{connections['reused']}件"
+                     f" / 再試行{stats['retries']}件")
+        else:
+            line += f" / 新規接続{sum(status.values())}件（毎回接続）"
+        print(line)
+    return 0
+
+
+def bench_pipeline(args):
+    """
+    update.py → CSV → bandwalk_core_impl.py の逐次実行と統合パイプラインを比較する
+
+    どちらも取得開始からレポート作成までを計測し、レポート内容が一致することを確認する。
+
+    Returns:
+        int: 終了コード（レポート不一致があれば1）
+    """
+    server = start_load_server(args)
+
+    import update
+    import pipeline
+    import bandwalk_core_impl as core
+    from http_cache import ResponseCache
+
+    update.YAHOO_BASE_URL = server.base_url
+    specs = pipeline.BUNDLED_FUNDS
+
+    def prepare(work_dir):
+        for spec in specs:
+            shutil.copy(os.path.join(REPO_DIR, f"{spec.fund_id}_.csv"), os.path.join(work_dir, f"{spec.fund_id}_.csv"))
+        cache_dir = os.path.join(work_dir, '.http_cache')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        update.RESPONSE_CACHE = ResponseCache(cache_dir=cache_dir, ttl=0)
+
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='pipeline_')
+    try:
+        os.chdir(work_dir)
+
+        # 1. 逐次実行（全ファンドを取得・保存してから、各CSVを読み直して分析）
+        prepare(work_dir)
+        sequential_reports = {}
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for spec in specs:
+                update.scrape_fund_data(spec.fund_id)
+        for spec in specs:
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                core.set_macd_params(spec.upper_threshold, spec.lower_threshold,
+                                     spec.upper_cross_rate, spec.lower_cross_rate)
+                data = core.load_and_prepare_data(f"{spec.fund_id}_.csv", spec.title)
+                core.run_analysis(data, spec.title)
+            sequential_reports[spec.fund_id] = buffer.getvalue()
+        sequential_elapsed = time.perf_counter() - start
+
+        # 2. 統合パイプライン
+        prepare(work_dir)
+        stats = pipeline.run_pipeline(specs, scrape_workers=args.workers, show_report=False)
+        persisted = {spec.fund_id: read_csv_rows(f"{spec.fund_id}_.csv") for spec in specs}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+        server.server_close()
+
+    same = stats['reports'] == sequential_reports
+    print(f"逐次実行（update.py → CSV → bandwalk_core_impl.py）: {sequential_elapsed * 1000:.0f}ms")
+    for fund_id, timing in stats['funds'].items():
+        print(f"  パイプライン {fund_id}: マージ {timing['merged'] * 1000:.0f}ms → レポート {timing['reported'] * 1000:.0f}ms "
+              f"({len(persisted[fund_id])}行保存)")
+    print(f"統合パイプライン（保存完了まで）: {stats['total'] * 1000:.0f}ms")
+    print(f"レポート: {'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+def create_analyzer(name, **options):
+    """スタンドインサーバー向けのアナライザーを作成（モデルのレイテンシ・実行ジャーナル・センチメント指数はファイルに保存しない）"""
+    from model_router import ModelRouter
+
+    options.setdefault('router', ModelRouter(path=None))
+    options.setdefault('journal_dir', None)
+    options.setdefault('sentiment_db', None)
+    if name == 'china':
+        import newspick_china
+        return newspick_china.RealTimeNewsAnalyzer('standin', **options), 'run_realtime_analysis', \
+            ['global_analysis_results', 'china_analysis_results']
+    import newspick_spac
+    return newspick_spac.IndexPredictionAnalyzer('standin', **options), 'run_index_prediction_analysis', \
+        ['us_economy_results', 'msci_acwi_results', 'sp500_results']
+
+
+def bench_news(args):
+    """
+    ニュース分析の逐次実行とパイプライン実行を比較し、カテゴリ別の結果が一致することを確認する
+
+    Returns:
+        int: 終了コード（結果不一致があれば1）
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    results = {}
+    timings = {}
+    dedup_stats = {}
+    try:
+        for mode in ('sequential', 'pipelined'):
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=(mode == 'pipelined'),
+                                                          cache=LLMCache(bypass=True))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            timings[mode] = time.perf_counter() - start
+            results[mode] = {name: getattr(analyzer, name) for name in result_lists}
+            dedup_stats[mode] = analyzer.deduplicator.stats
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # 重複除去の割り当て先はクエリ順で決まるため、統計も一致するはず
+    same = results['sequential'] == results['pipelined'] and dedup_stats['sequential'] == dedup_stats['pipelined']
+    for mode, elapsed in timings.items():
+        counts = ", ".join(f"{name}={len(items)}" for name, items in results[mode].items())
+        print(f"{mode}: {elapsed:.1f}秒 ({counts})")
+    print(f"カテゴリ別結果: {'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+def bench_dedup(args):
+    """
+    重複除去モードごとにLLMへ送ったプロンプトのトークン数を比較する
+
+    Returns:
+        int: 終了コード
+    """
+    from llm_cache import LLMCache
+    from news_dedup import DEDUP_MODES
+
+    server = start_load_server(args)
+    try:
+        for mode in reversed(DEDUP_MODES):
+            analyzer, run, _ = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                               dedup_mode=mode)
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+
+            stats = analyzer.deduplicator.stats
+            llm_requests = server.request_counts.get('/api/v1/chat/completions', 0)
+            print(f"{mode}: {elapsed:.1f}秒 / LLMリクエスト {llm_requests}件 / "
+                  f"プロンプト {server.prompt_tokens}トークン / "
+                  f"重複 完全一致{stats['exact']}件・近似{stats['near']}件 / "
+                  f"参照化{stats['referenced']}件・除外{stats['removed']}件")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+def bench_incremental(args):
+    """
+    差分実行で、新着記事のみがLLMに送られ、新着がなければLLMを呼ばないことを確認する
+
+    1回目は各クエリの先頭の記事を隠して実行し（前回の状態）、2回目は全件、
+    3回目は同じ内容で実行する。比較用に差分なしで全件を分析した場合も計測する。
+    同じクエリを使う別の設定（china:global と spac:us_economy の "US economy news"）が
+    同じDBで互いの分析済み記事を上書きしないこと、構造化（--structured）の実行が自由記述の
+    前回の分析を再利用・差分更新に使わないことも確認する。
+
+    Returns:
+        int: 終了コード（想定と異なれば1）
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    work_dir = tempfile.mkdtemp(prefix='seen_store_')
+    seen_db = os.path.join(work_dir, 'seen_articles.db')
+    counts = {}
+    try:
+        # 構造化: 自由記述の前回の分析が同じDBにあっても使わず全件を分析し、2回目は構造化の分析を再利用する
+        runs = [('前回', True, args.hidden, False), ('新着あり', True, 0, False), ('新着なし', True, 0, False),
+                ('全件(比較)', False, 0, False), ('構造化', True, 0, True), ('構造化・新着なし', True, 0, True)]
+        for name, incremental, hidden, structured in runs:
+            analyzer, run, _ = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                               incremental=incremental, seen_db=seen_db, structured=structured)
+            if hidden:
+                search = analyzer.search_google_news_single
+                analyzer.search_google_news_single = lambda query, max_results=25: search(query, max_results)[hidden:]
+            server.reset_counts()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+
+            # 最終統合分析を除いたクエリ分析のリクエスト数（構造化ではローカル集計のため最終統合分析なし）
+            llm_requests = server.request_counts.get('/api/v1/chat/completions', 0) - (0 if structured else 1)
+            counts[name] = llm_requests
+            line = f"{name}: クエリ分析のLLMリクエスト {llm_requests}件 / プロンプト {server.prompt_tokens}トークン"
+            if analyzer.seen_store is not None:
+                stats = analyzer.seen_store.stats
+                line += (f" / 新着{stats['new']}件・既読{stats['seen']}件 / "
+                         f"全件{stats['full']}・差分{stats['updated']}・再利用{stats['reused']}")
+            if structured:
+                invalid = sum(category['invalid'] for category in analyzer.structured_summary['categories'])
+                counts[name + '・JSON検証失敗'] = invalid
+                line += f" / JSON検証失敗 {invalid}件"
+            print(line)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    ok = (counts['新着なし'] == 0 and counts['新着あり'] == counts['前回']
+          and counts['構造化'] == counts['全件(比較)'] and counts['構造化・新着なし'] == 0
+          and counts['構造化・JSON検証失敗'] == 0 and counts['構造化・新着なし・JSON検証失敗'] == 0)
+    print(f"差分実行: {'想定通り' if ok else '想定と異なる!'}")
+    return 0 if ok and check_seen_scopes() else 1
+
+
+def check_seen_scopes():
+    """
+    同じクエリを使う2つの設定が同じDBで分析済み記事を共有・上書きしないことを確認する
+
+    china が [A, B]、spac が [A, B, C] を全件分析した後、china では C も新着として扱われるはず。
+
+    Returns:
+        bool: 想定通りか
+    """
+    from seen_store import SeenStore
+
+    query = "US economy news"
+    articles = [{'title': f"Article {name}", 'link': f"https://example.com/{name}"} for name in "ABCD"]
+    work_dir = tempfile.mkdtemp(prefix='seen_scope_')
+    db_path = os.path.join(work_dir, 'seen_articles.db')
+    try:
+        china = SeenStore(db_path, 'china')
+        spac = SeenStore(db_path, 'spac')
+        china.save_analysis(query, 'global', "china", articles[:2], full=True)
+        spac.save_analysis(query, 'us_economy', "spac", articles[:3], full=True)
+        new_items, _ = china.split_new(query, 'global', articles)
+        previous, _ = china.previous_analysis(query, 'global')
+        china.close()
+        spac.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    ok = [item['title'] for item in new_items] == ["Article C", "Article D"] and previous == "china"
+    print(f"設定間の分離: {'想定通り' if ok else '想定と異なる!'}（china の新着: "
+          f"{', '.join(item['title'] for item in new_items)}）")
+    return ok
+
+
+class _Interrupted(BaseException):
+    """計測用: 実行の強制終了を模す（分析エラーとして握りつぶされないよう BaseException）"""
+
+
+def bench_resume(args):
+    """
+    途中で中断した実行を再開し、完了済みのクエリの検索・分析を省略して中断なしと同じ結果になることを確認する
+
+    1回目は --interrupt-after 件のクエリ分析の後に中断し、2回目は再開、3回目は全クエリ完了後の再開
+    （最終統合分析のみ）とする。
+
+    Returns:
+        int: 終了コード（想定と異なれば1）
+    """
+    from llm_cache import LLMCache
+    from standin_server import NEWS_SEARCH_PATH
+
+    server = start_load_server(args)
+    journal_dir = tempfile.mkdtemp(prefix='run_journal_')
+    results = {}
+    counts = {}
+    try:
+        runs = [('中断なし(比較)', None, False, None), ('中断', journal_dir, False, args.interrupt_after),
+                ('再開', journal_dir, True, None), ('完了後に再開', journal_dir, True, None)]
+        for name, directory, resume, interrupt_after in runs:
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=args.pipelined,
+                                                          cache=LLMCache(bypass=True),
+                                                          journal_dir=directory, resume=resume)
+            if interrupt_after is not None:
+                analyze = analyzer.analyze_news
+                done = []
+
+                def interrupted(*call_args, **call_kwargs):
+                    if len(done) >= interrupt_after:
+                        raise _Interrupted()
+                    done.append(None)
+                    return analyze(*call_args, **call_kwargs)
+                analyzer.analyze_news = interrupted
+            server.reset_counts()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    getattr(analyzer, run)()
+            except _Interrupted:
+                analyzer.journal.close()
+            results[name] = {list_name: getattr(analyzer, list_name) for list_name in result_lists}
+            counts[name] = (server.request_counts.get(NEWS_SEARCH_PATH, 0),
+                            server.request_counts.get('/api/v1/chat/completions', 0))
+            line = f"{name}: 検索 {counts[name][0]}件 / LLM {counts[name][1]}件"
+            if analyzer.journal is not None:
+                line += f" / 省略 {analyzer.journal.stats['restored']}件・記録 {analyzer.journal.stats['recorded']}件"
+            print(line)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(journal_dir, ignore_errors=True)
+
+    same = results['再開'] == results['中断なし(比較)'] == results['完了後に再開']
+    searches = counts['中断'][0] + counts['再開'][0]
+    print(f"再開後のカテゴリ別結果: {'一致' if same else '不一致!'}")
+    print(f"検索: 中断+再開 {searches}件（中断なし {counts['中断なし(比較)'][0]}件、"
+          f"中断時に分析待ちだったクエリは再検索） / 完了後の再開 {counts['完了後に再開'][0]}件")
+    ok = same and counts['完了後に再開'][0] == 0
+    return 0 if ok else 1
+
+
+def bench_llm_cache(args):
+    """
+    空のキャッシュで2回実行し、2回目がキャッシュから応答され結果が一致することを確認する
+
+    Returns:
+        int: 終了コード（結果不一致があれば1）
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    cache_dir = tempfile.mkdtemp(prefix='llm_cache_')
+    results = {}
+    try:
+        for run_name in ('cold', 'warm'):
+            cache = LLMCache(cache_dir=cache_dir)
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=True, cache=cache)
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+            results[run_name] = {name: getattr(analyzer, name) for name in result_lists}
+
+            total = cache.stats['hit'] + cache.stats['miss']
+            llm_requests = server.request_counts.get('/api/v1/chat/completions', 0)
+            print(f"{run_name}: {elapsed:.1f}秒 / ヒット {cache.stats['hit']}/{total}件 / "
+                  f"LLMリクエスト {llm_requests}件 / 短縮 {cache.stats['latency_saved']:.1f}秒")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    same = results['cold'] == results['warm']
+    print(f"カテゴリ別結果: {'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+def bench_stream(args):
+    """
+    通常の応答とストリーミング応答で、最初のトークンまでの時間と全体の時間を比較し、
+    組み立てた分析結果が一致することを確認する
+
+    Returns:
+        int: 終了コード（結果不一致があれば1）
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    results = {}
+    try:
+        for mode in ('normal', 'stream'):
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                                          stream=(mode == 'stream'))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+            results[mode] = {name: getattr(analyzer, name) for name in result_lists}
+
+            records = analyzer.llm_latency.records
+            totals = [r['total'] for r in records]
+            # 通常の応答では全文を受信するまで何も表示できない
+            firsts = [r['ttft'] if r['ttft'] is not None else r['total'] for r in records]
+            print(f"{mode}: {elapsed:.1f}秒 / LLM呼び出し {len(records)}件 / "
+                  f"最初の表示まで 平均{sum(firsts) / len(firsts):.2f}秒 / 全体 平均{sum(totals) / len(totals):.2f}秒")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    same = results['normal'] == results['stream']
+    print(f"カテゴリ別結果: {'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+def bench_budget(args):
+    """
+    トークン予算ごとにLLMへ送ったプロンプトのトークン数と最大のプロンプトを比較する
+
+    無効にしているクエリも実行し、既定の予算を超える記事数のフィクスチャ
+    （federal_reserve_interest_rate.html）で記事の選別を行わせる。
+    トークン数はテンプレートを含むプロンプト全体で予算の適用前後を比較する。
+
+    Returns:
+        int: 終了コード（予算を超えたプロンプトがある・既定の予算で選別が行われなければ1）
+    """
+    from llm_cache import LLMCache
+    from token_budget import TokenBudget
+
+    server = start_load_server(args)
+    ok = True
+    try:
+        budgets = [('無制限', 0, 0), ('既定', args.news_budget, args.summary_budget),
+                   ('小さい予算', args.news_budget // 8, args.summary_budget // 8)]
+        for name, news_budget, summary_budget in budgets:
+            budget = TokenBudget(news_budget=news_budget, summary_budget=summary_budget)
+            analyzer, run, _ = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                               budget=budget, all_queries=True)
+            server.reset_counts()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+
+            news = [r for r in budget.records if r['label'] != "最終統合分析"]
+            summary = [r for r in budget.records if r['label'] == "最終統合分析"]
+            largest = max(news, key=lambda r: r['before'])
+            before = sum(r['before'] for r in budget.records)
+            after = sum(r['after'] for r in budget.records)
+            print(f"{name}: 送信 {server.prompt_tokens}トークン / プロンプト全体 {before} → {after}トークン"
+                  f"（{(before - after) / before * 100:.1f}%削減）")
+            print(f"  最大のクエリ分析 [{largest['label']}] {largest['before']} → {largest['after']}トークン"
+                  f"（ニュース部分 {largest['section']}・記事 {largest['kept']}/{largest['total']}件） / "
+                  f"選別したクエリ {sum(1 for r in news if r['kept'] < r['total'])}/{len(news)}件 / "
+                  f"最終統合分析 {summary[0]['before']} → {summary[0]['after']}トークン")
+            # 1件目は予算を超えても必ず残すため、各記事がそれより大きい場合を除き予算内に収まるはず
+            if news_budget and any(r['section'] > news_budget and r['kept'] > 1 for r in news):
+                print(f"  ニュース部分が予算 {news_budget} を超えたクエリがあります!")
+                ok = False
+            if name == '既定' and all(r['kept'] == r['total'] for r in news):
+                print("  既定の予算で記事の選別が行われていません!")
+                ok = False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"予算内: {'OK' if ok else '超過あり!'}")
+    return 0 if ok else 1
+
+
+def bench_relevance(args):
+    """
+    関連度フィルタの有無でLLMへ送った記事数・プロンプトのトークン数を比較し、除外した記事を表示する
+
+    Returns:
+        int: 終了コード
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    try:
+        for cutoff in (0.0, args.cutoff):
+            analyzer, run, _ = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                               relevance_cutoff=cutoff)
+            server.reset_counts()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+
+            stats = analyzer.relevance_filter.stats
+            sent = sum(r['kept'] for r in analyzer.token_budget.records if r['label'] != "最終統合分析")
+            print(f"閾値 {cutoff:g}: LLMに送った記事 {sent}件 / プロンプト {server.prompt_tokens}トークン / "
+                  f"除外 {stats['dropped']}件 / 計算時間 {stats['elapsed'] * 1000:.1f}ms")
+            for score, query, title in sorted(analyzer.relevance_filter.dropped, reverse=True):
+                print(f"  除外 {score:.2f} [{query}] {title[:70]}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+def bench_breaker(args):
+    """
+    第一候補のモデルが障害中の状態で実行し、サーキットブレーカーにより短時間でフォールバック先に
+    切り替わって全クエリが分析されることを確認する
+
+    フォールバック先の呼び出しが --max-fallback-latency 秒以内に終わることも確認する
+    （レート制限の待機等で遅くなっていれば失敗にする）。
+
+    Returns:
+        int: 終了コード（分析できなかったクエリがある・フォールバックが遅ければ1）
+    """
+    import http_client
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    try:
+        analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            getattr(analyzer, run)()
+        elapsed = time.perf_counter() - start
+        counts = {name: len(getattr(analyzer, name)) for name in result_lists}
+        # LLMは全モデルで1つの範囲（OpenRouterのAPI）を共有する
+        llm_bucket = http_client.SHARED_CLIENT.limiter._bucket(f"{analyzer.base_url}/chat/completions")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"障害中のモデル: {', '.join(args.failing_models)}")
+    print(f"実行時間: {elapsed:.1f}秒 / 結果: " + ", ".join(f"{name}={count}" for name, count in counts.items()))
+    print("モデル別LLMリクエスト: " + ", ".join(f"{model}={count}" for model, count in server.model_counts.items()))
+    analyzer.breakers.print_stats()
+    ok = all(counts.values())
+
+    # 成功した呼び出し（フォールバック先）のレイテンシ（レート制限の待機・再試行を含む）
+    latencies = [record['total'] for record in analyzer.llm_latency.records]
+    slowest = max(latencies, default=0.0)
+    fast = slowest <= args.max_fallback_latency
+    print(f"フォールバック先の呼び出し: 最大 {slowest:.2f}秒（上限 {args.max_fallback_latency:.1f}秒）"
+          f"{'' if fast else ' / フォールバックが遅い!'}")
+    ok = ok and fast and bool(latencies)
+
+    # 1つのモデルの障害（503）で、共有するLLMのレートが下がり他のモデルまで遅くならないこと
+    if llm_bucket is not None:
+        slowed = llm_bucket.stats['throttled'] > 0 or llm_bucket.rate < llm_bucket.start_rate
+        print(f"LLMのレート: {llm_bucket.start_rate:.2f} → {llm_bucket.rate:.2f}リクエスト/秒 / "
+              f"制限 {llm_bucket.stats['throttled']}件 / 待機 {llm_bucket.stats['waited']:.1f}秒"
+              f"{' / 障害で他のモデルまで減速!' if slowed else ''}")
+        ok = ok and not slowed
+    return 0 if ok else 1
+
+
+def bench_router(args):
+    """
+    モデルごとに生成時間の異なるサーバーに対して、レイテンシの記録なし・記録あり・ヘッジなしで実行し、
+    選ばれたモデルと呼び出しのp50/p95を比較する
+
+    Returns:
+        int: 終了コード（分析結果が一致しなければ1）
+    """
+    from llm_cache import LLMCache
+    from model_router import ModelRouter, percentile
+    from standin_server import parse_model_latency
+
+    args.model_latency = parse_model_latency(args.model_latency)
+    server = start_load_server(args)
+    work_dir = tempfile.mkdtemp(prefix='model_router_')
+    latency_file = os.path.join(work_dir, 'model_latency.json')
+    results = {}
+    try:
+        for name, hedge in (('記録なし', True), ('記録あり', True), ('記録あり・ヘッジなし', False)):
+            router = ModelRouter(path=latency_file, hedge=hedge)
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=True, cache=LLMCache(bypass=True),
+                                                          router=router)
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+            results[name] = {name: getattr(analyzer, name) for name in result_lists}
+
+            latencies = router.stats['latencies']
+            models = ", ".join(f"{model}={count}" for model, count in sorted(server.model_counts.items()))
+            print(f"{name}: {elapsed:.1f}秒 / 呼び出し p50 {percentile(latencies, 50):.2f}秒・"
+                  f"p95 {percentile(latencies, 95):.2f}秒 / ヘッジ {router.stats['hedged']}件"
+                  f"（採用 {router.stats['hedge_won']}件） / {models}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    same = all(result == results['記録なし'] for result in results.values())
+    print(f"カテゴリ別結果: {'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+def bench_summary(args):
+    """
+    カテゴリあたりのクエリ数を増やしながら、最終統合分析を一括で行う場合とカテゴリ要約（map-reduce）を
+    挟む場合のレイテンシと最終プロンプトのトークン数を比較する
+
+    Returns:
+        int: 終了コード（最終統合分析の結果が得られなければ1）
+    """
+    from llm_cache import LLMCache
+    from summary_digest import CategoryDigester
+    from token_budget import TokenBudget
+
+    server = start_load_server(args)
+    template = load_fixture('openrouter', 'analysis.txt', mode='r')
+    ok = True
+    try:
+        modes = [('一括（予算なし）', 0, 0), ('一括（既定の予算）', 0, args.summary_budget),
+                 ('map-reduce', args.digest_tokens, args.summary_budget)]
+        for queries in args.queries:
+            for name, digest_tokens, summary_budget in modes:
+                budget = TokenBudget(summary_budget=summary_budget)
+                analyzer, _, result_lists = create_analyzer(args.analyzer, cache=LLMCache(bypass=True), budget=budget,
+                                                            digester=CategoryDigester(digest_tokens=digest_tokens))
+                # カテゴリごとに queries 件の分析結果を用意して最終統合分析だけを実行
+                for list_name in result_lists:
+                    getattr(analyzer, list_name).extend(
+                        {'query': f"{list_name} {i}", 'analysis': template.replace('{query}', f"{list_name} {i}"),
+                         'news_count': 10}
+                        for i in range(queries)
+                    )
+                server.reset_counts()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    analyzer.generate_comprehensive_summary()
+                elapsed = time.perf_counter() - start
+
+                final = budget.records[-1]
+                print(f"{queries}件/カテゴリ {name}: {elapsed:.1f}秒 / LLM呼び出し {analyzer.router.stats['calls']}回 / "
+                      f"最終プロンプトの分析結果 {final['section']}トークン（{final['kept']}/{final['total']}件を切り詰めなし）")
+                if "最終分析エラー" in output.getvalue():
+                    ok = False
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0 if ok else 1
+
+
+def bench_structured(args):
+    """
+    自由記述の分析＋最終統合分析（LLM）と、構造化（JSON）分析＋ローカル集計の時間・LLM呼び出し数を比較する
+
+    構造化モードは2回実行して集計結果が一致すること（決定的であること）も確認する。
+
+    Returns:
+        int: 終了コード（JSONの検証に失敗した分析結果がある・集計結果が一致しなければ1）
+    """
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    summaries = []
+    ok = True
+    try:
+        modes = [('自由記述＋最終統合分析', False, False), ('構造化＋ローカル集計', True, False),
+                 ('構造化＋ローカル集計（2回目）', True, False), ('構造化＋最終統合分析', True, True)]
+        for name, structured, narrative in modes:
+            analyzer, run, _ = create_analyzer(args.analyzer, pipelined=args.pipelined, cache=LLMCache(bypass=True),
+                                               structured=structured, narrative=narrative)
+            # 最終統合分析（要約・集計を含む）にかかった時間を別に計測
+            summarize = analyzer.generate_comprehensive_summary
+            summary_time = []
+
+            def timed_summary():
+                start = time.perf_counter()
+                summarize()
+                summary_time.append(time.perf_counter() - start)
+            analyzer.generate_comprehensive_summary = timed_summary
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+
+            line = (f"{name}: {elapsed:.1f}秒（最終段 {summary_time[0]:.2f}秒） / "
+                    f"LLM呼び出し {server.request_counts.get('/api/v1/chat/completions', 0)}回")
+            if structured:
+                summary = analyzer.structured_summary
+                invalid = sum(category['invalid'] for category in summary['categories'])
+                ok = ok and invalid == 0 and summary['score'] is not None
+                if not narrative:
+                    summaries.append(summary)
+                line += f" / 総合スコア {summary['score']:+.1f}（{summary['outlook']}） / JSON検証失敗 {invalid}件"
+            print(line)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    same = summaries[0] == summaries[1]
+    print(f"ローカル集計: {'決定的（2回の結果が一致）' if same else '結果が一致しない!'}")
+    return 0 if ok and same else 1
+
+
+def bench_topics(args):
+    """
+    クエリごとのLLM分析と、カテゴリの記事をトピックにまとめたトピックごとのLLM分析を比較する
+
+    トピック分析のLLM呼び出しがクエリごとの分析を超えないことを確認する。
+
+    Returns:
+        int: 終了コード（トピック分析の呼び出しが多い・分析結果のないカテゴリがあれば1）
+    """
+    from llm_cache import LLMCache
+    from topic_cluster import TopicClusterer
+
+    server = start_load_server(args)
+    calls = {}
+    ok = True
+    try:
+        modes = [('クエリごと', None), ('トピックごと', TopicClusterer(max_clusters=args.max_topics))]
+        for name, topics in modes:
+            analyzer, run, result_lists = create_analyzer(args.analyzer, pipelined=args.pipelined,
+                                                          cache=LLMCache(bypass=True), all_queries=args.all_queries,
+                                                          topics=topics)
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run)()
+            elapsed = time.perf_counter() - start
+            ok = ok and all(getattr(analyzer, list_name) for list_name in result_lists)
+
+            # 最終統合分析を除いたクエリ（トピック）分析の呼び出し数
+            calls[name] = server.request_counts.get('/api/v1/chat/completions', 0) - 1
+            print(f"{name}: {elapsed:.1f}秒 / 分析のLLM呼び出し {calls[name]}回 / "
+                  f"プロンプト {server.prompt_tokens}トークン")
+            if topics is not None:
+                for record in topics.records:
+                    print(f"  {record['title']}: {record['queries']}クエリ・{record['articles']}記事 → "
+                          f"{record['clusters']}トピック（{record['elapsed'] * 1000:.1f}ms）")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    saved = calls['クエリごと'] - calls['トピックごと']
+    print(f"削減: {saved}回（{saved / max(1, calls['クエリごと']):.0%}）")
+    return 0 if ok and saved >= 0 else 1
+
+
+def bench_feed(args):
+    """
+    検索ページ（HTML）とRSS検索フィードで、クエリごとの受信バイト数・解析時間と取得した記事を比較する
+
+    同じ記事がRSSでも同じ形式・内容（ソース・スニペット）で取得できること、
+    AtomのフィクスチャからもRSSと同じ記事が取得できることを確認する。
+
+    Returns:
+        int: 終了コード（形式・内容が一致しなければ1）
+    """
+    import http_client
+    import news_feed
+    from llm_cache import LLMCache
+
+    server = start_load_server(args)
+    ok = True
+    totals = {'html': [0, 0.0, 0], 'rss': [0, 0.0, 0]}   # 取得元 -> [バイト数, 解析時間, 記事数]
+    try:
+        analyzer, _, _ = create_analyzer('spac', cache=LLMCache(bypass=True))
+        queries = list(dict.fromkeys(query for _, _, query in LOAD_QUERIES))
+        for query in queries:
+            items = {}
+            measured = {}
+            for source in news_feed.NEWS_SOURCES:
+                analyzer.news_source = source
+                stats = analyzer.feed_reader.stats if source == 'rss' else analyzer.extractor.stats
+                before = dict(stats)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(args.repeat):
+                        items[source] = analyzer.search_google_news_single(query)
+                if source == 'rss':
+                    size = (stats['bytes'] - before['bytes']) // args.repeat
+                else:
+                    params = {'q': query, 'hl': 'en-US', 'gl': 'US', 'ceid': 'US:en'}
+                    size = len(http_client.get(f"{server.base_url}/search", params=params).content)
+                parse_time = (stats['elapsed'] - before['elapsed']) / args.repeat
+                measured[source] = (size, parse_time)
+                totals[source] = [totals[source][0] + size, totals[source][1] + parse_time,
+                                  totals[source][2] + len(items[source])]
+
+            # 同じ記事（タイトルで対応付け）の項目を比較
+            by_title = {item['title']: item for item in items['rss']}
+            matched = [(item, by_title[item['title']]) for item in items['html'] if item['title'] in by_title]
+            same_shape = all(set(item) == set(items['html'][0]) for item in items['rss']) if items['html'] else False
+            same_fields = all(html_item[key] == rss_item[key] for html_item, rss_item in matched
+                              for key in ('source', 'snippet', 'query'))
+            dates = sum(1 for html_item, rss_item in matched if html_item['date'] != rss_item['date'])
+            ok = ok and same_shape and same_fields and bool(matched)
+            print(f"{query}: HTML {measured['html'][0] / 1024:.1f}KB・解析 {measured['html'][1] * 1000:.2f}ms・"
+                  f"{len(items['html'])}件 → RSS {measured['rss'][0] / 1024:.1f}KB・解析 "
+                  f"{measured['rss'][1] * 1000:.2f}ms・{len(items['rss'])}件 / 同じ記事 {len(matched)}件"
+                  f"（日付が異なる {dates}件） / HTMLのみ {len(items['html']) - len(matched)}件"
+                  f"{'' if same_shape and same_fields else ' / 形式・内容が不一致!'}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    html_total, rss_total = totals['html'], totals['rss']
+    print(f"\n合計: 受信 HTML {html_total[0] / 1024:.1f}KB → RSS {rss_total[0] / 1024:.1f}KB"
+          f"（{html_total[0] / max(1, rss_total[0]):.1f}分の1） / 解析 HTML {html_total[1] * 1000:.1f}ms → "
+          f"RSS {rss_total[1] * 1000:.1f}ms / 記事 HTML {html_total[2]}件・RSS {rss_total[2]}件")
+
+    # Atom（記録時刻のままのフィクスチャ）がRSSと同じ記事になるか
+    entries = {}
+    for name in ('s_p_500.xml', 's_p_500.atom'):
+        entries[name] = list(news_feed.iter_entries([load_fixture('google_news_rss', name)]))
+    same_atom = entries['s_p_500.xml'] == entries['s_p_500.atom']
+    print(f"Atom: {len(entries['s_p_500.atom'])}件 {'RSSと一致' if same_atom else 'RSSと不一致!'}")
+    return 0 if ok and same_atom else 1
+
+
+def bench_ratelimit(args):
+    """
+    固定の待機の代わりに適応レート制限でリアルタイム実行し、待機時間を従来の固定スケジュールと比較する
+
+    2回目は1回目に学習して保存したレートから始まる。
+
+    Returns:
+        int: 終了コード（分析できなかったカテゴリがあれば1）
+    """
+    import http_client
+    from llm_cache import LLMCache
+    from rate_limiter import HostRateLimiter
+
+    server = start_load_server(args)
+    work_dir = tempfile.mkdtemp(prefix='rate_limiter_')
+    ok = True
+    try:
+        for run in (1, 2):
+            limiter = HostRateLimiter(path=os.path.join(work_dir, 'host_rates.json'))
+            http_client.SHARED_CLIENT = http_client.HttpClient(limiter=limiter)
+            analyzer, run_name, result_lists = create_analyzer(args.analyzer, pipelined=args.pipelined,
+                                                               cache=LLMCache(bypass=True))
+            server.reset_counts()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                getattr(analyzer, run_name)()
+            elapsed = time.perf_counter() - start
+            ok = ok and all(getattr(analyzer, name) for name in result_lists)
+
+            print(f"{run}回目: {elapsed:.1f}秒 / 待機 {limiter.total_wait():.1f}秒"
+                  f"（従来の固定スケジュール {analyzer.fixed_wait:.1f}秒） / 429 {server.status_counts.get(429, 0)}件")
+            for scope, bucket in sorted(limiter._buckets.items()):
+                print(f"  {scope}: {bucket.start_rate:.2f} → {bucket.rate:.2f}リクエスト/秒 / "
+                      f"{bucket.stats['requests']}件（制限 {bucket.stats['throttled']}件）")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0 if ok else 1
+
+
+def bench_sentiment(args):
+    """
+    実行日で保存したセンチメント指数を基準価額の日付に結合する規則（align_to_trading_days）を検証する
+
+    週末・祝日（2025/10/13 スポーツの日）の実行が次の基準日に結合され、同じ期間の複数の実行は最新のものが使われ、
+    表示期間の前・最後の基準日より後の実行は結合されないことを確認する。
+
+    Returns:
+        int: 終了コード（想定と異なれば1）
+    """
+    import bandwalk_core_impl
+    import sentiment_store
+    from bandwalk_core_impl import DataRow
+    from datetime import datetime
+
+    # (実行日, 設定, カテゴリ, スコア)
+    runs = [
+        ('2025/10/08', 'spac', 'sp500', 10.0),    # 表示期間の前の基準日
+        ('2025/10/09', 'spac', 'sp500', 20.0),    # 基準日と同じ日
+        ('2025/10/11', 'spac', 'sp500', -30.0),   # 土曜（次の基準日より前に再実行あり）
+        ('2025/10/13', 'spac', 'sp500', 40.0),    # 祝日
+        ('2025/10/12', 'china', 'china', -5.0),   # 日曜
+        ('2025/10/16', 'spac', 'sp500', 50.0),    # 最後の基準日より後
+    ]
+    trading_dates = ['2025/10/08', '2025/10/09', '2025/10/10', '2025/10/14', '2025/10/15']
+    # 基準日 -> {指数: (スコア, 実行日（基準日と異なる場合）)}
+    expected = {
+        '2025/10/09': {('spac', 'sp500'): (20.0, None)},
+        '2025/10/14': {('spac', 'sp500'): (40.0, '2025/10/13'), ('china', 'china'): (-5.0, '2025/10/12')},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix='sentiment_')
+    db_path = os.path.join(work_dir, 'news_sentiment.db')
+    default_db = sentiment_store.SENTIMENT_DB
+    try:
+        store = sentiment_store.SentimentStore(db_path)
+        for date, config, category, score in runs:
+            store.record(config, {'name': category, 'title': f"{config}:{category}"}, date,
+                         {'score': score, 'impact': None, 'queries': 1, 'news_count': 1, 'source': 'structured'})
+        store.close()
+
+        # bandwalk と同じ経路（表示期間は最初の基準日を除く4日）で読み込む
+        sentiment_store.SENTIMENT_DB = db_path
+        data = [DataRow(datetime.strptime(date, '%Y/%m/%d'), 10000.0, 0.0, 0.0) for date in trading_dates]
+        series, index = bandwalk_core_impl.load_sentiment(data, days=len(trading_dates) - 1)
+    finally:
+        sentiment_store.SENTIMENT_DB = default_db
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    actual = {date: {key: (entry['score'], entry.get('run_date')) for key, entry in entries.items()}
+              for date, entries in index.items()}
+    for date in trading_dates[1:]:
+        print(f"{date}: " + " / ".join(text for text, _ in sentiment_store.format_row(series, index.get(date, {}))))
+    ok = actual == expected
+    print(f"基準日への結合: {'想定通り' if ok else f'想定と異なる! {actual}'}")
+    return 0 if ok else 1
+
+
+def add_server_options(p):
+    """スタンドインサーバーの注入設定オプションを追加"""
+    p.add_argument('--latency', type=float, default=0.05, help="レスポンス遅延（秒）")
+    p.add_argument('--jitter', type=float, default=0.0, help="遅延のばらつき（秒）")
+    p.add_argument('--llm-latency', type=float, default=0.5, help="LLM応答の追加遅延（秒）")
+    p.add_argument('--llm-ttft', type=float, default=None,
+                   help="ストリーミング時の最初のトークンまでの時間（秒、既定は遅延の1割）")
+    p.add_argument('--error-rate', type=float, default=0.0, help="500を返す確率")
+    p.add_argument('--rate-429', type=float, default=0.0, help="429を返す確率")
+    p.add_argument('--retry-after', type=float, default=1.0, help="429のRetry-After（秒）")
+    p.add_argument('--seed', type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オフラインベンチマーク")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('parser', help="時系列テーブルのパーサー比較")
+    p.add_argument('--repeat', type=int, default=20)
+    p.set_defaults(func=bench_parser)
+
+    p = subparsers.add_parser('backfill', help="ページ送りバックフィルの検証と計測")
+    p.add_argument('--fund-id', default='03311187')
+    p.add_argument('--gap-rows', type=int, default=20, help="既存CSVの末尾から削る行数（欠損期間）")
+    p.add_argument('--latency', type=float, default=0.2, help="スタンドインサーバーの応答遅延（秒）")
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    p.set_defaults(func=bench_backfill)
+
+    p = subparsers.add_parser('load', help="N件のファンドとM件のクエリのエンドツーエンド計測")
+    p.add_argument('--funds', type=int, default=3)
+    p.add_argument('--queries', type=int, default=4)
+    add_server_options(p)
+    p.set_defaults(func=bench_load)
+
+    p = subparsers.add_parser('pipeline', help="逐次実行と統合パイプラインのレイテンシ比較")
+    p.add_argument('--workers', type=int, default=4)
+    add_server_options(p)
+    p.set_defaults(func=bench_pipeline)
+
+    p = subparsers.add_parser('news', help="ニュース分析の逐次実行とパイプライン実行の比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    add_server_options(p)
+    p.set_defaults(func=bench_news)
+
+    p = subparsers.add_parser('http', help="接続の再利用と再試行の比較")
+    p.add_argument('--requests', type=int, default=200)
+    add_server_options(p)
+    p.set_defaults(func=bench_http, latency=0.0)
+
+    p = subparsers.add_parser('dedup', help="重複除去モードごとのプロンプトトークン数")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    add_server_options(p)
+    p.set_defaults(func=bench_dedup)
+
+    p = subparsers.add_parser('incremental', help="差分実行（新着記事のみ分析）の検証")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    p.add_argument('--hidden', type=int, default=2, help="1回目に隠す各クエリの先頭記事数")
+    add_server_options(p)
+    p.set_defaults(func=bench_incremental)
+
+    p = subparsers.add_parser('llm-cache', help="LLM応答キャッシュのヒット率と短縮時間")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    add_server_options(p)
+    p.set_defaults(func=bench_llm_cache)
+
+    p = subparsers.add_parser('stream', help="ストリーミング応答の最初のトークンまでの時間と結果の一致")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    add_server_options(p)
+    p.set_defaults(func=bench_stream, llm_latency=2.0)
+
+    p = subparsers.add_parser('budget', help="トークン予算ごとのプロンプトのトークン数")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    p.add_argument('--news-budget', type=int, default=2500)
+    p.add_argument('--summary-budget', type=int, default=6000)
+    add_server_options(p)
+    p.set_defaults(func=bench_budget)
+
+    p = subparsers.add_parser('relevance', help="関連度フィルタで除外した記事とプロンプトのトークン数")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    p.add_argument('--cutoff', type=float, default=0.5)
+    add_server_options(p)
+    p.set_defaults(func=bench_relevance)
+
+    p = subparsers.add_parser('breaker', help="モデル障害時のサーキットブレーカーとフォールバック")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='china')
+    p.add_argument('--failing-models', nargs='+', default=['mistralai/mistral-small'])
+    p.add_argument('--max-fallback-latency', type=float, default=3.0,
+                   help="フォールバック先の呼び出し1回あたりの許容時間（秒）")
+    add_server_options(p)
+    p.set_defaults(func=bench_breaker)
+
+    p = subparsers.add_parser('router', help="レイテンシに基づくモデル選択とヘッジの比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--model-latency', nargs='*', metavar='MODEL=SECONDS',
+                   default=['mistralai/mistral-small=2.0', 'z-ai/glm-4.5-air:free=0.8'])
+    p.add_argument('--llm-tail-rate', type=float, default=0.2, help="LLM応答が長引く確率")
+    p.add_argument('--llm-tail-latency', type=float, default=8.0, help="長引いた場合の追加遅延（秒）")
+    add_server_options(p)
+    p.set_defaults(func=bench_router)
+
+    p = subparsers.add_parser('structured', help="構造化（JSON）分析＋ローカル集計と最終統合分析（LLM）の比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--pipelined', action='store_true')
+    p.add_argument('--llm-prompt-latency', type=float, default=0.5,
+                   help="プロンプト1000トークンごとに追加する生成時間（秒）")
+    add_server_options(p)
+    p.set_defaults(func=bench_structured)
+
+    p = subparsers.add_parser('topics', help="クエリごとの分析とトピックごとの分析のLLM呼び出し数の比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--pipelined', action='store_true')
+    p.add_argument('--max-topics', type=int, default=2, help="カテゴリあたりのトピック数の上限")
+    p.add_argument('--all-queries', action='store_true', help="設定で無効にしているクエリも実行")
+    p.add_argument('--llm-prompt-latency', type=float, default=0.3,
+                   help="プロンプト1000トークンごとに追加する生成時間（秒）")
+    add_server_options(p)
+    p.set_defaults(func=bench_topics)
+
+    p = subparsers.add_parser('feed', help="検索ページ（HTML）とRSS検索フィードの受信バイト数・解析時間の比較")
+    p.add_argument('--repeat', type=int, default=5, help="クエリごとの反復回数（解析時間は平均）")
+    add_server_options(p)
+    p.set_defaults(func=bench_feed, latency=0.0)
+
+    p = subparsers.add_parser('ratelimit', help="適応レート制限の待機時間と従来の固定スケジュールの比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--pipelined', action='store_true')
+    add_server_options(p)
+    p.set_defaults(func=bench_ratelimit, rate_429=0.1)
+
+    p = subparsers.add_parser('resume', help="中断した実行の再開（実行ジャーナル）の検証")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--pipelined', action='store_true')
+    p.add_argument('--interrupt-after', type=int, default=3, help="中断するまでに完了させるクエリ分析の数")
+    add_server_options(p)
+    p.set_defaults(func=bench_resume)
+
+    p = subparsers.add_parser('summary', help="最終統合分析の一括実行とカテゴリ要約（map-reduce）の比較")
+    p.add_argument('--analyzer', choices=['china', 'spac'], default='spac')
+    p.add_argument('--queries', type=int, nargs='+', default=[2, 8, 24], help="カテゴリあたりのクエリ数")
+    p.add_argument('--digest-tokens', type=int, default=800)
+    p.add_argument('--summary-budget', type=int, default=6000)
+    p.add_argument('--llm-prompt-latency', type=float, default=0.3,
+                   help="プロンプト1000トークンごとに追加する生成時間（秒）")
+    add_server_options(p)
+    p.set_defaults(func=bench_summary)
+
+    p = subparsers.add_parser('sentiment', help="センチメント指数の実行日と基準日の結合規則の検証")
+    p.set_defaults(func=bench_sentiment)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
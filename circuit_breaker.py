@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+# サーキットブレーカーの設定（環境変数で変更可能）
+FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "3"))   # 連続でこの回数失敗したらオープン
+COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "120"))        # オープンしてから試行を再開するまでの秒数
+
+CLOSED = 'closed'        # 通常（リクエストを送る）
+OPEN = 'open'            # 失敗が続いたため送らない（即座に失敗）
+HALF_OPEN = 'half_open'  # クールダウン後の試行中（1件だけ送る）
+
+
+class CircuitOpenError(Exception):
+    """フォールバック先を含むすべてのモデルが一時停止中"""
+
+
+class CircuitBreaker:
+    """モデル1つ分のサーキットブレーカー（スレッドセーフ）"""
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0       # 連続失敗数
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.stats = {
+            'success': 0,
+            'failure': 0,
+            'rejected': 0,      # オープン中のため送らなかった回数
+            'opened': 0,        # オープンした回数
+        }
+
+    def allow(self):
+        """リクエストを送ってよいか（クールダウン後は試行を1件だけ許可）"""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats['success'] += 1
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        """失敗を記録する（オープンした場合True）"""
+        with self._lock:
+            self.stats['failure'] += 1
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self._clock()
+                self.stats['opened'] += 1
+                return True
+            return False
+
+    def retry_in(self):
+        """オープン中なら試行を再開できるまでの秒数（それ以外は0）"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (self._clock() - self.opened_at))
+
+
+class ModelBreakers:
+    """モデルごとのサーキットブレーカーを1回の実行内の全クエリで共有する"""
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model):
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = CircuitBreaker(model, self.failure_threshold, self.cooldown)
+                self._breakers[model] = breaker
+            return breaker
+
+    def select(self, models):
+        """
+        フォールバック順のモデルから、リクエストを送ってよい最初のモデルを選ぶ
+
+        Args:
+            models (list): 優先順のモデル名
+
+        Returns:
+            str: モデル名（すべてオープン中ならNone）
+        """
+        for model in models:
+            if self.get(model).allow():
+                return model
+        return None
+
+    def print_stats(self):
+        """モデルごとの状態と成功・失敗数を表示"""
+        print("\n=== LLMサーキットブレーカー ===")
+        with self._lock:
+            breakers = list(self._breakers.values())
+        if not breakers:
+            print("LLM呼び出しなし")
+            return
+        for breaker in breakers:
+            stats = breaker.stats
+            state = breaker.state
+            if state == OPEN:
+                state += f"（あと{breaker.retry_in():.0f}秒）"
+            print(f"{breaker.name}: {state} / 成功 {stats['success']}件 / 失敗 {stats['failure']}件 / "
+                  f"オープン {stats['opened']}回 / 即時失敗 {stats['rejected']}件")
@@ -0,0 +1,158 @@
+import re
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# 時系列テーブルを探すセレクタ（先頭から順に試行）
+TABLE_SELECTORS = [
+    'table',
+    '.historyTable',
+    '#historicalDataTable',
+    '[data-test="historical-prices"]',
+    'table[class*="history"]',
+    'table[class*="data"]'
+]
+
+TABLE_TAG_PATTERN = re.compile(r'<(/?)table\b[^>]*>', re.IGNORECASE)
+
+
+def _decode_content(content):
+    """レスポンスのバイト列を文字列に変換"""
+    if isinstance(content, bytes):
+        return content.decode('utf-8', errors='replace')
+    return content
+
+
+def _rows_from_soup_table(table):
+    """BeautifulSoupのtable要素からセル文字列の行リストを作成"""
+    cell_rows = []
+    for row in table.find_all('tr'):
+        cells = row.find_all(['td', 'th'])
+        if len(cells) >= 4:
+            cell_rows.append([cell.get_text(strip=True) for cell in cells])
+    return cell_rows
+
+
+def extract_table_region(content):
+    """
+    HTML全体から最初のtable要素の範囲だけを切り出す
+
+    入れ子のtableも考慮して対応する終了タグまでを返す。
+
+    Args:
+        content (bytes | str): ページのHTML
+
+    Returns:
+        str: table要素のHTML（見つからない場合はNone）
+    """
+    text = _decode_content(content)
+    depth = 0
+    start = None
+    for match in TABLE_TAG_PATTERN.finditer(text):
+        if not match.group(1):
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                return text[start:match.end()]
+    return None
+
+
+def parse_table_bs4(content):
+    """
+    ページ全体をBeautifulSoupで解析して時系列テーブルの行を取得する（従来方式）
+
+    Args:
+        content (bytes | str): ページのHTML
+
+    Returns:
+        list: セル文字列のリストの行リスト（テーブルがない場合はNone）
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+
+    table = None
+    for selector in TABLE_SELECTORS:
+        table = soup.select_one(selector)
+        if table:
+            break
+
+    if not table:
+        # より広範囲に探す
+        tables = soup.find_all('table')
+        if not tables:
+            return None
+        table = tables[0]
+
+    return _rows_from_soup_table(table)
+
+
+def parse_table_fast(content):
+    """
+    テーブル部分だけを切り出して解析する高速版
+
+    lxmlがあればlxmlで、なければ切り出した断片のみをBeautifulSoupで解析する。
+
+    Args:
+        content (bytes | str): ページのHTML
+
+    Returns:
+        list: セル文字列のリストの行リスト（テーブルがない場合はNone）
+    """
+    region = extract_table_region(content)
+    if region is None:
+        return None
+
+    if not HAS_LXML:
+        table = BeautifulSoup(region, 'html.parser').find('table')
+        return _rows_from_soup_table(table) if table else None
+
+    table = lxml.html.fragment_fromstring(region)
+    cell_rows = []
+    for row in table.iter('tr'):
+        cells = row.xpath('.//td|.//th')
+        if len(cells) >= 4:
+            # get_text(strip=True) と同じく各テキストノードをstripして連結
+            cell_rows.append([
+                ''.join(text.strip() for text in cell.xpath('.//text()'))
+                for cell in cells
+            ])
+    return cell_rows
+
+
+PARSER_BACKENDS = {
+    'fast': parse_table_fast,
+    'bs4': parse_table_bs4,
+}
+
+
+def parse_history_table(content, backend='fast'):
+    """
+    指定バックエンドで時系列テーブルを解析する
+
+    fastで行が取得できなかった場合は従来のbs4方式にフォールバックする。
+
+    Args:
+        content (bytes | str): ページのHTML
+        backend (str): 'fast' または 'bs4'
+
+    Returns:
+        tuple: (セル文字列の行リスト or None, 実際に使用したバックエンド名)
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"未対応のパーサー: {backend}")
+
+    if backend == 'fast':
+        try:
+            cell_rows = parse_table_fast(content)
+            if cell_rows:
+                return cell_rows, 'fast'
+        except Exception:
+            pass
+
+    return parse_table_bs4(content), 'bs4'
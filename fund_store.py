@@ -0,0 +1,185 @@
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import threading
+
+# 保存先DB（未設定の場合は従来通り {fund_id}_.csv を使用）
+FUND_DB = os.getenv("FUND_DB")
+
+CSV_HEADER = ['年月日', '基準価額（円）', '前日比（円）', '純資産総額（百万円）']
+
+CSV_NAME_PATTERN = re.compile(r'^(?P<fund_id>[0-9A-Za-z]+)_\.csv$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fund_history (
+    fund_id TEXT NOT NULL,
+    date TEXT NOT NULL,            -- YYYY/MM/DD（文字列順 = 日付順）
+    nav TEXT NOT NULL,             -- 基準価額（円）
+    daily_change TEXT NOT NULL,    -- 前日比（円）
+    net_assets TEXT NOT NULL,      -- 純資産総額（百万円）
+    PRIMARY KEY (fund_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fund_history_date ON fund_history (date);
+"""
+
+
+class FundStore:
+    """全ファンドの時系列を (fund_id, date) をキーに1テーブルで管理するSQLiteストア"""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite3の接続はスレッドをまたげないためスレッドごとに作成する
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # WALモード: 書き込み中も他プロセスから読み込み可能
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def upsert_rows(self, fund_id, rows):
+        """
+        行をまとめて追加・更新する（1トランザクション）
+
+        Args:
+            fund_id (str): 投資信託のID
+            rows (list): [年月日, 基準価額, 前日比, 純資産総額] のリスト
+
+        Returns:
+            int: 書き込んだ行数
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO fund_history (fund_id, date, nav, daily_change, net_assets)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (fund_id, date) DO UPDATE SET
+                    nav = excluded.nav,
+                    daily_change = excluded.daily_change,
+                    net_assets = excluded.net_assets
+                """,
+                [(fund_id, row[0], row[1], row[2], row[3]) for row in rows]
+            )
+        return len(rows)
+
+    def read_rows(self, fund_id, start_date=None, end_date=None):
+        """
+        日付範囲を指定して行を読み込む（日付昇順）
+
+        Args:
+            fund_id (str): 投資信託のID
+            start_date (str): 開始日 YYYY/MM/DD（含む）。Noneなら最初から
+            end_date (str): 終了日 YYYY/MM/DD（含む）。Noneなら最後まで
+
+        Returns:
+            list: [年月日, 基準価額, 前日比, 純資産総額] のリスト
+        """
+        sql = "SELECT date, nav, daily_change, net_assets FROM fund_history WHERE fund_id = ?"
+        params = [fund_id]
+        if start_date:
+            sql += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND date <= ?"
+            params.append(end_date)
+        sql += " ORDER BY date"
+        return [list(row) for row in self._connection().execute(sql, params)]
+
+    def existing_dates(self, fund_id):
+        """登録済みの日付の集合を返す"""
+        cursor = self._connection().execute("SELECT date FROM fund_history WHERE fund_id = ?", (fund_id,))
+        return {row[0] for row in cursor}
+
+    def count_rows(self, fund_id):
+        cursor = self._connection().execute("SELECT COUNT(*) FROM fund_history WHERE fund_id = ?", (fund_id,))
+        return cursor.fetchone()[0]
+
+    def fund_ids(self):
+        cursor = self._connection().execute("SELECT DISTINCT fund_id FROM fund_history ORDER BY fund_id")
+        return [row[0] for row in cursor]
+
+    def import_csv(self, fund_id, csv_file):
+        """既存の {fund_id}_.csv を取り込む"""
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # ヘッダーをスキップ
+            rows = [row[:4] for row in reader if len(row) >= 4]
+        return self.upsert_rows(fund_id, rows)
+
+    def export_csv(self, fund_id, csv_file):
+        """従来形式のCSVに書き出す（互換用）"""
+        rows = self.read_rows(fund_id)
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+        return len(rows)
+
+
+def open_default_store():
+    """FUND_DBが設定されていればストアを開く（未設定ならNone）"""
+    if not FUND_DB:
+        return None
+    return FundStore(FUND_DB)
+
+
+def migrate(db_path, csv_files):
+    """CSVファイル群をストアに取り込む"""
+    store = FundStore(db_path)
+    for csv_file in csv_files:
+        match = CSV_NAME_PATTERN.match(os.path.basename(csv_file))
+        if not match:
+            print(f"スキップ（ファイル名が {{fund_id}}_.csv 形式ではありません）: {csv_file}")
+            continue
+        count = store.import_csv(match.group('fund_id'), csv_file)
+        print(f"取り込み完了: {csv_file} -> {match.group('fund_id')} ({count}件)")
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投資信託の時系列ストア（SQLite）")
+    parser.add_argument('--db', default=FUND_DB or 'fund_history.db', help="DBファイルのパス（既定: $FUND_DB）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('migrate', help="既存のCSVを取り込む")
+    p.add_argument('csv_files', nargs='*', help="取り込むCSV（省略時は ./*_.csv）")
+
+    p = subparsers.add_parser('export', help="CSVに書き出す")
+    p.add_argument('fund_id')
+    p.add_argument('--out', help="出力ファイル（既定: {fund_id}_.csv）")
+
+    subparsers.add_parser('info', help="登録済みファンドの一覧")
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate(args.db, args.csv_files or sorted(glob.glob('*_.csv')))
+    elif args.command == 'export':
+        store = FundStore(args.db)
+        out = args.out or f"{args.fund_id}_.csv"
+        count = store.export_csv(args.fund_id, out)
+        print(f"書き出し完了: {out} ({count}件)")
+    else:
+        store = FundStore(args.db)
+        for fund_id in store.fund_ids():
+            rows = store.read_rows(fund_id)
+            print(f"{fund_id}: {len(rows)}件 {rows[0][0]} ～ {rows[-1][0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+import http_client
+
+# キャッシュ設定（環境変数で変更可能）
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "3600"))  # 秒
+
+
+class CachedResponse:
+    """キャッシュ経由で取得したレスポンス"""
+    def __init__(self, status_code, content, cache_status, table_hash=None):
+        self.status_code = status_code
+        self.content = content
+        self.cache_status = cache_status  # 'hit' / 'revalidated' / 'miss' / 'bypass'
+        self.table_hash = table_hash      # 前回処理済みテーブルのハッシュ
+
+
+class ResponseCache:
+    """URLをキーにしたディスクキャッシュ（TTL + ETag/Last-Modified再検証）"""
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stats = {
+            'hit': 0,            # TTL内のためリクエストなし
+            'revalidated': 0,    # 304 Not Modified
+            'miss': 0,           # 本文を再取得
+            'table_unchanged': 0,  # テーブルハッシュ一致で解析をスキップ
+        }
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _write(self, path, data, binary=False):
+        # 書き込み途中で中断されても壊れないように一時ファイル経由で置き換える
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _save(self, url, meta, body=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        if body is not None:
+            self._write(body_path, body, binary=True)
+        self._write(meta_path, json.dumps(meta, ensure_ascii=False))
+
+    def fetch(self, url, headers=None, timeout=30):
+        """
+        キャッシュを考慮してURLを取得する
+
+        Args:
+            url (str): 取得するURL
+            headers (dict): リクエストヘッダー
+            timeout (float): タイムアウト秒数
+
+        Returns:
+            CachedResponse: 取得結果
+        """
+        meta, body = self._load(url)
+        now = time.time()
+
+        if meta is not None and now - meta.get('fetched_at', 0) < self.ttl:
+            self.stats['hit'] += 1
+            return CachedResponse(200, body, 'hit', meta.get('table_hash'))
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        response = http_client.get(url, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and meta is not None:
+            self.stats['revalidated'] += 1
+            meta['fetched_at'] = now
+            self._save(url, meta)
+            return CachedResponse(200, body, 'revalidated', meta.get('table_hash'))
+
+        if response.status_code != 200:
+            return CachedResponse(response.status_code, response.content, 'bypass')
+
+        self.stats['miss'] += 1
+        new_meta = {
+            'url': url,
+            'fetched_at': now,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'table_hash': meta.get('table_hash') if meta else None,
+        }
+        self._save(url, new_meta, response.content)
+        return CachedResponse(200, response.content, 'miss', new_meta['table_hash'])
+
+    def set_table_hash(self, url, table_hash):
+        """テーブルの処理完了後にハッシュを記録する"""
+        meta, _ = self._load(url)
+        if meta is None:
+            return
+        meta['table_hash'] = table_hash
+        self._save(url, meta)
+
+    def mark_table_unchanged(self):
+        self.stats['table_unchanged'] += 1
+
+    def print_stats(self):
+        """キャッシュ統計を表示"""
+        total = self.stats['hit'] + self.stats['revalidated'] + self.stats['miss']
+        print("\n=== HTTPキャッシュ統計 ===")
+        print(f"リクエスト数: {total}件")
+        print(f"キャッシュヒット: {self.stats['hit']}件")
+        print(f"再検証(304): {self.stats['revalidated']}件")
+        print(f"ミス(再取得): {self.stats['miss']}件")
+        print(f"テーブル変更なし(解析スキップ): {self.stats['table_unchanged']}件")
+
+
+def content_hash(text):
+    """テーブル内容のハッシュを計算"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
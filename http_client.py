@@ -0,0 +1,212 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import rate_limiter
+
+# タイムアウト・再試行設定（環境変数で変更可能）
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))  # 接続タイムアウト（秒）
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))        # 読み込みタイムアウト（秒）
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))             # 再試行回数
+POOL_SIZE = 10             # ホストごとに保持する接続数
+BACKOFF_BASE = 1.0         # 再試行の待機時間の基準（秒）
+BACKOFF_MAX = 60.0         # 再試行の待機時間の上限（秒）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ブラウザとして送る共通ヘッダー（Accept-Language等は呼び出し側で指定）
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+}
+
+
+class _PooledAdapter(HTTPAdapter):
+    """新規接続を作るたびにコールバックを呼ぶ接続プール（接続の再利用率の計測用）"""
+    def __init__(self, on_new_connection, **kwargs):
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+def retry_after_seconds(response):
+    """Retry-Afterヘッダー（秒数またはHTTP日付）を秒数に変換（なければNone）"""
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt, response=None):
+    """
+    再試行までの待機時間を計算する
+
+    Retry-Afterがあればそれに従い、なければ指数バックオフ + ジッターとする。
+
+    Args:
+        attempt (int): 失敗した試行の番号（0始まり）
+        response: 失敗したレスポンス（例外の場合はNone）
+
+    Returns:
+        float: 待機秒数
+    """
+    retry_after = retry_after_seconds(response)
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return min(BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE), BACKOFF_MAX)
+
+
+class HttpClient:
+    """ホストごとにkeep-aliveのセッションを共有するHTTPクライアント（再試行・ホストごとの適応レート制限付き）"""
+    def __init__(self, headers=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES,
+                 pool_size=POOL_SIZE, limiter=None):
+        self.headers = dict(BROWSER_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.limiter = limiter if limiter is not None else rate_limiter.HostRateLimiter()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,    # 送信したリクエスト数（再試行を含む）
+            'retries': 0,     # 再試行数
+            'retry_wait': 0.0,  # 再試行で待機した秒数
+            'connections': 0,   # 新規に開いた接続数
+        }
+
+    def _session(self, url):
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = _PooledAdapter(lambda: self._count('connections'),
+                                         pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(f"{parsed.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def request(self, method, url, timeout=None, retries=None, **kwargs):
+        """
+        リクエストを送信する（接続エラー・429・5xxは再試行）
+
+        初期レートを設定したホストはレートに従って開始を待ち、429・Retry-After付きの応答・CAPTCHAでレートを下げる（5xxは再試行のみ）。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): URL
+            timeout: タイムアウト秒数（数値または (接続, 読み込み) のタプル）
+            retries (int): 再試行回数（Noneなら既定値）
+            **kwargs: requests に渡す引数（params, headers, json 等）
+
+        Returns:
+            requests.Response: 最後のレスポンス（再試行しても429・5xxの場合はそのまま返す）
+        """
+        session = self._session(url)
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.max_retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            self.limiter.acquire(url)
+            self._count('requests')
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+                response = None
+            else:
+                self.limiter.record(url, rate_limiter.is_throttled(response, streamed=kwargs.get('stream', False)))
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+
+            delay = retry_delay(attempt, response)
+            self._count('retries')
+            self._count('retry_wait', delay)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def connection_stats(self):
+        """新規接続数と再利用数"""
+        with self._lock:
+            opened = self.stats['connections']
+            requests_sent = self.stats['requests']
+        return {'opened': opened, 'reused': max(0, requests_sent - opened)}
+
+    def print_stats(self):
+        """接続・再試行の統計を表示"""
+        connections = self.connection_stats()
+        print("\n=== HTTP接続統計 ===")
+        print(f"リクエスト数: {self.stats['requests']}件 (再試行 {self.stats['retries']}件, "
+              f"待機 {self.stats['retry_wait']:.1f}秒)")
+        print(f"新規接続: {connections['opened']}件 / 接続再利用: {connections['reused']}件")
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# 全モジュールで共有するクライアント
+SHARED_CLIENT = HttpClient()
+
+
+def get(url, **kwargs):
+    """共有クライアントでGET"""
+    return SHARED_CLIENT.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    """共有クライアントでPOST"""
+    return SHARED_CLIENT.post(url, **kwargs)
+
+
+def print_stats():
+    SHARED_CLIENT.print_stats()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# キャッシュ設定（環境変数で変更可能）
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "21600"))                # 秒（既定6時間）
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))    # 保持する最大件数
+
+
+def cache_key(payload):
+    """
+    モデル・プロンプト・max_tokens・temperatureからキャッシュキーを作成
+
+    Args:
+        payload (dict): chat/completions のリクエストボディ
+
+    Returns:
+        str: SHA-256のハッシュ値
+    """
+    prompt = "\n".join(message['content'] for message in payload['messages'])
+    key_source = json.dumps({
+        'model': payload.get('model'),
+        'prompt': prompt,
+        'max_tokens': payload.get('max_tokens'),
+        'temperature': payload.get('temperature'),
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """プロンプト内容をキーにしたLLM応答のディスクキャッシュ（TTL + 件数上限のLRU削除）"""
+    def __init__(self, cache_dir=LLM_CACHE_DIR, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 bypass=False, refresh=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass    # キャッシュを読み書きしない
+        self.refresh = refresh  # 読み込まずに再取得し、結果で上書きする
+        self.stats = {
+            'hit': 0,
+            'miss': 0,
+            'expired': 0,
+            'evicted': 0,
+            'latency_saved': 0.0,  # ヒットにより省略できた応答時間（秒）
+        }
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, payload):
+        """
+        キャッシュ済みの応答を返す
+
+        Returns:
+            str: 応答本文（キャッシュがなければNone）
+        """
+        if self.bypass or self.refresh:
+            return None
+
+        path = self._path(cache_key(payload))
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self.stats['miss'] += 1
+                return None
+
+            if time.time() - entry.get('created_at', 0) >= self.ttl:
+                self.stats['expired'] += 1
+                self.stats['miss'] += 1
+                return None
+
+            # 最終利用時刻（LRU判定用）として更新時刻を使う
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.stats['hit'] += 1
+            self.stats['latency_saved'] += entry.get('latency', 0.0)
+            return entry['response']
+
+    def put(self, payload, response_text, latency):
+        """
+        応答を保存し、件数上限を超えた分を古い順に削除する
+
+        Args:
+            payload (dict): リクエストボディ
+            response_text (str): 応答本文
+            latency (float): 応答にかかった秒数
+        """
+        if self.bypass:
+            return
+
+        entry = {
+            'model': payload.get('model'),
+            'created_at': time.time(),
+            'latency': latency,
+            'response': response_text,
+        }
+        path = self._path(cache_key(payload))
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 書き込み途中で中断されても壊れないように一時ファイル経由で置き換える
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+                self.stats['evicted'] += 1
+            except OSError:
+                pass
+
+    def print_stats(self):
+        """キャッシュ統計を表示"""
+        if self.bypass:
+            print("\n=== LLMキャッシュ統計 ===")
+            print("キャッシュ無効（--no-llm-cache）")
+            return
+
+        total = self.stats['hit'] + self.stats['miss']
+        hit_rate = self.stats['hit'] / total * 100 if total else 0.0
+        print("\n=== LLMキャッシュ統計 ===")
+        if self.refresh:
+            print("再取得モード（--refresh-llm-cache）: 全件をLLMに問い合わせて上書き")
+        print(f"参照数: {total}件")
+        print(f"ヒット: {self.stats['hit']}件 (ヒット率 {hit_rate:.1f}%)")
+        print(f"ミス: {self.stats['miss']}件 (うち期限切れ {self.stats['expired']}件)")
+        print(f"削除(件数上限): {self.stats['evicted']}件")
+        print(f"短縮できた応答時間: {self.stats['latency_saved']:.1f}秒")
+
+
+def add_cache_arguments(parser):
+    """キャッシュ関連のコマンドライン引数を追加"""
+    parser.add_argument('--no-llm-cache', action='store_true', help="LLM応答キャッシュを使用しない")
+    parser.add_argument('--refresh-llm-cache', action='store_true', help="キャッシュを読まずに再取得して上書き")
+
+
+def from_args(args):
+    """コマンドライン引数からキャッシュを作成"""
+    return LLMCache(bypass=args.no_llm_cache, refresh=args.refresh_llm_cache)
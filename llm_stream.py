@@ -0,0 +1,129 @@
+import json
+import sys
+import threading
+import time
+
+import http_client
+
+
+class StreamError(Exception):
+    """ストリームの途中でエラーが返された"""
+
+
+class LivePrinter:
+    """受信したテキストを逐次表示する（最初の受信時に見出しを表示）"""
+    def __init__(self, header=None):
+        self.header = header    # 最初のテキストの前に呼ぶ関数
+        self.started = False    # 1文字でも表示したか
+
+    def __call__(self, text):
+        if not self.started:
+            if self.header:
+                self.header()
+            self.started = True
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def restart(self):
+        """再試行で最初から受信し直す場合の区切り"""
+        if self.started:
+            print("\n(再試行のため最初から表示し直します)")
+            self.started = False
+
+    def finish(self):
+        if self.started:
+            print()
+
+
+def iter_sse_data(response):
+    """
+    server-sent-eventsの data フィールドを順に返す
+
+    チャンクが届き次第処理するため、iter_linesのバッファリングを使わずに行へ分割する。
+    コメント行（": OPENROUTER PROCESSING" 等）は無視する。
+    """
+    buffer = b''
+    data_lines = []
+    for chunk in response.iter_content(chunk_size=None):
+        buffer += chunk
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            line = line.rstrip(b'\r')
+            if not line:
+                # 空行でイベントの区切り
+                if data_lines:
+                    yield b'\n'.join(data_lines).decode('utf-8')
+                    data_lines = []
+            elif line.startswith(b'data:'):
+                data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield b'\n'.join(data_lines).decode('utf-8')
+
+
+def stream_chat_completion(url, headers, payload, timeout=60, on_text=None, retries=None):
+    """
+    chat/completions をストリーミングで呼び出し、受信しながら本文を組み立てる
+
+    Args:
+        url (str): chat/completions のURL
+        headers (dict): リクエストヘッダー
+        payload (dict): リクエストボディ（"stream": True を付けて送信する）
+        timeout (float): タイムアウト秒数（受信の間隔に対して適用）
+        on_text (callable): テキストを受信するたびに呼ぶ関数
+        retries (int): 応答開始前の429・5xx等の再試行回数（Noneなら既定値）
+
+    Returns:
+        tuple: (全文, 最初のトークンまでの秒数)
+    """
+    start = time.perf_counter()
+    response = http_client.post(url, headers=headers, json=dict(payload, stream=True),
+                                timeout=timeout, retries=retries, stream=True)
+    try:
+        response.raise_for_status()
+        parts = []
+        ttft = None
+        for data in iter_sse_data(response):
+            if data == '[DONE]':
+                break
+            event = json.loads(data)
+            if 'error' in event:
+                raise StreamError(event['error'].get('message', event['error']))
+            choices = event.get('choices') or []
+            text = (choices[0].get('delta') or {}).get('content') if choices else None
+            if not text:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            parts.append(text)
+            if on_text:
+                on_text(text)
+        return ''.join(parts), ttft
+    finally:
+        response.close()
+
+
+class LatencyLog:
+    """LLM呼び出しごとの最初のトークンまでの時間と全体の時間を記録する"""
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, label, total, ttft=None):
+        with self._lock:
+            self.records.append({'label': label, 'ttft': ttft, 'total': total})
+
+    def print_stats(self):
+        """呼び出しごとのレイテンシを表示"""
+        print("\n=== LLMレイテンシ ===")
+        if not self.records:
+            print("LLM呼び出しなし")
+            return
+        for record in self.records:
+            ttft = f"{record['ttft']:.2f}秒" if record['ttft'] is not None else "-"
+            print(f"{record['label']}: 最初のトークン {ttft} / 全体 {record['total']:.2f}秒")
+        totals = [r['total'] for r in self.records]
+        ttfts = [r['ttft'] for r in self.records if r['ttft'] is not None]
+        line = f"平均: 全体 {sum(totals) / len(totals):.2f}秒"
+        if ttfts:
+            line += f" / 最初のトークン {sum(ttfts) / len(ttfts):.2f}秒"
+        print(line)
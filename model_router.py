@@ -0,0 +1,213 @@
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from token_budget import estimate_tokens
+
+# ルーティング設定（環境変数で変更可能）
+LATENCY_FILE = os.getenv("LLM_LATENCY_FILE", "model_latency.json")   # 実行をまたいで保存するレイテンシ
+HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))              # ヘッジを送るまでの秒数（0ならp95）
+HEDGE_P50_MULTIPLIER = 3.0  # p95がp50のこの倍数より長ければ、ヘッジはp50のこの倍数で送る
+COLD_HEDGE_AFTER = 10.0     # レイテンシの記録がないモデルでヘッジを送るまでの秒数
+MIN_HEDGE_AFTER = 1.0       # ヘッジを送るまでの最短秒数
+WINDOW = 50                 # モデル・サイズ区分ごとに保持する直近のレイテンシ数
+MIN_SAMPLES = 3             # これ未満のモデルは未計測として優先的に試す
+HEDGE_WORKERS = 8
+
+# プロンプトのサイズ区分（推定トークン数の上限, 名前）
+SIZE_CLASSES = [(1000, 'small'), (3000, 'medium'), (None, 'large')]
+
+
+def size_class(payload):
+    """chat/completions のリクエストボディからプロンプトのサイズ区分を決める"""
+    tokens = sum(estimate_tokens(message['content']) for message in payload['messages'])
+    for limit, name in SIZE_CLASSES:
+        if limit is None or tokens < limit:
+            return name
+
+
+def percentile(values, q):
+    """最近傍法のパーセンタイル"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class ModelRouter:
+    """
+    モデル・プロンプトサイズごとの直近のレイテンシからモデルを選び、遅い呼び出しにはヘッジを送る
+
+    レイテンシはJSONファイルに保存し、次回の実行では記録済みの値から選択を始める。
+    """
+    def __init__(self, path=LATENCY_FILE, hedge_after=HEDGE_AFTER, hedge=True):
+        self.path = path
+        self.hedge_after = hedge_after
+        self.hedge = hedge
+        self.samples = self._load()   # "モデル|サイズ区分" -> 直近のレイテンシ（秒）
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+        self.stats = {
+            'calls': 0,
+            'hedged': 0,        # ヘッジを送った呼び出し
+            'hedge_won': 0,     # ヘッジ側の応答を採用した呼び出し
+            'latencies': [],    # 呼び出しごとの応答までの時間（ヘッジ込み）
+        }
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {key: entry['samples'] for key, entry in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def save(self):
+        """レイテンシを保存（p50/p95も確認用に書き出す）"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                key: {'samples': samples, 'p50': percentile(samples, 50), 'p95': percentile(samples, 95)}
+                for key, samples in self.samples.items() if samples
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def record(self, model, size, latency):
+        with self._lock:
+            samples = self.samples.setdefault(f"{model}|{size}", [])
+            samples.append(round(latency, 3))
+            del samples[:-WINDOW]
+
+    def percentiles(self, model, size):
+        """
+        直近のレイテンシのp50/p95
+
+        Returns:
+            tuple: (p50, p95)。記録が MIN_SAMPLES 件未満なら (None, None)
+        """
+        with self._lock:
+            samples = list(self.samples.get(f"{model}|{size}", ()))
+        if len(samples) < MIN_SAMPLES:
+            return None, None
+        return percentile(samples, 50), percentile(samples, 95)
+
+    def rank(self, models, payload):
+        """
+        モデルを速い順に並べる
+
+        未計測のモデルは計測のため先に試し、計測済みのモデルはp50の小さい順、同じなら指定順とする。
+
+        Args:
+            models (list): 候補のモデル名（優先順）
+            payload (dict): リクエストボディ（サイズ区分の判定用）
+
+        Returns:
+            list: 並べ替えたモデル名
+        """
+        size = size_class(payload)
+        keyed = []
+        for index, model in enumerate(models):
+            p50, _ = self.percentiles(model, size)
+            keyed.append((p50 is not None, p50 or 0.0, index, model))
+        return [model for *_, model in sorted(keyed)]
+
+    def _hedge_delay(self, model, size):
+        if self.hedge_after > 0:
+            return self.hedge_after
+        p50, p95 = self.percentiles(model, size)
+        if p95 is None:
+            return COLD_HEDGE_AFTER
+        # テールが頻繁な場合はp95自体が長くなるため、p50の倍数でも打ち切る
+        return max(MIN_HEDGE_AFTER, min(p95, HEDGE_P50_MULTIPLIER * p50))
+
+    def _timed(self, request, model, size, breakers):
+        # 1回の呼び出し（ヘッジで不採用になった側も記録する）
+        start = time.perf_counter()
+        try:
+            result = request(model)
+        except Exception:
+            breakers.get(model).record_failure()
+            raise
+        breakers.get(model).record_success()
+        self.record(model, size, time.perf_counter() - start)
+        return result
+
+    def call(self, primary, backups, payload, request, breakers):
+        """
+        primary に送り、応答がヘッジの待ち時間を超えたら backups の最初の利用可能なモデルにも送る
+
+        先に成功した応答を採用する。不採用側の呼び出しは裏で完了させ、レイテンシだけ記録する。
+        成功・失敗はサーキットブレーカーに記録する。
+
+        Args:
+            primary (str): 最初に送るモデル（breakers.select で選んだもの）
+            backups (list): ヘッジ先の候補（速い順）
+            payload (dict): リクエストボディ（サイズ区分の判定用）
+            request (callable): モデル名を受け取って応答本文を返す関数
+            breakers (ModelBreakers): モデルごとのサーキットブレーカー
+
+        Returns:
+            tuple: (応答本文, 応答したモデル)
+        """
+        size = size_class(payload)
+        start = time.perf_counter()
+        futures = {self._pool.submit(self._timed, request, primary, size, breakers): primary}
+        hedged = False
+        first_error = None
+
+        done, _ = wait(futures, timeout=self._hedge_delay(primary, size) if self.hedge and backups else None)
+        if not done:
+            backup = next((model for model in backups if breakers.get(model).allow()), None)
+            if backup is not None:
+                futures[self._pool.submit(self._timed, request, backup, size, breakers)] = backup
+                hedged = True
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    first_error = first_error or future.exception()
+                    continue
+                model = futures[future]
+                self._count(time.perf_counter() - start, hedged, hedge_won=(model != primary))
+                return future.result(), model
+
+        self._count(time.perf_counter() - start, hedged, hedge_won=False)
+        raise first_error
+
+    def _count(self, latency, hedged, hedge_won):
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['hedged'] += int(hedged)
+            self.stats['hedge_won'] += int(hedge_won)
+            self.stats['latencies'].append(latency)
+
+    def print_stats(self):
+        """モデル・サイズ区分ごとのp50/p95とヘッジの統計を表示"""
+        print("\n=== LLMモデルルーティング ===")
+        with self._lock:
+            keys = sorted(self.samples)
+            latencies = list(self.stats['latencies'])
+        for key in keys:
+            model, size = key.split('|')
+            p50, p95 = self.percentiles(model, size)
+            if p50 is None:
+                print(f"{model} [{size}]: 計測中（{len(self.samples[key])}件）")
+            else:
+                print(f"{model} [{size}]: p50 {p50:.2f}秒 / p95 {p95:.2f}秒（{len(self.samples[key])}件）")
+        if latencies:
+            print(f"呼び出し: {self.stats['calls']}件 / ヘッジ送信: {self.stats['hedged']}件 / "
+                  f"ヘッジ採用: {self.stats['hedge_won']}件 / "
+                  f"p50 {percentile(latencies, 50):.2f}秒 / p95 {percentile(latencies, 95):.2f}秒")
+
+    def close(self):
+        """レイテンシを保存し、不採用側の呼び出しの完了を待たずに終了する"""
+        self.save()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,256 @@
+import hashlib
+import re
+import threading
+from urllib.parse import urlparse
+
+# 重複判定の設定
+TITLE_SHINGLE_SIZE = 4      # タイトルのシングル（連続する文字数）
+SNIPPET_SHINGLE_SIZE = 3    # スニペットのシングル（連続する単語数）
+MIN_SNIPPET_WORDS = 8       # これより短いスニペットは比較しない
+NUM_PERM = 64               # MinHashの関数数
+LSH_BANDS = 32              # LSHのバンド数（NUM_PERM / LSH_BANDS 行ずつ）
+TITLE_THRESHOLD = 0.5       # タイトルの推定Jaccard類似度がこれ以上なら近似重複
+SNIPPET_THRESHOLD = 0.6     # スニペットの推定Jaccard類似度がこれ以上なら近似重複
+
+DEDUP_MODES = ('reference', 'assign', 'off')
+# reference: 2つ目以降のクエリではタイトルのみの参照として残す
+# assign:    最初に取得したクエリにのみ割り当て、以降のクエリからは除外する
+# off:       重複除去を行わない
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+_SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{2,40}$')
+
+
+def _permutations():
+    # 固定シードの (a, b) 組（実行ごとに同じ署名になるようにする）
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.sha256(f"minhash-{i}".encode('utf-8')).digest()
+        a = int.from_bytes(digest[:8], 'big') % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:16], 'big') % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+
+_PERMUTATIONS = _permutations()
+
+
+def normalize_link(link):
+    """クエリ文字列・フラグメント・末尾のスラッシュを除いたリンク"""
+    if not link:
+        return ""
+    parsed = urlparse(link)
+    return f"{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+
+
+def normalize_title(title):
+    """末尾の「 - 媒体名」・記号・大文字小文字の違いを除いたタイトル"""
+    title = _SOURCE_SUFFIX.sub('', title or '')
+    return " ".join(_WORD_PATTERN.findall(title.lower()))
+
+
+def article_keys(item):
+    """記事の指紋（正規化したリンク・タイトルのハッシュ）"""
+    keys = []
+    link = normalize_link(item.get('link'))
+    if link:
+        keys.append('link:' + hashlib.sha1(link.encode('utf-8')).hexdigest())
+    title = normalize_title(item.get('title'))
+    if title:
+        keys.append('title:' + hashlib.sha1(title.encode('utf-8')).hexdigest())
+    return keys
+
+
+def title_shingles(title):
+    """タイトルの文字単位のシングル集合（言い換え・語順の小さな違いに強い）"""
+    text = normalize_title(title)
+    if len(text) < TITLE_SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + TITLE_SHINGLE_SIZE] for i in range(len(text) - TITLE_SHINGLE_SIZE + 1)}
+
+
+def snippet_shingles(snippet):
+    """スニペットの単語単位のシングル集合（短いスニペットは空集合）"""
+    words = _WORD_PATTERN.findall((snippet or '').lower())
+    if len(words) < MIN_SNIPPET_WORDS:
+        return set()
+    return {" ".join(words[i:i + SNIPPET_SHINGLE_SIZE]) for i in range(len(words) - SNIPPET_SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """シングル集合のMinHash署名"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big')
+              for s in shingle_set]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _MERSENNE_PRIME & _MAX_HASH for h in hashes)
+                 for a, b in _PERMUTATIONS)
+
+
+def estimate_similarity(sig1, sig2):
+    """MinHash署名からJaccard類似度を推定"""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / NUM_PERM
+
+
+def estimate_tokens(text):
+    """プロンプトのトークン数の概算（英文で約4文字/トークン）"""
+    return len(text) // 4
+
+
+def format_news_text(news_data):
+    """LLMに渡すニュース一覧テキストを作成（参照のみの記事は末尾に1行ずつまとめ、空のスニペットは省く）"""
+    blocks = [
+        f"Date: {item['date']}\nTitle: {item['title']}\nSource: {item['source']}\n"
+        + (f"Snippet: {item['snippet']}\n" if item['snippet'] else "") + "---"
+        for item in news_data if not item.get('shared_with')
+    ]
+    references = [f"- {item['title']} ({item['source']})" for item in news_data if item.get('shared_with')]
+    if references:
+        blocks.append("Related headlines (covered in detail under other queries):\n" + "\n".join(references))
+    return "\n".join(blocks)
+
+
+class NewsDeduplicator:
+    """1回の実行内でクエリをまたいだ記事の重複（完全一致・近似）を除去する"""
+    def __init__(self, mode='reference', title_threshold=TITLE_THRESHOLD, snippet_threshold=SNIPPET_THRESHOLD):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"不明な重複除去モード: {mode}")
+        self.mode = mode
+        self.thresholds = {'title': title_threshold, 'snippet': snippet_threshold}
+        self._rows_per_band = NUM_PERM // LSH_BANDS
+        self._links = {}       # 正規化リンク -> 記事ID
+        self._titles = {}      # 正規化タイトル -> 記事ID
+        self._buckets = {}     # (項目, バンド番号, バンド値) -> [記事ID]
+        self._signatures = []  # 記事ID -> {'title': 署名, 'snippet': 署名}
+        self._owners = []      # 記事ID -> 最初に取得したクエリ
+        self._restored = {}    # 再開前に分析済みの記事の指紋（article_keys） -> クエリ
+        self._lock = threading.Lock()
+        self.stats = {
+            'articles': 0,        # 入力記事数
+            'exact': 0,           # リンク・タイトルの完全一致
+            'near': 0,            # MinHashによる近似重複
+            'referenced': 0,      # 参照として残した記事
+            'removed': 0,         # 除外した記事
+            'tokens_before': 0,
+            'tokens_after': 0,
+        }
+
+    def _bands(self, field, signature):
+        rows = self._rows_per_band
+        return [(field, band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+    def _find(self, link_key, title_key, signatures):
+        """既出の記事IDと重複の種類を返す（なければ (None, None)）"""
+        if link_key and link_key in self._links:
+            return self._links[link_key], 'exact'
+        if title_key and title_key in self._titles:
+            return self._titles[title_key], 'exact'
+
+        # LSHで候補を絞り、タイトル・スニペットのいずれかが閾値以上なら近似重複
+        for field, signature in signatures.items():
+            if signature is None:
+                continue
+            candidates = set()
+            for band in self._bands(field, signature):
+                candidates.update(self._buckets.get(band, ()))
+            for article_id in sorted(candidates):
+                other = self._signatures[article_id][field]
+                if estimate_similarity(signature, other) >= self.thresholds[field]:
+                    return article_id, 'near'
+        return None, None
+
+    def _add(self, query, link_key, title_key, signatures):
+        article_id = len(self._owners)
+        self._owners.append(query)
+        self._signatures.append(signatures)
+        if link_key:
+            self._links[link_key] = article_id
+        if title_key:
+            self._titles[title_key] = article_id
+        for field, signature in signatures.items():
+            if signature is not None:
+                for band in self._bands(field, signature):
+                    self._buckets.setdefault(band, []).append(article_id)
+
+    def restore(self, query, fingerprints):
+        """
+        再開前の実行でクエリが取得した記事を既出として登録する（run_journal.py から）
+
+        指紋はハッシュのため完全一致のみ判定し、一致した記事を改めて登録して以降の近似重複の判定に使う。
+
+        Args:
+            query (str): 記事を取得したクエリ
+            fingerprints (list): 記事ごとの article_keys のリスト
+        """
+        with self._lock:
+            for keys in fingerprints:
+                for key in keys:
+                    self._restored.setdefault(key, query)
+
+    def process(self, query, news_data):
+        """
+        クエリの検索結果から既出の記事を除去・参照化する
+
+        同じクエリ内の重複は常に除外する。別のクエリで既出の記事は、referenceモードでは
+        スニペットを省いた参照として残し、assignモードでは除外する。
+        スレッドセーフだが、記事の割り当て先はprocessを呼んだ順序で決まる。
+
+        Args:
+            query (str): 検索クエリ
+            news_data (list): search_google_news_single の結果
+
+        Returns:
+            list: 重複除去後の記事リスト（参照には 'shared_with' キーが付く）
+        """
+        if self.mode == 'off' or not news_data:
+            return news_data
+
+        with self._lock:
+            result = []
+            for item in news_data:
+                link_key = normalize_link(item.get('link'))
+                title_key = normalize_title(item.get('title'))
+                signatures = {
+                    'title': minhash(title_shingles(item.get('title'))),
+                    'snippet': minhash(snippet_shingles(item.get('snippet'))),
+                }
+
+                article_id, kind = self._find(link_key, title_key, signatures)
+                if article_id is None and self._restored:
+                    owner = next((self._restored[key] for key in article_keys(item) if key in self._restored), None)
+                    if owner is not None:
+                        self._add(owner, link_key, title_key, signatures)
+                        article_id, kind = len(self._owners) - 1, 'exact'
+                if article_id is None:
+                    self._add(query, link_key, title_key, signatures)
+                    result.append(item)
+                    continue
+
+                self.stats[kind] += 1
+                owner = self._owners[article_id]
+                if owner != query and self.mode == 'reference':
+                    self.stats['referenced'] += 1
+                    result.append(dict(item, shared_with=owner))
+                else:
+                    self.stats['removed'] += 1
+
+            self.stats['articles'] += len(news_data)
+            self.stats['tokens_before'] += estimate_tokens(format_news_text(news_data))
+            self.stats['tokens_after'] += estimate_tokens(format_news_text(result))
+        return result
+
+    def print_stats(self):
+        """重複除去の統計を表示"""
+        print("\n=== 記事の重複除去 ===")
+        if self.mode == 'off':
+            print("重複除去なし（--dedup off）")
+            return
+        saved = self.stats['tokens_before'] - self.stats['tokens_after']
+        rate = saved / self.stats['tokens_before'] * 100 if self.stats['tokens_before'] else 0.0
+        print(f"記事数: {self.stats['articles']}件")
+        print(f"重複: 完全一致 {self.stats['exact']}件 / 近似 {self.stats['near']}件")
+        print(f"参照化: {self.stats['referenced']}件 / 除外: {self.stats['removed']}件")
+        print(f"ニュース部分のトークン数(概算): {self.stats['tokens_before']} → {self.stats['tokens_after']} "
+              f"({saved}トークン削減, {rate:.1f}%)")
@@ -0,0 +1,1136 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from colorama import Fore, Style, init
+
+import circuit_breaker
+import http_client
+import llm_cache
+import llm_stream
+import model_router
+import news_dedup
+import news_extract
+import news_feed
+import news_pipeline
+import relevance
+import run_journal
+import seen_store
+import sentiment_store
+import structured_analysis
+import summary_digest
+import token_budget
+import topic_cluster
+
+# カラー出力の初期化
+init(autoreset=True)
+
+# 接続先（スタンドインサーバー等に向ける場合は環境変数で上書き）
+GOOGLE_NEWS_BASE_URL = os.getenv("GOOGLE_NEWS_BASE_URL", "https://news.google.com").rstrip('/')
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip('/')
+
+# ホストごとの初期レート（リクエスト/秒、429・Retry-After付きの応答・CAPTCHAで自動的に下げ、成功で戻す）
+NEWS_SEARCH_RATE = float(os.getenv("NEWS_SEARCH_RATE", "0.3"))    # Google News検索
+# Google Newsのレート制限をかけるパス（同じホストの他のパス・スタンドインサーバーのファンド取得は対象外）
+NEWS_SEARCH_PATHS = ("/search", news_feed.FEED_PATH)
+LLM_REQUEST_RATE = float(os.getenv("LLM_REQUEST_RATE", "1.0"))    # OpenRouter
+
+# 適応レート制限の導入前の固定待機（待機時間の比較表示用）
+FIXED_QUERY_WAIT = 10.0         # リアルタイム実行のクエリ間（8〜12秒の平均）
+FIXED_SEARCH_INTERVAL = 3.0     # パイプライン実行の検索間隔（2〜4秒の平均）
+
+# 分析設定（カテゴリ・クエリ・プロンプト・モデル・依存関係）のディレクトリ
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_configs')
+
+
+class ConfigError(ValueError):
+    """分析設定の内容が不正"""
+
+
+def _env_models(name, default):
+    # カンマ区切りの環境変数があれば設定ファイルのモデルより優先する
+    value = os.getenv(name)
+    return value.split(',') if value else list(default)
+
+
+def load_config(path):
+    """
+    分析設定（JSON）を読み込み、プロンプトのテンプレートを展開して検証する
+
+    プロンプトのパスは設定ファイルからの相対パス。モデルは環境変数 LLM_ANALYSIS_MODELS /
+    LLM_SUMMARY_MODELS（カンマ区切り）で上書きできる。
+
+    Args:
+        path (str): 設定ファイルのパス
+
+    Returns:
+        dict: 設定（categories の各要素に 'template'、summary に 'template' を追加）
+
+    Raises:
+        ConfigError: 必須項目の欠落・未定義のカテゴリへの依存・循環依存
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def read_template(relative_path):
+        with open(os.path.join(base_dir, relative_path), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    try:
+        config['models'] = {
+            'analysis': _env_models("LLM_ANALYSIS_MODELS", config['models']['analysis']),
+            'summary': _env_models("LLM_SUMMARY_MODELS", config['models']['summary']),
+        }
+        names = set()
+        for category in config['categories']:
+            name = category['name']
+            if name in names:
+                raise ConfigError(f"カテゴリ名が重複しています: {name}")
+            names.add(name)
+            category['template'] = read_template(category['prompt'])
+            category.setdefault('title', name)
+            category.setdefault('label', name)
+            category.setdefault('results_attr', f"{name}_results")
+            category.setdefault('stats_label', f"{category['label']}クエリ")
+            category.setdefault('depends_on', [])
+            category.setdefault('disabled_queries', [])
+            category.setdefault('relevance', {})
+            category.setdefault('weight', 1.0)     # 構造化モードの総合スコアでの重み
+        summary = config['summary']
+        summary['template'] = read_template(summary['prompt'])
+        summary.setdefault('inputs', [category['name'] for category in config['categories']])
+    except KeyError as e:
+        raise ConfigError(f"{path}: 必須項目がありません: {e}") from None
+
+    unknown = [name for name in summary['inputs'] if name not in names]
+    if unknown:
+        raise ConfigError(f"{path}: 最終統合分析の入力が未定義のカテゴリです: {', '.join(unknown)}")
+    schedule(config['categories'])
+    return config
+
+
+def schedule(categories):
+    """
+    カテゴリの依存関係から実行する段を決める
+
+    依存先がすべて前の段にあるカテゴリを同じ段にまとめる（段内は設定ファイルの順）。
+
+    Args:
+        categories (list): 'name' と 'depends_on' を持つカテゴリ設定
+
+    Returns:
+        list: 段ごとのカテゴリ設定のリスト
+
+    Raises:
+        ConfigError: 未定義のカテゴリへの依存・循環依存
+    """
+    names = {category['name'] for category in categories}
+    for category in categories:
+        unknown = [name for name in category['depends_on'] if name not in names]
+        if unknown:
+            raise ConfigError(f"{category['name']}: 未定義のカテゴリに依存しています: {', '.join(unknown)}")
+
+    stages = []
+    done = set()
+    remaining = list(categories)
+    while remaining:
+        ready = [category for category in remaining if set(category['depends_on']) <= done]
+        if not ready:
+            raise ConfigError("カテゴリの依存関係が循環しています: "
+                              + ", ".join(category['name'] for category in remaining))
+        stages.append(ready)
+        done.update(category['name'] for category in ready)
+        remaining = [category for category in remaining if category['name'] not in done]
+    return stages
+
+
+class NewsAnalysisEngine:
+    """
+    分析設定に従ってニュースを検索・分析し、最終統合分析を行う
+
+    カテゴリは依存関係の段ごとに実行し、パイプライン実行時は同じ段のカテゴリを並行に処理する。
+    カテゴリごとの分析結果は設定の results_attr の属性（例: global_analysis_results）でも参照できる。
+    """
+    def __init__(self, config, openrouter_api_key, pipelined=False, cache=None, dedup_mode='reference',
+                 incremental=False, seen_db=seen_store.SEEN_DB, stream=False,
+                 budget=None, relevance_cutoff=relevance.RELEVANCE_CUTOFF,
+                 breakers=None, router=None, digester=None, all_queries=False,
+                 journal_dir=run_journal.JOURNAL_DIR, resume=False, structured=False, narrative=False,
+                 sentiment_db=sentiment_store.SENTIMENT_DB, topics=None,
+                 news_source=news_feed.NEWS_SOURCE):
+        self.config = config if isinstance(config, dict) else load_config(config)
+        self.categories = {category['name']: category for category in self.config['categories']}
+        self.openrouter_api_key = openrouter_api_key
+        self.base_url = OPENROUTER_BASE_URL
+        self.pipelined = pipelined  # 検索とLLM分析を並行実行するか
+        self.all_queries = all_queries  # 設定で無効にしているクエリも実行するか
+        self.structured = structured  # クエリ分析をJSONで受け取り、総合スコアをローカルで集計するか
+        self.narrative = narrative  # 構造化モードでも最終統合分析（LLM）の文章を作成するか
+        self.structured_summary = None  # 構造化モードの集計結果（structured_analysis.aggregate）
+        self.llm_cache = cache if cache is not None else llm_cache.LLMCache()  # LLM応答キャッシュ
+        self.deduplicator = news_dedup.NewsDeduplicator(dedup_mode)  # クエリ間の記事重複除去
+        # 差分実行用の分析済み記事（構造化・自由記述の分析結果は混ぜない）
+        self.seen_store = seen_store.SeenStore(
+            seen_db, self.config['name'], mode='structured' if structured else 'freeform'
+        ) if incremental else None
+        # 日次センチメント指数の保存先（bandwalk_core_impl が日付で結合して表示、None で保存しない）
+        self.sentiment_store = sentiment_store.SentimentStore(sentiment_db) if sentiment_db else None
+        self.stream = stream  # LLM応答をストリーミングで受信するか
+        self.llm_latency = llm_stream.LatencyLog()  # LLM呼び出しごとのレイテンシ
+        self.breakers = breakers if breakers is not None else circuit_breaker.ModelBreakers()  # モデルごとのサーキットブレーカー
+        self.router = router if router is not None else model_router.ModelRouter()  # レイテンシに基づくモデル選択
+        self.token_budget = budget if budget is not None else token_budget.TokenBudget()  # プロンプトのトークン予算
+        self.digester = digester if digester is not None else summary_digest.CategoryDigester()  # 最終統合分析前のカテゴリ要約
+        self.topics = topics  # クエリごとではなくトピックごとにLLM分析する場合の TopicClusterer
+        self.news_source = news_source  # 記事の取得元（html: 検索ページ / rss: RSS検索フィード）
+        self.extractor = news_extract.NewsExtractor()  # 検索結果ページからの記事抽出
+        self.feed_reader = news_feed.FeedReader()  # RSS検索フィードの解析
+        self.target_companies = self.config.get('target_companies', [])
+        # 関連度フィルタのキーワード（カテゴリごと、対象企業名・指数名は重み付きで追加）
+        profiles = {}
+        for name, category in self.categories.items():
+            keywords = category['relevance'].get('keywords', [])
+            boosted = list(category['relevance'].get('boosted', []))
+            if category['relevance'].get('boost_target_companies'):
+                boosted = relevance.company_terms(self.target_companies) + boosted
+            profiles[name] = relevance.build_profile(relevance.MARKET_KEYWORDS + keywords, boosted=boosted)
+        self.relevance_filter = relevance.RelevanceFilter(profiles, cutoff=relevance_cutoff)
+        # カテゴリごとの分析結果（results_attr の属性と同じリスト）
+        self.results = {}
+        for name, category in self.categories.items():
+            self.results[name] = []
+            setattr(self, category['results_attr'], self.results[name])
+        # 検索・LLMの開始間隔は適応レート制限に任せる（ニュースは検索ページ・フィードのパスのみ）
+        for path in NEWS_SEARCH_PATHS:
+            http_client.SHARED_CLIENT.limiter.configure(f"{GOOGLE_NEWS_BASE_URL}{path}", NEWS_SEARCH_RATE)
+        http_client.SHARED_CLIENT.limiter.configure(self.base_url, LLM_REQUEST_RATE)
+        self.fixed_wait = 0.0   # 従来の固定スケジュールで待機していた秒数（比較表示用）
+        # 完了したクエリの分析結果を記録し、同じ日・同じ設定で中断した実行を再開する（journal_dir=None で記録しない）
+        self.journal = run_journal.RunJournal(
+            run_journal.journal_path(self.config, self.journal_options(), directory=journal_dir), resume=resume
+        ) if journal_dir else None
+
+    def journal_options(self):
+        """実行ジャーナルの再開可否を決める、分析結果に影響するオプション"""
+        return {
+            'dedup': self.deduplicator.mode,
+            'all_queries': self.all_queries,
+            'incremental': self.seen_store is not None,
+            'relevance_cutoff': self.relevance_filter.cutoff,
+            'news_budget': self.token_budget.news_budget,
+            'structured': self.structured,
+            'topics': self.topics.max_clusters if self.topics is not None else None,
+            'news_source': self.news_source,
+        }
+
+    def colored_print(self, text, color=Fore.WHITE, style=Style.NORMAL):
+        """カラー出力用のヘルパー関数"""
+        print(f"{style}{color}{text}{Style.RESET_ALL}")
+        
+    def search_google_news_single(self, query, max_results=25):
+        """単一クエリでGoogle Newsから記事を取得"""
+        if self.news_source == 'rss':
+            return self.search_google_news_feed(query, max_results=max_results)
+        
+        # User-Agent等の共通ヘッダーは http_client で付与
+        headers = {
+            'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
+            'DNT': '1',
+            'Upgrade-Insecure-Requests': '1',
+        }
+        
+        base_url = f"{GOOGLE_NEWS_BASE_URL}/search"
+        params = {
+            'q': query,
+            'hl': 'en-US',
+            'gl': 'US',
+            'ceid': 'US:en'
+        }
+        
+        try:
+            self.colored_print(f"🔍 検索実行: \"{query}\"", Fore.CYAN, Style.BRIGHT)
+            response = http_client.get(base_url, params=params, headers=headers, timeout=20)
+            response.raise_for_status()
+            
+            # ページは1回だけ解析し、記事ごとに全項目を取得（項目ごとに一致したセレクタを記憶）
+            found, articles = self.extractor.extract(response.text, max_results=max_results)
+            
+            self.colored_print(f"📰 発見された記事数: {found}", Fore.YELLOW)
+            
+            news_items = []
+            one_week_ago = datetime.now() - timedelta(days=7)
+            
+            for i, article in enumerate(articles):
+                try:
+                    time_text = article['time']
+                    
+                    # 日付推定
+                    estimated_date = self._estimate_date_from_time_text(time_text)
+                    
+                    # 1週間以内かチェック
+                    if estimated_date and estimated_date < one_week_ago:
+                        continue
+                    
+                    news_item = {
+                        'title': article['title'],
+                        'link': article['link'],
+                        'source': article['source'],
+                        'time': time_text,
+                        'snippet': article['snippet'],
+                        'date': estimated_date.strftime('%Y/%m/%d') if estimated_date else 'Unknown',
+                        'query': query
+                    }
+                    
+                    news_items.append(news_item)
+                    
+                except Exception as e:
+                    self.colored_print(f"記事{i+1}の処理エラー: {e}", Fore.RED)
+                    continue
+            
+            self._print_found_news(news_items)
+            return news_items
+            
+        except requests.exceptions.RequestException as e:
+            self.colored_print(f"❌ リクエストエラー: {e}", Fore.RED)
+            return []
+        except Exception as e:
+            self.colored_print(f"❌ 予期せぬエラー: {e}", Fore.RED)
+            return []
+
+    def search_google_news_feed(self, query, max_results=25):
+        """
+        単一クエリでGoogle NewsのRSS検索フィードから記事を取得
+
+        検索ページより軽量で、公開日時は推定ではなくフィードの値を使う。
+        記事は search_google_news_single と同じ形式で返す。
+        """
+        headers = {
+            'Accept': news_feed.FEED_ACCEPT,
+            'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
+        }
+        params = {
+            'q': query,
+            'hl': 'en-US',
+            'gl': 'US',
+            'ceid': 'US:en'
+        }
+        
+        try:
+            self.colored_print(f"🔍 検索実行（RSS）: \"{query}\"", Fore.CYAN, Style.BRIGHT)
+            response = http_client.get(f"{GOOGLE_NEWS_BASE_URL}{news_feed.FEED_PATH}", params=params,
+                                       headers=headers, timeout=20, stream=True)
+            with response:
+                response.raise_for_status()
+                entries = self.feed_reader.read(response, max_results=max_results)
+            
+            self.colored_print(f"📰 発見された記事数: {len(entries)}", Fore.YELLOW)
+            
+            one_week_ago = datetime.now() - timedelta(days=7)
+            news_items = []
+            for entry in entries:
+                if not entry['title']:
+                    continue
+                # 1週間以内かチェック（公開日時はフィードの値）
+                if entry['published'] and entry['published'].astimezone().replace(tzinfo=None) < one_week_ago:
+                    continue
+                news_items.append(news_feed.to_news_item(entry, query))
+            
+            self._print_found_news(news_items)
+            return news_items
+            
+        except requests.exceptions.RequestException as e:
+            self.colored_print(f"❌ リクエストエラー: {e}", Fore.RED)
+            return []
+        except Exception as e:
+            self.colored_print(f"❌ 予期せぬエラー: {e}", Fore.RED)
+            return []
+
+    def _print_found_news(self, news_items):
+        """取得した記事の件数と最初の3件を表示"""
+        self.colored_print(f"✅ 取得完了: {len(news_items)}件の記事", Fore.GREEN)
+        
+        for i, item in enumerate(news_items[:3], 1):
+            self.colored_print(f"  {i}. {item['title'][:70]}...", Fore.WHITE)
+            self.colored_print(f"    📅 {item['time']} | 🏢 {item['source']}", Fore.LIGHTBLACK_EX)
+        
+        if len(news_items) > 3:
+            self.colored_print(f"    ... 他 {len(news_items) - 3} 件", Fore.LIGHTBLACK_EX)
+
+    def _estimate_date_from_time_text(self, time_text):
+        """時間テキストから日付を推定"""
+        if not time_text or time_text == "Unknown":
+            return datetime.now()
+        
+        now = datetime.now()
+        time_text_lower = time_text.lower()
+        
+        try:
+            # 分単位
+            if 'minute' in time_text_lower or 'min' in time_text_lower:
+                minutes = re.search(r'(\d+)', time_text)
+                if minutes:
+                    return now - timedelta(minutes=int(minutes.group(1)))
+            
+            # 時間単位
+            elif 'hour' in time_text_lower:
+                hours = re.search(r'(\d+)', time_text)
+                if hours:
+                    return now - timedelta(hours=int(hours.group(1)))
+            
+            # 日単位
+            elif 'day' in time_text_lower or 'yesterday' in time_text_lower:
+                if 'yesterday' in time_text_lower:
+                    return now - timedelta(days=1)
+                days = re.search(r'(\d+)', time_text)
+                if days:
+                    return now - timedelta(days=int(days.group(1)))
+            
+            # 週単位
+            elif 'week' in time_text_lower:
+                weeks = re.search(r'(\d+)', time_text)
+                if weeks:
+                    return now - timedelta(weeks=int(weeks.group(1)))
+    
+        except Exception:
+            pass
+        
+        return now
+
+    def analyze_news(self, news_data, query, analysis_type, printer=None):
+        """ニュースを分析し、完了したクエリを実行ジャーナルに記録"""
+        result = self._analyze_news(news_data, query, analysis_type, printer=printer)
+        if result and self.journal is not None:
+            self.journal.record(analysis_type, query, result, news_data)
+        return result
+
+    def restore_query(self, analysis_type, query):
+        """
+        再開時、前回の実行で完了したクエリの分析結果を返す（記事は重複除去に既出として登録）
+
+        Returns:
+            dict: {'query', 'analysis', 'news_count'}。再開しない場合・未完了のクエリは None
+        """
+        if self.journal is None or not self.journal.resume:
+            return None
+        result = self.journal.restore(analysis_type, query)
+        if result is not None:
+            self.deduplicator.restore(query, self.journal.lookup(analysis_type, query)['fingerprints'])
+            self.colored_print(f"⏭️  完了済みのため省略: \"{query}\"", Fore.LIGHTBLACK_EX)
+        return result
+
+    def _analyze_news(self, news_data, query, analysis_type, printer=None):
+        """ニュースを分析（差分実行時は新着記事のみをLLMに送り、前回の分析を更新）"""
+        if self.seen_store is None:
+            return self.analyze_news_with_llm(news_data, query, analysis_type, printer=printer)
+        
+        previous, updated_at = self.seen_store.previous_analysis(query, analysis_type)
+        if previous is None:
+            # 前回の分析がなければ全件を分析
+            self.seen_store.count('new', len(news_data))
+            result = self.analyze_news_with_llm(news_data, query, analysis_type, printer=printer)
+            if result:
+                self.seen_store.save_analysis(query, analysis_type, result, news_data, full=True)
+                self.seen_store.count('full')
+            return result
+        
+        new_items, seen_items = self.seen_store.split_new(query, analysis_type, news_data)
+        if not new_items:
+            self.colored_print(f"♻️  新着記事なし: 前回の分析を再利用 (クエリ: {query})", Fore.CYAN)
+            self.seen_store.count('reused')
+            return previous
+        
+        self.colored_print(f"🆕 新着記事 {len(new_items)}件（分析済み {len(seen_items)}件）: 差分のみ分析 (クエリ: {query})", Fore.CYAN)
+        result = self.analyze_news_with_llm(new_items, query, analysis_type, previous=(previous, updated_at),
+                                            printer=printer)
+        if result:
+            self.seen_store.save_analysis(query, analysis_type, result, new_items)
+            self.seen_store.count('updated')
+        return result
+
+    def analyze_news_with_llm(self, news_data, query, analysis_type, previous=None, printer=None):
+        """
+        LLMを使用してニュースを分析（最大15回のリトライ機能付き）
+
+        previous に (前回の分析, 更新時刻) を渡すと、news_data を新着記事として前回の分析を更新する。
+        ストリーミング時は受信したテキストを printer（llm_stream.LivePrinter）で逐次表示する。
+        """
+        if not news_data:
+            return ""
+
+        today = datetime.now().strftime("%Y/%m/%d")
+        # 予算に収まるように記事を圧縮・選別（記録はテンプレートを含むプロンプト全体のトークン数）
+        def render(text):
+            return self.create_analysis_prompt(analysis_type, today, query, text)
+
+        news_text = news_dedup.format_news_text(self.token_budget.fit_news(query, news_data, render=render))
+
+        prompt = render(news_text)
+
+        if previous:
+            prompt = seen_store.build_update_prompt(prompt, *previous)
+
+        url = f"{self.base_url}/chat/completions"
+        
+        headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": self.config['http_referer'], # 任意ヘッダー
+            "X-Title": self.config['x_title']['analysis'], # 任意ヘッダー
+        }
+        
+        settings = self.config['analysis']
+        models = self.categories[analysis_type].get('models', self.config['models']['analysis'])
+        payload = {
+            "model": models[0],
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": settings['max_tokens'],
+            "temperature": settings['temperature']
+        }
+        if self.structured:
+            payload["response_format"] = {"type": "json_object"}
+
+        # 同じモデル・プロンプトの応答がキャッシュにあれば再利用（フォールバック先の応答も第一候補のモデルで保存）
+        cached_result = self.llm_cache.get(payload)
+        if cached_result is not None:
+            self.colored_print(f"💾 LLMキャッシュヒット (クエリ: {query})", Fore.CYAN)
+            return cached_result
+
+        def request(model):
+            # 空の応答も失敗として扱う
+            result = self._request_completion(url, headers, dict(payload, model=model), timeout=settings['timeout'], label=query,
+                                              printer=printer, retries=0)
+            if len(result.strip()) <= 0:
+                raise ValueError(result)
+            if self.structured:
+                # スキーマに合わない応答も失敗として扱い、再試行・フォールバックする
+                return structured_analysis.dump_analysis(structured_analysis.parse_analysis(result))
+            return result
+
+        max_retries = 15
+        for attempt in range(max_retries):
+            # 速い順に並べ、一時停止中（サーキットがオープン）のモデルは飛ばしてフォールバック先を使う
+            ranked = self.router.rank(models, payload)
+            model = self.breakers.select(ranked)
+            if model is None:
+                self.colored_print(f"❌ すべてのモデルが一時停止中のためLLM分析をスキップします (クエリ: {query})", Fore.RED, Style.BRIGHT)
+                return ""
+            breaker = self.breakers.get(model)
+            # 逐次表示中はヘッジを送らない（2つの応答が混ざるため）
+            backups = [] if printer is not None else [m for m in ranked if m != model]
+
+            try:
+                self.colored_print(f"🤖 LLM分析開始 (試行 {attempt + 1}/{max_retries}, モデル: {model}, クエリ: {query})", Fore.MAGENTA)
+                request_start = time.perf_counter()
+                result, answered_by = self.router.call(model, backups, payload, request, self.breakers)
+                self.llm_cache.put(payload, result, time.perf_counter() - request_start)
+
+                if answered_by != model:
+                    self.colored_print(f"🏁 ヘッジ先の {answered_by} の応答を採用 (クエリ: {query})", Fore.CYAN)
+                self.colored_print(f"✅ LLM分析完了 (クエリ: {query})", Fore.GREEN)
+                return result # 成功したら結果を返してループを抜ける
+
+            except Exception as e:
+                # 成功・失敗は router.call でサーキットブレーカーに記録済み
+                opened = breaker.state == circuit_breaker.OPEN
+
+                # 最後のリトライでも失敗した場合
+                if attempt + 1 == max_retries:
+                    self.colored_print(f"❌ LLM分析が{max_retries}回すべて失敗しました (クエリ: {query}): {e}", Fore.RED, Style.BRIGHT)
+                    return "" # 最終的に失敗したら空文字を返す
+
+                if printer is not None:
+                    printer.restart()
+                self.colored_print(f"⚠️  LLM分析エラー (試行 {attempt + 1}/{max_retries}, モデル: {model}): {e}", Fore.YELLOW)
+
+                if opened:
+                    # 連続して失敗したモデルは一時停止し、待たずに次のモデルで再試行
+                    self.colored_print(f"🔌 {model} を{breaker.cooldown:.0f}秒間停止します", Fore.YELLOW)
+                    continue
+
+                # 次のリトライまでの待機時間を計算 (Retry-Afterがあればそれに従い、なければ
+                # モデルごとの連続失敗数によるエクスポネンシャル・バックオフ + ジッター、最大60秒に制限)
+                sleep_time = http_client.retry_delay(breaker.failures - 1, getattr(e, 'response', None))
+                self.colored_print(f"⏳ {sleep_time:.1f}秒後に再試行します...", Fore.YELLOW)
+                time.sleep(sleep_time)
+        
+        # ループが正常に完了することは基本的にないが、念のため
+        return ""
+
+    def _complete_with_fallback(self, models, url, headers, payload, timeout, label, printer=None):
+        """
+        速い順・フォールバック順のモデルで chat/completions を呼び出す（一時停止中のモデルは飛ばす）
+
+        Args:
+            models (list): 優先順のモデル名
+            url (str): chat/completions のURL
+            headers (dict): リクエストヘッダー
+            payload (dict): リクエストボディ（model は順に置き換える）
+            timeout (float): タイムアウト秒数
+            label (str): レイテンシ記録用の名前
+            printer (LivePrinter): 逐次表示用（ストリーミング時のみ使用）
+
+        Returns:
+            str: 応答本文
+        """
+        ranked = self.router.rank(models, payload)
+        last_error = None
+        for model in ranked:
+            if not self.breakers.get(model).allow():
+                continue
+            # 逐次表示中はヘッジを送らない（2つの応答が混ざるため）
+            backups = [] if printer is not None else [m for m in ranked if m != model]
+            try:
+                result, _ = self.router.call(
+                    model, backups, payload,
+                    lambda m: self._request_completion(url, headers, dict(payload, model=m), timeout, label,
+                                                       printer=printer),
+                    self.breakers)
+            except Exception as e:
+                last_error = e
+                if printer is not None:
+                    printer.restart()
+                self.colored_print(f"⚠️  {model} の呼び出しに失敗しました: {e}", Fore.YELLOW)
+                continue
+            return result
+        raise last_error or circuit_breaker.CircuitOpenError("すべてのモデルが一時停止中です")
+
+    def _request_completion(self, url, headers, payload, timeout, label, printer=None, retries=None):
+        """
+        chat/completions を呼び出して本文を返し、レイテンシを記録する
+
+        ストリーミング時はSSEで受信しながら本文を組み立て、printerがあれば逐次表示する。
+
+        Args:
+            url (str): chat/completions のURL
+            headers (dict): リクエストヘッダー
+            payload (dict): リクエストボディ
+            timeout (float): タイムアウト秒数
+            label (str): レイテンシ記録用の名前
+            printer (LivePrinter): 逐次表示用（ストリーミング時のみ使用）
+            retries (int): HTTPクライアントでの再試行回数（Noneなら既定値）
+
+        Returns:
+            str: 応答本文
+        """
+        request_start = time.perf_counter()
+        if self.stream:
+            result, ttft = llm_stream.stream_chat_completion(url, headers, payload, timeout=timeout,
+                                                             on_text=printer, retries=retries)
+        else:
+            response = http_client.post(url, headers=headers, json=payload, timeout=timeout, retries=retries)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生させる
+            result = response.json()['choices'][0]['message']['content']
+            ttft = None
+        self.llm_latency.record(label, time.perf_counter() - request_start, ttft)
+        return result
+
+    def search_and_analyze_realtime(self, queries, analysis_type, category_name=""):
+        """検索と分析をリアルタイムで実行"""
+        self.colored_print(f"\n{'='*50}", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{datetime.now().strftime('%Y/%m/%d')} {category_name} - リアルタイム分析開始", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{'='*50}", Fore.BLUE, Style.BRIGHT)
+        
+        analysis_results = []
+        
+        for i, query in enumerate(queries, 1):
+            self.colored_print(f"\n[{i}/{len(queries)}] 🔄 処理中: \"{query}\"", Fore.CYAN, Style.BRIGHT)
+            
+            # 再開時は完了済みのクエリの検索・分析を省略
+            restored = self.restore_query(analysis_type, query)
+            if restored is not None:
+                analysis_results.append(restored)
+                continue
+            
+            # 1. ニュース検索
+            news_data = self.search_google_news_single(query, max_results=25)
+            news_data = self.filter_relevant(query, news_data, analysis_type)
+            news_data = self.deduplicate_news(query, news_data)
+            
+            # 2. 即座にLLM分析
+            if news_data:
+                # ストリーミング時は受信しながら表示
+                printer = llm_stream.LivePrinter(
+                    header=lambda: self.colored_print(f"\n📊 分析結果 (クエリ: {query})", Fore.GREEN, Style.BRIGHT)
+                ) if self.stream and not self.structured else None
+                analysis_result = self.analyze_news(news_data, query, analysis_type, printer=printer)
+                if analysis_result:
+                    analysis_results.append({
+                        'query': query,
+                        'analysis': analysis_result,
+                        'news_count': len(news_data)
+                    })
+                    
+                    # 分析結果を即座に表示
+                    if printer is not None and printer.started:
+                        printer.finish()
+                    else:
+                        self.colored_print(f"\n📊 分析結果 (クエリ: {query})", Fore.GREEN, Style.BRIGHT)
+                        print(self.format_analysis(query, analysis_result))
+                    
+            else:
+                self.colored_print(f"⚠️  ニュースが取得できませんでした: \"{query}\"", Fore.YELLOW)
+            
+            # 次の検索の開始はGoogle Newsのレート制限で待つ（従来はここで8〜12秒待機）
+            if i < len(queries):
+                self.fixed_wait += FIXED_QUERY_WAIT
+        
+        # カテゴリ全体の結果保存
+        self._store_results(analysis_type, analysis_results)
+        
+        self.colored_print(f"\n✅ {category_name} 完了: {len(analysis_results)}件の分析結果", Fore.GREEN, Style.BRIGHT)
+        return analysis_results
+
+    def format_analysis(self, query, analysis):
+        """分析結果の表示用テキスト（構造化モードではJSONを読みやすく整形）"""
+        if not self.structured:
+            return analysis
+        try:
+            return structured_analysis.render_analysis(structured_analysis.parse_analysis(analysis), query)
+        except structured_analysis.SchemaError:
+            return analysis
+
+    def filter_relevant(self, query, news_data, analysis_type):
+        """分析タイプに関連しない記事をLLMに送る前に除外"""
+        kept, dropped = self.relevance_filter.filter(query, analysis_type, news_data)
+        if dropped:
+            self.colored_print(f"🎯 関連度フィルタ: {len(news_data)}件 → {len(kept)}件（除外 {len(dropped)}件）", Fore.LIGHTBLACK_EX)
+        return kept
+
+    def deduplicate_news(self, query, news_data):
+        """これまでのクエリで取得済みの記事を除去・参照化"""
+        if not news_data:
+            return news_data
+        
+        deduplicated = self.deduplicator.process(query, news_data)
+        shared = sum(1 for item in deduplicated if item.get('shared_with'))
+        if len(deduplicated) != len(news_data) or shared:
+            self.colored_print(f"🧹 重複除去: {len(news_data)}件 → {len(deduplicated)}件（うち参照 {shared}件）", Fore.LIGHTBLACK_EX)
+        return deduplicated
+
+    def _store_results(self, analysis_type, analysis_results):
+        """分析タイプごとの結果リストに追加"""
+        self.results[analysis_type].extend(analysis_results)
+
+    def search_and_analyze_pipelined(self, queries, analysis_type, category_name=""):
+        """検索とLLM分析を並行して実行（結果はクエリ順に表示・保存）"""
+        self.colored_print(f"\n{'='*50}", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{datetime.now().strftime('%Y/%m/%d')} {category_name} - パイプライン分析開始", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{'='*50}", Fore.BLUE, Style.BRIGHT)
+        
+        analysis_results = self._run_pipelined([(analysis_type, queries)])[0]
+        self._store_results(analysis_type, analysis_results)
+        
+        self.colored_print(f"\n✅ {category_name} 完了: {len(analysis_results)}件の分析結果", Fore.GREEN, Style.BRIGHT)
+        return analysis_results
+
+    def _run_pipelined(self, categories):
+        """
+        再開時は完了済みのクエリを除いてパイプライン実行し、省略した分析結果をクエリ順に戻す
+
+        Args:
+            categories (list): (分析タイプ, 検索クエリのリスト) のリスト
+
+        Returns:
+            list: カテゴリごとの {'query', 'analysis', 'news_count'} のリスト（クエリ順）
+        """
+        restored = []   # カテゴリごとの クエリ -> 完了済みの分析結果
+        for analysis_type, queries in categories:
+            done = {}
+            for query in queries:
+                result = self.restore_query(analysis_type, query)
+                if result is not None:
+                    done[query] = result
+            restored.append(done)
+        stage_results = news_pipeline.run_categories_pipelined(
+            self, [(analysis_type, [query for query in queries if query not in done])
+                   for (analysis_type, queries), done in zip(categories, restored)]
+        )
+        merged = []
+        for (_, queries), done, analysis_results in zip(categories, restored, stage_results):
+            by_query = dict(done, **{result['query']: result for result in analysis_results})
+            merged.append([by_query[query] for query in queries if query in by_query])
+        return merged
+
+    def search_and_analyze_topics(self, category):
+        """
+        カテゴリの全クエリの記事をトピックにまとめ、トピックごとにLLM分析する
+
+        重複除去はクエリ順に行い、別のカテゴリで取得済みの記事（参照）はトピックに含めない。
+        パイプライン実行時は検索・LLM分析をそれぞれ news_pipeline の同時実行数で並行に行う。
+
+        Args:
+            category (dict): カテゴリ設定
+
+        Returns:
+            list: トピックごとの {'query'（トピック名）, 'analysis', 'news_count', 'queries'} のリスト
+        """
+        name = category['name']
+        queries = self.category_queries(category)
+        self.colored_print(f"\n{'='*50}", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{datetime.now().strftime('%Y/%m/%d')} {category['label']} - トピック分析開始", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{'='*50}", Fore.BLUE, Style.BRIGHT)
+
+        def search(query):
+            return self.filter_relevant(query, self.search_google_news_single(query, max_results=25), name)
+
+        with ThreadPoolExecutor(max_workers=news_pipeline.SEARCH_WORKERS if self.pipelined else 1) as pool:
+            searched = list(pool.map(search, queries))
+        # 従来の固定スケジュールでの待ち時間（比較表示用）
+        self.fixed_wait += (FIXED_SEARCH_INTERVAL if self.pipelined else FIXED_QUERY_WAIT) * max(0, len(queries) - 1)
+        articles = [(query, item) for query, news_data in zip(queries, searched)
+                    for item in self.deduplicate_news(query, news_data) if not item.get('shared_with')]
+
+        topics = self.topics.cluster(category['title'], queries, articles)
+        self.colored_print(f"🧩 トピック: {len(queries)}クエリ・{len(articles)}記事 → {len(topics)}トピック", Fore.CYAN)
+
+        # 再開時は完了済みのトピックを省略（トピック名は代表記事のタイトル）
+        results = [self.restore_query(name, topic['label']) for topic in topics]
+        pending = [(index, topic) for index, topic in enumerate(topics) if results[index] is None]
+        with ThreadPoolExecutor(max_workers=news_pipeline.LLM_WORKERS if self.pipelined else 1) as pool:
+            analyses = pool.map(lambda job: self.analyze_news(job[1]['items'], job[1]['label'], name), pending)
+            for (index, topic), analysis in zip(pending, analyses):
+                if analysis:
+                    results[index] = {'query': topic['label'], 'analysis': analysis,
+                                      'news_count': len(topic['items'])}
+
+        analysis_results = []
+        for topic, result in zip(topics, results):
+            if result is None:
+                continue
+            result = dict(result, queries=topic['queries'])
+            analysis_results.append(result)
+            self.colored_print(f"\n📊 分析結果 (トピック: {topic['label']} / クエリ: {', '.join(topic['queries'])})",
+                               Fore.GREEN, Style.BRIGHT)
+            print(self.format_analysis(topic['label'], result['analysis']))
+        self._store_results(name, analysis_results)
+
+        self.colored_print(f"\n✅ {category['label']} 完了: {len(analysis_results)}件の分析結果", Fore.GREEN, Style.BRIGHT)
+        return analysis_results
+
+    def digest_categories(self, today, categories):
+        """
+        最終統合分析の前に、カテゴリごとの分析結果を並列に要約する
+
+        Args:
+            today (str): 今日の日付
+            categories (list): (カテゴリ名, 分析結果リスト) のリスト
+
+        Returns:
+            list: カテゴリごとの (見出し, 本文) のリスト
+        """
+        first = len(self.digester.records)
+        sections = self.digester.digest(today, categories, self._complete_digest)
+        for record in self.digester.records[first:]:
+            if record['mode'] == 'digest':
+                self.colored_print(f"🧩 カテゴリ要約: {record['title']} {record['queries']}件 "
+                                   f"{record['before']} → {record['after']}トークン", Fore.LIGHTBLACK_EX)
+            elif record['mode'] == 'failed':
+                self.colored_print(f"⚠️  カテゴリ要約に失敗したため分析結果をそのまま使用: "
+                                   f"{record['title']} ({record['error']})", Fore.YELLOW)
+        return sections
+
+    def _complete_digest(self, prompt, label, max_tokens):
+        """カテゴリ要約のLLM呼び出し（キャッシュ・フォールバックあり）"""
+        url = f"{self.base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": self.config['http_referer'],
+            "X-Title": self.config['x_title']['digest'],
+        }
+        payload = {
+            "model": self.config['models']['summary'][0],
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.2
+        }
+        result = self.llm_cache.get(payload)
+        if result is not None:
+            return result
+        request_start = time.perf_counter()
+        result = self._complete_with_fallback(self.config['models']['summary'], url, headers, payload,
+                                              timeout=60, label=label)
+        self.llm_cache.put(payload, result, time.perf_counter() - request_start)
+        return result
+
+    def create_analysis_prompt(self, analysis_type, today, query, news_text):
+        """カテゴリのテンプレート（構造化モードではJSON用の共通プロンプト）からクエリ分析用プロンプトを作成"""
+        if self.structured:
+            return structured_analysis.create_structured_prompt(today, query, self.categories[analysis_type]['title'],
+                                                                news_text, self.target_companies)
+        return self.categories[analysis_type]['template'].format(
+            today=today, query=query, news_text=news_text, target_companies=", ".join(self.target_companies)
+        )
+
+    def category_queries(self, category):
+        """カテゴリで実行するクエリ（all_queries なら無効にしているクエリも含める）"""
+        if self.all_queries:
+            return category['queries'] + category['disabled_queries']
+        return category['queries']
+
+    def search_and_analyze_stage(self, categories):
+        """同じ段のカテゴリの検索とLLM分析を、同時実行数とレート制限を共有して並行に実行"""
+        labels = " / ".join(category['label'] for category in categories)
+        self.colored_print(f"\n{'='*50}", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{datetime.now().strftime('%Y/%m/%d')} {labels} - パイプライン分析開始", Fore.BLUE, Style.BRIGHT)
+        self.colored_print(f"{'='*50}", Fore.BLUE, Style.BRIGHT)
+        
+        stage_results = self._run_pipelined([(category['name'], self.category_queries(category))
+                                             for category in categories])
+        self.fixed_wait += sum(FIXED_SEARCH_INTERVAL * max(0, len(self.category_queries(category)) - 1)
+                               for category in categories)
+        for category, analysis_results in zip(categories, stage_results):
+            self._store_results(category['name'], analysis_results)
+            self.colored_print(f"\n✅ {category['label']} 完了: {len(analysis_results)}件の分析結果", Fore.GREEN, Style.BRIGHT)
+        return stage_results
+
+    def generate_comprehensive_summary(self):
+        """全分析結果を統合した最終判断"""
+        summary = self.config['summary']
+        inputs = [self.categories[name] for name in summary['inputs']]
+        if not any(self.results[category['name']] for category in inputs):
+            self.colored_print("⚠️  統合できる分析結果がありません", Fore.YELLOW)
+            return
+        
+        if self.structured:
+            # 構造化モード: カテゴリ・全体のスコアをローカルで集計（LLMを呼ばない）
+            self.structured_summary = structured_analysis.aggregate(
+                [(category['title'], category['weight'], self.results[category['name']]) for category in inputs]
+            )
+            self.colored_print(f"\n{'='*60}", Fore.RED, Style.BRIGHT)
+            self.colored_print("  📐 スコア集計（ローカル）", Fore.RED, Style.BRIGHT)
+            self.colored_print(f"{'='*60}", Fore.RED, Style.BRIGHT)
+            print(structured_analysis.render_summary(self.structured_summary))
+            if not self.narrative:
+                self.print_analysis_stats(inputs)
+                return
+        
+        today = datetime.now().strftime("%Y/%m/%d")
+        
+        # カテゴリごとの分析結果を並列に要約（map）し、要約を予算内に収めてから統合（reduce）
+        sections = self.digest_categories(today, [(category['title'], self.results[category['name']])
+                                                  for category in inputs])
+
+        def render(texts):
+            analyses = iter(texts)
+            category_summaries = {
+                f"{category['name']}_summary": "\n".join(f"【{heading}】\n{next(analyses)}\n" for heading, _ in section)
+                for category, section in zip(inputs, sections)
+            }
+            return summary['template'].format(today=today, **category_summaries)
+
+        prompt = render(self.token_budget.fit_analyses("最終統合分析", [text for section in sections for _, text in section],
+                                                       render=render))
+        
+        try:
+            self.colored_print(f"\n{'='*60}", Fore.RED, Style.BRIGHT)
+            self.colored_print(f"  {summary['running_label']}", Fore.RED, Style.BRIGHT)
+            self.colored_print(f"{'='*60}", Fore.RED, Style.BRIGHT)
+            
+            url = f"{self.base_url}/chat/completions"
+            
+            headers = {
+                "Authorization": f"Bearer {self.openrouter_api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": self.config['http_referer'],
+                "X-Title": self.config['x_title']['summary'],
+            }
+            
+            payload = {
+                "model": self.config['models']['summary'][0],
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": summary['max_tokens'],
+                "temperature": summary['temperature']
+            }
+            
+            # ストリーミング時は見出しの後に受信しながら表示
+            printer = llm_stream.LivePrinter(
+                header=lambda: self.colored_print(f"\n{summary['result_label']}", Fore.RED, Style.BRIGHT)
+            ) if self.stream else None
+            
+            final_result = self.llm_cache.get(payload)
+            if final_result is not None:
+                self.colored_print("💾 LLMキャッシュヒット (最終分析)", Fore.CYAN)
+            else:
+                request_start = time.perf_counter()
+                final_result = self._complete_with_fallback(self.config['models']['summary'], url, headers, payload,
+                                                            timeout=summary['timeout'], label="最終統合分析",
+                                                            printer=printer)
+                self.llm_cache.put(payload, final_result, time.perf_counter() - request_start)
+            
+            if printer is not None and printer.started:
+                printer.finish()
+            else:
+                self.colored_print(f"\n{summary['result_label']}", Fore.RED, Style.BRIGHT)
+                print(final_result)
+            
+            self.print_analysis_stats(inputs)
+            
+        except Exception as e:
+            self.colored_print(f"❌ 最終分析エラー: {e}", Fore.RED)
+
+    def record_sentiment(self):
+        """カテゴリごとの当日のセンチメント指数を分析結果から計算して保存（LLMは使わない）"""
+        if self.sentiment_store is None:
+            return
+        today = datetime.now().strftime("%Y/%m/%d")
+        recorded = []
+        for category in self.config['categories']:
+            index = sentiment_store.category_index(self.results[category['name']], structured=self.structured)
+            if index is None:
+                continue
+            self.sentiment_store.record(self.config['name'], category, today, index)
+            recorded.append(f"{category['title']} {index['score']:+.1f}")
+        if recorded:
+            self.colored_print(f"🗂️  センチメント指数を保存: {' / '.join(recorded)}", Fore.LIGHTBLACK_EX)
+
+    def print_analysis_stats(self, inputs):
+        """最終統合分析に使ったカテゴリごとのクエリ数・総記事数を表示"""
+        self.colored_print(f"\n📊 分析統計", Fore.BLUE, Style.BRIGHT)
+        for category in inputs:
+            self.colored_print(f"{category['stats_label']}: {len(self.results[category['name']])}件", Fore.WHITE)
+        total_news = sum(r['news_count'] for category in inputs for r in self.results[category['name']])
+        self.colored_print(f"総記事数: {total_news}件", Fore.WHITE)
+
+    def run(self):
+        """
+        メイン実行プロセス（依存関係の段ごとにカテゴリを実行し、最後に最終統合分析）
+
+        同じ段のカテゴリを並行に実行するのはパイプライン時のみ。リアルタイム・トピック分析では
+        結果を受信した順に表示し、クエリ間の重複除去の順序を保つため、カテゴリを段の順に1つずつ実行する。
+        """
+        self.colored_print("="*60, Fore.MAGENTA, Style.BRIGHT)
+        self.colored_print(f"🚀 {datetime.now().strftime('%Y/%m/%d')} {self.config['title']}", Fore.MAGENTA, Style.BRIGHT)
+        self.colored_print("="*60, Fore.MAGENTA, Style.BRIGHT)
+        self.colored_print(f"🕐 開始時刻: {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}", Fore.WHITE)
+        self.colored_print(f"📝 {self.config['description']}", Fore.WHITE)
+        
+        if self.journal is not None and self.journal.resume and self.journal.completed:
+            self.colored_print(f"⏯️  再開: 完了済みのクエリ {len(self.journal.completed)}件 ({self.journal.path})", Fore.CYAN)
+        
+        # 差分実行: 保持期間を過ぎた記事・分析を削除
+        if self.seen_store is not None:
+            self.seen_store.compact()
+        
+        stages = schedule(self.config['categories'])
+        if self.topics is not None:
+            # トピック分析: カテゴリごとに全クエリを検索してからトピックごとに分析
+            for i, category in enumerate(category for categories in stages for category in categories):
+                if i > 0 and not self.pipelined:
+                    self.fixed_wait += self.config.get('fixed_session_wait', 0)
+                self.search_and_analyze_topics(category)
+        elif self.pipelined:
+            # パイプライン: 同じ段のカテゴリの検索とLLM分析を並行実行
+            for categories in stages:
+                self.search_and_analyze_stage(categories)
+        else:
+            # リアルタイム: 段の順・段内は設定の順にカテゴリを1つずつ実行
+            # （並行に実行すると逐次表示が混ざるため、同じ段のカテゴリも並行にしない）
+            ordered = [category for categories in stages for category in categories]
+            for i, category in enumerate(ordered):
+                if i > 0:
+                    self.fixed_wait += self.config.get('fixed_session_wait', 0)
+                self.search_and_analyze_realtime(self.category_queries(category), analysis_type=category['name'],
+                                                 category_name=category['label'])
+        
+        # 最終統合分析
+        self.generate_comprehensive_summary()
+        self.record_sentiment()
+        self.print_run_stats()
+        
+        self.colored_print(f"\n{'='*60}", Fore.MAGENTA, Style.BRIGHT)
+        self.colored_print(f"✅ {self.config['finish_label']} - {datetime.now().strftime('%H:%M:%S')}", Fore.MAGENTA, Style.BRIGHT)
+        self.colored_print(f"{'='*60}", Fore.MAGENTA, Style.BRIGHT)
+
+    def print_run_stats(self):
+        """LLMキャッシュ・重複除去等の統計を表示"""
+        self.llm_cache.print_stats()
+        self.deduplicator.print_stats()
+        http_client.print_stats()
+        if self.news_source == 'rss':
+            self.feed_reader.print_stats()
+        else:
+            self.extractor.print_stats()
+        http_client.SHARED_CLIENT.limiter.print_stats(fixed_wait=self.fixed_wait)
+        http_client.SHARED_CLIENT.limiter.save()
+        self.llm_latency.print_stats()
+        self.breakers.print_stats()
+        self.router.print_stats()
+        self.router.close()
+        self.token_budget.print_stats()
+        self.digester.print_stats()
+        self.relevance_filter.print_stats()
+        if self.topics is not None:
+            self.topics.print_stats()
+        if self.seen_store is not None:
+            self.seen_store.print_stats()
+        if self.journal is not None:
+            self.journal.print_stats()
+            self.journal.close()
+
+
+def add_engine_arguments(parser):
+    """分析エンジンの共通コマンドライン引数を追加"""
+    parser.add_argument('--pipelined', action='store_true',
+                        help="検索とLLM分析を並行して実行し、依存関係のない同じ段のカテゴリも並行に実行"
+                             "（指定しない場合・--topics ではカテゴリを段の順に1つずつ実行）")
+    llm_cache.add_cache_arguments(parser)
+    token_budget.add_budget_arguments(parser)
+    summary_digest.add_digest_arguments(parser)
+    topic_cluster.add_topic_arguments(parser)
+    parser.add_argument('--relevance-cutoff', type=float, default=relevance.RELEVANCE_CUTOFF,
+                        help="関連度（BM25）がこれ未満の記事をLLMに送らない（0でフィルタなし）")
+    parser.add_argument('--dedup', choices=news_dedup.DEDUP_MODES, default='reference',
+                        help="クエリ間の重複記事の扱い（reference: 参照として残す / assign: 最初のクエリのみ / off）")
+    parser.add_argument('--news-source', choices=news_feed.NEWS_SOURCES, default=news_feed.NEWS_SOURCE,
+                        help="記事の取得元（html: Google News検索ページ / rss: RSS検索フィード、公開日時が正確で軽量）")
+    parser.add_argument('--incremental', action='store_true', help="前回から新しい記事のみをLLMに送り、前回の分析を更新")
+    parser.add_argument('--stream', action='store_true', help="LLMの応答をストリーミングで受信して逐次表示")
+    parser.add_argument('--no-hedge', action='store_true', help="遅い呼び出しに別モデルへのヘッジを送らない")
+    parser.add_argument('--all-queries', action='store_true', help="設定で無効にしているクエリも実行")
+    parser.add_argument('--structured', action='store_true',
+                        help="クエリ分析をJSONで受け取り、総合スコアをローカルで集計（最終統合分析のLLM呼び出しなし）")
+    parser.add_argument('--narrative', action='store_true',
+                        help="--structured でも最終統合分析（LLM）の文章を作成")
+    parser.add_argument('--resume', action='store_true',
+                        help="同じ日・同じ設定で中断した実行を再開（完了済みのクエリの検索・分析を省略）")
+
+
+def engine_options(args):
+    """コマンドライン引数からエンジンのオプションを作成"""
+    return dict(pipelined=args.pipelined, cache=llm_cache.from_args(args),
+                dedup_mode=args.dedup, incremental=args.incremental,
+                stream=args.stream, budget=token_budget.from_args(args),
+                digester=summary_digest.from_args(args),
+                relevance_cutoff=args.relevance_cutoff,
+                router=model_router.ModelRouter(hedge=not args.no_hedge),
+                all_queries=args.all_queries, resume=args.resume,
+                structured=args.structured, narrative=args.narrative,
+                topics=topic_cluster.from_args(args), news_source=args.news_source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="設定ファイルに従ったニュース分析")
+    parser.add_argument('config', help="分析設定（例: news_configs/china.json）")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    
+    # APIキー設定
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    
+    if not api_key:
+        print(f"{Fore.RED}❌ エラー: OpenRouter APIキーが設定されていません。")
+        print(f"{Fore.YELLOW}環境変数 'OPENROUTER_API_KEY' を設定してください。")
+        return
+    
+    NewsAnalysisEngine(args.config, api_key, **engine_options(args)).run()
+
+
+if __name__ == "__main__":
+    main()
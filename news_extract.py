@@ -0,0 +1,219 @@
+import re
+import threading
+import time
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+GOOGLE_NEWS_URL = "https://news.google.com"
+
+# 記事の項目ごとのセレクタ（先頭から順に試行。Google Newsのレイアウト変更に備えた候補）
+# kind: 'text' は空でないテキスト、'href' は空でないリンク、'any' は要素があれば採用
+FIELDS = [
+    ('title', ['a.JtKRv', 'a[data-n-au]', 'h3 a', 'h4 a', 'article a'], 'text'),
+    ('link', ['a.WwrzSb', 'a.JtKRv', 'a[data-n-au]'], 'href'),
+    ('source', ['div.vr1PYe', '.CEMjEf', 'span.vr1PYe'], 'text'),
+    ('time', ['time'], 'any'),
+    ('snippet', ['span.fCU_i', '.Rai5ob', '.xBjCHd', 'div[data-snippet]'], 'text'),
+]
+DEFAULTS = {'title': "", 'link': "", 'source': "Unknown", 'time': "Unknown", 'snippet': ""}
+
+# FIELDS で使う単純なセレクタ: [祖先タグ ]タグ[.クラス][[属性]]
+_SELECTOR = re.compile(r'^(?:(?P<ancestor>\w+)\s+)?(?P<tag>\w+)?(?:\.(?P<cls>[\w-]+))?(?:\[(?P<attr>[\w-]+)\])?$')
+
+
+def _compile(selector):
+    """FIELDS のセレクタを (タグ, クラス, 属性, 祖先タグ) に分解（対応しない書式は ValueError）"""
+    match = _SELECTOR.match(selector)
+    if not match:
+        raise ValueError(f"未対応のセレクタ: {selector}")
+    return match.group('tag'), match.group('cls'), match.group('attr'), match.group('ancestor')
+
+
+def _matches(element, matcher):
+    tag, cls, attr, ancestor = matcher
+    if tag and element.tag != tag:
+        return False
+    if cls and cls not in element.get('class', '').split():
+        return False
+    if attr and element.get(attr) is None:
+        return False
+    if ancestor and not any(parent.tag == ancestor for parent in element.iterancestors()):
+        return False
+    return True
+
+
+def _text(element):
+    # BeautifulSoup の get_text(strip=True) と同じく各テキストノードをstripして連結
+    return ''.join(text.strip() for text in element.xpath('.//text()'))
+
+
+def normalize_link(link):
+    """記事の相対リンク（./read/... や /read/...）を絶対URLにする"""
+    if link.startswith('./'):
+        return GOOGLE_NEWS_URL + link[1:]
+    if link.startswith('/'):
+        return GOOGLE_NEWS_URL + link
+    return link
+
+
+def extract_articles_bs4(html, max_results=25):
+    """
+    ページ全体をBeautifulSoupで解析し、項目ごとにセレクタを順に試して記事を取得する（従来方式）
+
+    Args:
+        html (str): 検索結果ページのHTML
+        max_results (int): 処理する <article> の数
+
+    Returns:
+        tuple: (ページ内の <article> の数, {'title', 'link', 'source', 'time', 'snippet'} のリスト)
+    """
+    articles = BeautifulSoup(html, 'html.parser').find_all('article')
+    items = []
+    for article in articles[:max_results]:
+        item = dict(DEFAULTS)
+        for field, selectors, kind in FIELDS:
+            for selector in selectors:
+                tag = article.select_one(selector)
+                if tag is None:
+                    continue
+                if kind == 'href':
+                    if tag.get('href'):
+                        item[field] = normalize_link(tag['href'])
+                        break
+                elif kind == 'any' or tag.get_text(strip=True):
+                    item[field] = tag.get_text(strip=True)
+                    break
+        if item['title']:
+            items.append(item)
+    return len(articles), items
+
+
+class NewsExtractor:
+    """
+    Google Newsの検索結果ページを1回だけ解析し、記事ごとに部分木を1回走査して全項目を取得する
+
+    lxmlで解析し、項目ごとに一致したセレクタの候補を記憶して以降の記事では先に試す。
+    記憶した候補がすべての項目で見つかった時点で記事の走査を打ち切る。
+    lxmlがない・解析に失敗した場合は従来方式（extract_articles_bs4）で取得する。
+    """
+    def __init__(self):
+        # 項目ごとのセレクタの試行順（一致した候補を先頭に移す）
+        self.order = {field: tuple(range(len(selectors))) for field, selectors, _ in FIELDS}
+        self._matchers = {field: [_compile(selector) for selector in selectors] for field, selectors, _ in FIELDS}
+        self._lock = threading.Lock()
+        self.stats = {
+            'pages': 0,         # 解析したページ
+            'articles': 0,      # 取得した記事
+            'relearned': 0,     # 記憶した候補が見つからず別の候補に切り替えた回数
+            'fallback': 0,      # 従来方式で解析したページ
+            'elapsed': 0.0,     # 解析時間の合計（秒）
+        }
+
+    def extract(self, html, max_results=25):
+        """
+        検索結果ページから記事を取得する
+
+        Args:
+            html (str): 検索結果ページのHTML
+            max_results (int): 処理する <article> の数
+
+        Returns:
+            tuple: (ページ内の <article> の数, {'title', 'link', 'source', 'time', 'snippet'} のリスト)
+        """
+        start = time.perf_counter()
+        fallback = not HAS_LXML
+        if not fallback:
+            try:
+                found, items = self._extract_lxml(html, max_results)
+            except Exception:
+                fallback = True
+        if fallback:
+            found, items = extract_articles_bs4(html, max_results)
+        with self._lock:
+            self.stats['pages'] += 1
+            self.stats['articles'] += len(items)
+            self.stats['fallback'] += int(fallback)
+            self.stats['elapsed'] += time.perf_counter() - start
+        return found, items
+
+    def _extract_lxml(self, html, max_results):
+        articles = list(lxml.html.fromstring(html).iter('article'))
+        items = []
+        for article in articles[:max_results]:
+            item = self._extract_article(article)
+            if item['title']:
+                items.append(item)
+        return len(articles), items
+
+    def _extract_article(self, article):
+        order = self.order
+        # 項目ごとの 候補番号 -> 最初に一致した要素の値（select_one と同じく最初の一致のみ見る）
+        found = {field: {} for field, _, _ in FIELDS}
+        pending = {field for field, _, _ in FIELDS}   # 記憶した候補がまだ見つかっていない項目
+        for element in article.iterdescendants():
+            if not isinstance(element.tag, str):
+                continue    # コメント等
+            for field, _, kind in FIELDS:
+                if field not in pending:
+                    continue
+                for index in order[field]:
+                    if index in found[field] or not _matches(element, self._matchers[field][index]):
+                        continue
+                    if kind == 'href':
+                        value = element.get('href') or None
+                    else:
+                        value = _text(element)
+                        if kind == 'text' and not value:
+                            value = None
+                    found[field][index] = value
+                    if value is not None and index == order[field][0]:
+                        pending.discard(field)
+                        break
+            if not pending:
+                break
+
+        item = dict(DEFAULTS)
+        for field, _, kind in FIELDS:
+            chosen = next((index for index in order[field] if found[field].get(index) is not None), None)
+            if chosen is None:
+                continue
+            value = found[field][chosen]
+            item[field] = normalize_link(value) if kind == 'href' else value
+            if chosen != order[field][0]:
+                self._promote(field, chosen)
+        return item
+
+    def _promote(self, field, index):
+        # 一致した候補を試行順の先頭に移す（他の候補の順序は保つ）
+        with self._lock:
+            current = self.order[field]
+            if current[0] == index:
+                return
+            self.order = dict(self.order, **{field: (index,) + tuple(i for i in current if i != index)})
+            self.stats['relearned'] += 1
+
+    def learned_selectors(self):
+        """項目ごとに現在先に試すセレクタ"""
+        return {field: selectors[self.order[field][0]] for field, selectors, _ in FIELDS}
+
+    def print_stats(self):
+        """解析したページ数・時間と、切り替えたセレクタを表示"""
+        print("\n=== 記事抽出 ===")
+        if not self.stats['pages']:
+            print("記録なし")
+            return
+        backend = "lxml" if HAS_LXML else "BeautifulSoup（lxmlなし）"
+        print(f"{backend}: {self.stats['pages']}ページ・{self.stats['articles']}記事 / "
+              f"解析 {self.stats['elapsed'] * 1000:.1f}ms（1ページ平均 "
+              f"{self.stats['elapsed'] / self.stats['pages'] * 1000:.2f}ms）")
+        if self.stats['fallback']:
+            print(f"従来方式で解析: {self.stats['fallback']}ページ")
+        if self.stats['relearned']:
+            learned = ", ".join(f"{field}={selector}" for field, selector in self.learned_selectors().items())
+            print(f"セレクタの切り替え: {self.stats['relearned']}回（現在: {learned}）")
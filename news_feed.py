@@ -0,0 +1,210 @@
+import html
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# ニュースの取得元（html: Google News検索ページ / rss: Google NewsのRSS検索フィード）
+NEWS_SOURCES = ('html', 'rss')
+NEWS_SOURCE = os.getenv("NEWS_SOURCE", "html")
+FEED_PATH = "/rss/search"       # Google NewsのRSS検索フィード（検索ページと同じパラメータ）
+FEED_CHUNK_SIZE = 16 * 1024     # 受信しながらパーサーに渡すサイズ
+FEED_ACCEPT = "application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8"
+
+_TAG = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+
+def _local(tag):
+    # 名前空間を除いたタグ名（Atomは {http://www.w3.org/2005/Atom}entry 等）
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_published(text):
+    """
+    RSSの pubDate（RFC 822）・Atomの published/updated（ISO 8601）を日時にする
+
+    Returns:
+        datetime: タイムゾーン付きの日時（タイムゾーンがなければUTCとみなす）。読めなければ None
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+    try:
+        published = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            published = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+
+def _description_text(description, title, source):
+    # 説明（HTML）のテキスト。Google Newsは「<a>タイトル</a> <font>ソース</font>」のため、その部分は除く
+    text = _SPACES.sub(' ', html.unescape(_TAG.sub(' ', description or ''))).strip()
+    for prefix in (title, source):
+        if prefix and text.startswith(prefix):
+            text = text[len(prefix):].strip()
+    return text
+
+
+def _entry(element):
+    """RSSの <item>・Atomの <entry> から記事の項目を取り出す"""
+    fields = {}
+    link = None
+    for child in element:
+        name = _local(child.tag)
+        if name == 'link':
+            # RSS: テキスト / Atom: href属性（rel="alternate" か rel なしを優先）
+            href = child.get('href')
+            if href is None:
+                link = link or (child.text or '').strip()
+            elif child.get('rel', 'alternate') == 'alternate' or link is None:
+                link = href
+        elif name in ('author', 'source') and len(child):
+            # Atom: <author><name> / <source><title>
+            nested = {_local(item.tag): (item.text or '').strip() for item in child}
+            fields.setdefault('source', nested.get('name') or nested.get('title'))
+        else:
+            fields.setdefault(name, (child.text or '').strip())
+
+    source = fields.get('source') or "Unknown"
+    title = fields.get('title', '')
+    # Google Newsのタイトルは「タイトル - ソース」
+    if source != "Unknown" and title.endswith(f" - {source}"):
+        title = title[:-len(f" - {source}")]
+    description = fields.get('description') or fields.get('summary') or fields.get('content')
+    return {
+        'title': title,
+        'link': link or '',
+        'source': source,
+        'published': parse_published(fields.get('pubDate') or fields.get('published') or fields.get('updated')),
+        'snippet': _description_text(description, title, source),
+    }
+
+
+def iter_entries(chunks):
+    """
+    RSS/Atomのバイト列を受信しながら解析し、記事を1件ずつ返す（解析済みの要素は破棄）
+
+    Args:
+        chunks (iterable): フィードのバイト列の断片
+
+    Yields:
+        dict: {'title', 'link', 'source', 'published', 'snippet'}
+
+    Raises:
+        xml.etree.ElementTree.ParseError: XMLとして読めない
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if _local(element.tag) in ('item', 'entry'):
+                yield _entry(element)
+                element.clear()
+    parser.close()
+    for _, element in parser.read_events():
+        if _local(element.tag) in ('item', 'entry'):
+            yield _entry(element)
+
+
+def to_news_item(entry, query):
+    """
+    フィードの記事を検索ページから取得した記事と同じ形式（news_item）にする
+
+    time は公開日時（ローカル時刻 YYYY/MM/DD HH:MM）、date はその日付。
+
+    Returns:
+        dict: {'title', 'link', 'source', 'time', 'snippet', 'date', 'query'}
+    """
+    published = entry['published']
+    # 検索ページの記事と同じく、公開日時のない記事は当日とみなす
+    local = published.astimezone().replace(tzinfo=None) if published else datetime.now()
+    return {
+        'title': entry['title'],
+        'link': entry['link'],
+        'source': entry['source'],
+        'time': local.strftime('%Y/%m/%d %H:%M') if published else "Unknown",
+        'snippet': entry['snippet'],
+        'date': local.strftime('%Y/%m/%d'),
+        'query': query,
+    }
+
+
+class FeedReader:
+    """
+    RSS/Atomの検索フィードを受信しながら解析する
+
+    受信したバイト数と解析時間（受信待ちを除く）を記録し、検索ページとの比較用に表示する。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            'feeds': 0,         # 解析したフィード
+            'entries': 0,       # 取得した記事
+            'bytes': 0,         # 受信したバイト数
+            'elapsed': 0.0,     # 解析時間の合計（秒）
+        }
+
+    def read(self, response, max_results=25):
+        """
+        ストリーミング受信中のレスポンスからフィードの記事を取得する
+
+        max_results 件を取得した後も接続を再利用できるよう残りを読み切る（解析はしない）。
+
+        Args:
+            response (requests.Response): stream=True で受信中のレスポンス
+            max_results (int): 取得する記事の数
+
+        Returns:
+            list: iter_entries の記事のリスト
+        """
+        received = [0]
+        waited = [0.0]     # 受信待ちの時間（解析時間から除く）
+
+        def chunks():
+            iterator = response.iter_content(chunk_size=FEED_CHUNK_SIZE)
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                waited[0] += time.perf_counter() - start
+                if chunk is None:
+                    return
+                received[0] += len(chunk)
+                yield chunk
+
+        entries = []
+        body = chunks()
+        start = time.perf_counter()
+        for entry in iter_entries(body):
+            entries.append(entry)
+            if len(entries) >= max_results:
+                break
+        parse_time = time.perf_counter() - start - waited[0]
+        for _ in body:
+            pass
+
+        with self._lock:
+            self.stats['feeds'] += 1
+            self.stats['entries'] += len(entries)
+            self.stats['bytes'] += received[0]
+            self.stats['elapsed'] += parse_time
+        return entries
+
+    def print_stats(self):
+        """受信したバイト数と解析時間を表示"""
+        print("\n=== RSSフィード ===")
+        if not self.stats['feeds']:
+            print("記録なし")
+            return
+        feeds = self.stats['feeds']
+        print(f"{feeds}フィード・{self.stats['entries']}記事 / 受信 {self.stats['bytes'] / 1024:.1f}KB"
+              f"（1フィード平均 {self.stats['bytes'] / feeds / 1024:.1f}KB） / 解析 "
+              f"{self.stats['elapsed'] * 1000:.1f}ms（1フィード平均 {self.stats['elapsed'] / feeds * 1000:.2f}ms）")
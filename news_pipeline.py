@@ -0,0 +1,114 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from colorama import Fore, Style
+
+# パイプライン実行の既定値（リクエストの開始間隔は http_client のホストごとのレート制限に従う）
+SEARCH_WORKERS = 2             # Google News検索の同時実行数
+LLM_WORKERS = 3                # LLM分析の同時実行数
+
+
+def run_pipelined(analyzer, queries, analysis_type,
+                  search_workers=SEARCH_WORKERS, llm_workers=LLM_WORKERS):
+    """
+    ニュース検索とLLM分析を並行して実行する
+
+    検索が終わったクエリから順にLLM分析を投入し、検索・分析それぞれの同時実行数を制限する。
+    重複除去と結果の表示・返却はクエリの順番を保つ。
+
+    Args:
+        analyzer: search_google_news_single / filter_relevant / deduplicate_news / analyze_news / format_analysis を持つアナライザー
+        queries (list): 検索クエリのリスト
+        analysis_type (str): 分析タイプ
+        search_workers (int): 検索の同時実行数
+        llm_workers (int): LLM分析の同時実行数
+
+    Returns:
+        list: {'query', 'analysis', 'news_count'} のリスト（クエリ順）
+    """
+    return run_categories_pipelined(analyzer, [(analysis_type, queries)],
+                                    search_workers=search_workers, llm_workers=llm_workers)[0]
+
+
+def run_categories_pipelined(analyzer, categories,
+                             search_workers=SEARCH_WORKERS, llm_workers=LLM_WORKERS):
+    """
+    複数カテゴリのニュース検索とLLM分析を、同時実行数を共有して並行に実行する
+
+    重複除去はカテゴリの順・カテゴリ内のクエリ順に行うため、記事の割り当て先は逐次実行と同じになる。
+
+    Args:
+        analyzer: search_google_news_single / filter_relevant / deduplicate_news / analyze_news / format_analysis を持つアナライザー
+        categories (list): (分析タイプ, 検索クエリのリスト) のリスト
+        search_workers (int): 検索の同時実行数
+        llm_workers (int): LLM分析の同時実行数
+
+    Returns:
+        list: カテゴリごとの {'query', 'analysis', 'news_count'} のリスト（クエリ順）
+    """
+    jobs = [(position, analysis_type, query)
+            for position, (analysis_type, queries) in enumerate(categories) for query in queries]
+    llm_pool = ThreadPoolExecutor(max_workers=llm_workers)
+
+    # 重複除去は記事の割り当て先が逐次実行と同じになるようクエリ順に行う
+    searched = {}                                    # 検索済み・未処理のクエリ番号 -> 記事
+    dispatched = [threading.Event() for _ in jobs]
+    stage = [(None, None)] * len(jobs)               # クエリ番号 -> (記事, LLM分析のFuture)
+    order_lock = threading.Lock()
+    next_index = [0]
+
+    def dispatch_ready():
+        # 先頭から連続して検索が終わっているクエリを重複除去してLLM分析に投入
+        while next_index[0] in searched:
+            index = next_index[0]
+            _, analysis_type, query = jobs[index]
+            news_data = searched.pop(index)
+            try:
+                news_data = analyzer.deduplicate_news(query, news_data)
+            except Exception as e:
+                # 後続のクエリが待ち続けないよう、重複除去に失敗してもそのまま分析する
+                analyzer.colored_print(f"⚠️  重複除去エラー（そのまま分析）: {e}", Fore.YELLOW)
+            llm_future = llm_pool.submit(analyzer.analyze_news, news_data, query, analysis_type) if news_data else None
+            stage[index] = (news_data, llm_future)
+            dispatched[index].set()
+            next_index[0] += 1
+
+    def search(index, query, analysis_type):
+        news_data = analyzer.search_google_news_single(query, max_results=25)
+        try:
+            news_data = analyzer.filter_relevant(query, news_data, analysis_type)
+        except Exception as e:
+            analyzer.colored_print(f"⚠️  関連度フィルタエラー（そのまま分析）: {e}", Fore.YELLOW)
+        with order_lock:
+            searched[index] = news_data
+            dispatch_ready()
+
+    analysis_results = [[] for _ in categories]
+    try:
+        with ThreadPoolExecutor(max_workers=search_workers) as search_pool:
+            search_futures = [search_pool.submit(search, index, query, analysis_type)
+                              for index, (_, analysis_type, query) in enumerate(jobs)]
+
+            for i, ((position, _, query), search_future) in enumerate(zip(jobs, search_futures), 1):
+                search_future.result()
+                dispatched[i - 1].wait()
+                news_data, llm_future = stage[i - 1]
+
+                if llm_future is None:
+                    analyzer.colored_print(f"⚠️  ニュースが取得できませんでした: \"{query}\"", Fore.YELLOW)
+                    continue
+
+                analysis_result = llm_future.result()
+                if analysis_result:
+                    analysis_results[position].append({
+                        'query': query,
+                        'analysis': analysis_result,
+                        'news_count': len(news_data)
+                    })
+
+                    # クエリ順に結果を表示
+                    analyzer.colored_print(f"\n📊 分析結果 [{i}/{len(jobs)}] (クエリ: {query})", Fore.GREEN, Style.BRIGHT)
+                    print(analyzer.format_analysis(query, analysis_result))
+    finally:
+        llm_pool.shutdown(wait=True)
+
+    return analysis_results
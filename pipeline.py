@@ -0,0 +1,242 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import http_client
+import update
+import bandwalk_core_impl as core
+from fund_parser import parse_history_table, extract_table_region
+from http_cache import content_hash
+
+# ファンド設定（run_*.sh と同じパラメータ）
+FundSpec = namedtuple('FundSpec', ['fund_id', 'title', 'upper_threshold', 'lower_threshold',
+                                   'upper_cross_rate', 'lower_cross_rate'])
+
+BUNDLED_FUNDS = [
+    FundSpec('03311187', 'S&P500', 168.6, -37.4, 0.970, 0.856),
+    FundSpec('0331418A', 'ALL', 52.89, -48.668, 0.9124, 0.999),
+    FundSpec('04315213', 'ATMX+', 180.94, -4.65, 0.82, 0.619),
+]
+
+SCRAPE_WORKERS = 4  # 同時に取得するファンド数
+
+
+class MergeResult:
+    """1ファンド分の取得・マージ結果"""
+    def __init__(self, spec, all_data, new_data_rows, existing_data, url, table_hash, error=None):
+        self.spec = spec
+        self.all_data = all_data            # 日付順の全データ（CSV行形式、既存データも読めなければNone）
+        self.new_data_rows = new_data_rows  # 今回追加された行
+        self.existing_data = existing_data  # 既存データ（CSV使用時のみ）
+        self.url = url
+        self.table_hash = table_hash
+        self.error = error
+        self.merged_at = None
+
+
+def _read_existing(fund_id):
+    """既存データを読み込む（ストアがあればストア、なければCSV）"""
+    if update.FUND_STORE is not None:
+        return update.FUND_STORE.read_rows(fund_id)
+    _, existing_data = update.load_existing_data(f"{fund_id}_.csv", verbose=False)
+    return existing_data
+
+
+def fetch_and_merge(spec):
+    """
+    ページを取得して既存データとメモリ上でマージする（ファイルへの書き込みは行わない）
+
+    Args:
+        spec (FundSpec): ファンド設定
+
+    Returns:
+        MergeResult: マージ結果
+    """
+    fund_id = spec.fund_id
+    url = f"{update.YAHOO_BASE_URL}/quote/{fund_id}/history"
+
+    try:
+        # 既存データ（分析には全期間が必要）
+        existing_data = _read_existing(fund_id)
+        existing_dates = {row[0] for row in existing_data}
+
+        response = update.RESPONSE_CACHE.fetch(url, headers=update.REQUEST_HEADERS)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTPステータス {response.status_code}")
+
+        table_region = extract_table_region(response.content)
+        table_hash = content_hash(table_region) if table_region else None
+
+        new_data_rows = []
+        if not (table_hash and table_hash == response.table_hash and existing_data):
+            cell_rows, _ = parse_history_table(response.content, backend=update.PARSER_BACKEND)
+            for cell_texts in cell_rows or []:
+                try:
+                    data_row = update.convert_cell_row(cell_texts)
+                except (ValueError, IndexError):
+                    continue
+                if data_row is not None and data_row[0] not in existing_dates:
+                    existing_dates.add(data_row[0])
+                    new_data_rows.append(data_row)
+        else:
+            update.RESPONSE_CACHE.mark_table_unchanged()
+
+        all_data = existing_data + new_data_rows
+        all_data.sort(key=lambda x: datetime.strptime(x[0], '%Y/%m/%d'))
+        result = MergeResult(spec, all_data, new_data_rows, existing_data, url, table_hash)
+
+    except Exception as e:
+        # 取得に失敗しても既存データで分析は行う（既存データも読めなければこのファンドは飛ばす）
+        try:
+            existing_data = _read_existing(fund_id)
+        except Exception as read_error:
+            result = MergeResult(spec, None, [], None, url, None, error=read_error)
+        else:
+            result = MergeResult(spec, existing_data, [], existing_data, url, None, error=e)
+
+    result.merged_at = time.perf_counter()
+    return result
+
+
+def persist(result):
+    """マージ結果を保存する（永続化スレッドで実行）"""
+    fund_id = result.spec.fund_id
+    if result.new_data_rows:
+        if update.FUND_STORE is not None:
+            update.FUND_STORE.upsert_rows(fund_id, result.new_data_rows)
+        else:
+            update.write_csv(f"{fund_id}_.csv", result.all_data)
+    if result.table_hash:
+        update.RESPONSE_CACHE.set_table_hash(result.url, result.table_hash)
+    return len(result.new_data_rows)
+
+
+def analyze(result):
+    """
+    マージ済みの行をそのまま指標エンジンに渡して分析レポートを作成する
+
+    Returns:
+        str: レポート（表示用テキスト）
+    """
+    spec = result.spec
+    core.set_macd_params(spec.upper_threshold, spec.lower_threshold,
+                         spec.upper_cross_rate, spec.lower_cross_rate)
+
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        data = core.build_data_rows(result.all_data)
+        core.print_data_summary(data, spec.title)
+        core.run_analysis(data, spec.title)
+    return buffer.getvalue()
+
+
+def run_pipeline(specs, scrape_workers=SCRAPE_WORKERS, show_report=True):
+    """
+    取得→マージ→分析をファンドごとに流し、保存は分析と並行して行う
+
+    取得は最大scrape_workersファンドを並行して行い、マージが終わったファンドから
+    順に分析する。保存は専用スレッドで非同期に行い、最後に完了を待つ。
+
+    Args:
+        specs (list): FundSpecのリスト
+        scrape_workers (int): 同時に取得するファンド数
+        show_report (bool): レポートを表示するか
+
+    Returns:
+        dict: 計測結果（fund_id -> 各段階の経過秒数）と総経過時間
+    """
+    start = time.perf_counter()
+    timings = {}
+    reports = {}
+
+    persist_pool = ThreadPoolExecutor(max_workers=1)
+    persist_futures = []
+
+    with ThreadPoolExecutor(max_workers=scrape_workers) as scrape_pool:
+        futures = [scrape_pool.submit(fetch_and_merge, spec) for spec in specs]
+
+        for future in as_completed(futures):
+            result = future.result()
+            merged_at = result.merged_at - start
+            fund_id = result.spec.fund_id
+
+            if result.all_data is None:
+                print(f"⚠️  {fund_id} の取得・既存データの読み込みに失敗したためスキップします: {result.error}")
+                timings[fund_id] = {'merged': merged_at, 'reported': merged_at, 'new_rows': 0}
+                continue
+
+            # 保存は分析と並行して実行
+            persist_futures.append(persist_pool.submit(persist, result))
+
+            report = analyze(result)
+            reported_at = time.perf_counter() - start
+            reports[fund_id] = report
+
+            if show_report:
+                if result.error is not None:
+                    print(f"⚠️  {fund_id} の取得に失敗しました（既存データで分析）: {result.error}")
+                print(report, end='')
+
+            timings[fund_id] = {
+                'merged': merged_at,
+                'reported': reported_at,
+                'new_rows': len(result.new_data_rows),
+            }
+
+    # 保存完了を待つ
+    for future in persist_futures:
+        future.result()
+    persist_pool.shutdown()
+    total = time.perf_counter() - start
+
+    return {'funds': timings, 'total': total, 'reports': reports}
+
+
+def print_latency_summary(stats):
+    """取得開始からレポート表示までのレイテンシを表示"""
+    print("\n=== パイプライン計測 ===")
+    for fund_id, timing in stats['funds'].items():
+        analysis = timing['reported'] - timing['merged']
+        print(f"{fund_id}: マージ完了 {timing['merged'] * 1000:.0f}ms / 分析 {analysis * 1000:.0f}ms / "
+              f"レポート完了 {timing['reported'] * 1000:.0f}ms (新規{timing['new_rows']}件)")
+    print(f"全体（保存完了まで）: {stats['total'] * 1000:.0f}ms")
+
+
+def parse_fund_args(values):
+    """--fund の引数をFundSpecに変換"""
+    specs = []
+    for value in values:
+        if len(value) != 6:
+            raise ValueError(f"--fund には6つの値が必要です: {value}")
+        fund_id, title = value[0], value[1]
+        specs.append(FundSpec(fund_id, title, *(float(v) for v in value[2:])))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="取得→分析をCSVを経由せずに実行する統合パイプライン")
+    parser.add_argument('--fund', nargs=6, action='append',
+                        metavar=('ID', 'TITLE', 'UPPER', 'LOWER', 'UPPER_RATE', 'LOWER_RATE'),
+                        help="対象ファンド（省略時は同梱の3ファンド）")
+    parser.add_argument('--workers', type=int, default=SCRAPE_WORKERS, help="同時に取得するファンド数")
+    args = parser.parse_args()
+
+    try:
+        specs = parse_fund_args(args.fund) if args.fund else BUNDLED_FUNDS
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    stats = run_pipeline(specs, scrape_workers=args.workers)
+    print_latency_summary(stats)
+    update.RESPONSE_CACHE.print_stats()
+    http_client.print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+# 適応レート制限の設定（環境変数で変更可能）
+RATE_FILE = os.getenv("HTTP_RATE_FILE", "host_rates.json")   # 実行をまたいで保存する学習済みレート
+DECREASE_FACTOR = 0.5       # 429・Retry-After付きの応答・CAPTCHAでレートに掛ける倍率
+INCREASE_STEP = 0.05        # 成功ごとに初期レートのこの割合だけレートを上げる
+MAX_RATE_MULTIPLIER = 2.0   # 初期レートのこの倍数まで上げる
+MIN_RATE_DIVISOR = 16.0     # 初期レートのこの分の1まで下げる
+CAPTCHA_MARKERS = ('/sorry/', 'unusual traffic')   # Googleのアクセス制限ページの目印
+
+
+def parse_host_rates(value):
+    """「ホストまたはURL=リクエスト/秒」のカンマ区切り指定を辞書にする"""
+    rates = {}
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        host, _, rate = entry.rpartition('=')
+        rates[host] = float(rate)
+    return rates
+
+
+# ホストごとの初期レート（環境変数で指定したものは呼び出し側の configure より優先）
+HOST_RATES = parse_host_rates(os.getenv("HTTP_HOST_RATES", ""))
+
+
+def _matches(scope, url):
+    # URLで指定した範囲は前方一致、ホスト名（ポートを含む）で指定した範囲はホストの一致
+    if '://' in scope:
+        return url.startswith(scope)
+    return urlparse(url).netloc == scope
+
+
+def is_throttled(response, streamed=False):
+    """
+    サーバーから制限を受けたレスポンスか（429・Retry-After付きの応答・CAPTCHAページ）
+
+    Retry-Afterのない5xxは制限ではなく障害として扱い、レートは下げない。OpenRouterは全モデルで
+    1つの範囲を共有するため、1つのモデルの503で他のモデルまで遅くしないようにする
+    （モデルの障害はサーキットブレーカーが扱う）。
+
+    Args:
+        response (requests.Response): レスポンス
+        streamed (bool): ストリーミング受信中か（本文を読まない）
+
+    Returns:
+        bool: 制限を受けた場合True
+    """
+    if response.status_code == 429:
+        return True
+    if response.status_code >= 500 and response.headers.get('Retry-After'):
+        return True
+    if CAPTCHA_MARKERS[0] in (response.url or ''):
+        return True
+    if streamed or 'html' not in response.headers.get('Content-Type', ''):
+        return False
+    return CAPTCHA_MARKERS[1] in response.text[:5000].lower()
+
+
+class TokenBucket:
+    """
+    ホスト1つ分のトークンバケット（AIMD: 制限を受けたら乗算で減速、成功したら加算で回復）
+
+    同時に待つリクエストにはトークンを前借りさせ、開始時刻が重ならないようにする。
+    """
+    def __init__(self, rate, start_rate=None, burst=1.0, clock=time.monotonic):
+        self.initial_rate = rate
+        self.max_rate = rate * MAX_RATE_MULTIPLIER
+        self.min_rate = rate / MIN_RATE_DIVISOR
+        self.rate = min(self.max_rate, max(self.min_rate, start_rate or rate))
+        self.start_rate = self.rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,     # 制限を受けたレスポンス数
+            'waited': 0.0,      # レート制限で待機した秒数
+        }
+
+    def reserve(self):
+        """トークンを1つ取り、リクエストを開始してよいまでの秒数を返す"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            wait = max(0.0, -self._tokens / self.rate)
+            self.stats['requests'] += 1
+            self.stats['waited'] += wait
+            return wait
+
+    def record(self, throttled):
+        """レスポンスの結果でレートを調整する"""
+        with self._lock:
+            if throttled:
+                self.stats['throttled'] += 1
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                # 前借りしていない分のトークンも捨て、次のリクエストは新しいレートで待つ
+                self._tokens = min(self._tokens, 0.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.initial_rate * INCREASE_STEP)
+
+
+class HostRateLimiter:
+    """
+    ホストごとのトークンバケット（初期レートを設定したホストのみ制限し、学習したレートを保存する）
+
+    範囲はホスト名（例: news.google.com）またはURLの前方一致（例: https://openrouter.ai/api/v1）で指定し、
+    複数に一致する場合は最も長い範囲を使う（同じホストで検索とLLMを提供するスタンドインサーバー用）。
+    """
+    def __init__(self, path=RATE_FILE, host_rates=None):
+        self.path = path
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.learned = self._load()     # 範囲 -> 前回の実行で学習したレート
+        self._buckets = {}
+        self._scopes = {}               # URLのホスト・パス -> 一致した範囲（キャッシュ）
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {host: float(entry['rate']) for host, entry in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def configure(self, url, rate):
+        """
+        URL以下の初期レートを設定する（環境変数 HTTP_HOST_RATES 等で設定済みの範囲は変更しない）
+
+        Args:
+            url (str): 範囲とするURL（例: https://news.google.com/search）
+            rate (float): 初期レート（リクエスト/秒、0以下で制限なし）
+        """
+        scope = url.rstrip('/')
+        with self._lock:
+            if scope in self.host_rates or urlparse(scope).netloc in self.host_rates:
+                return
+            self.host_rates[scope] = rate
+            self._scopes.clear()
+
+    def _bucket(self, url):
+        parsed = urlparse(url)
+        target = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+        with self._lock:
+            scope = self._scopes.get(target)
+            if scope is None:
+                matched = [key for key in self.host_rates if _matches(key, target)]
+                scope = self._scopes[target] = max(matched, key=len, default='')
+            if not scope or self.host_rates[scope] <= 0:
+                return None
+            bucket = self._buckets.get(scope)
+            if bucket is None:
+                bucket = TokenBucket(self.host_rates[scope], start_rate=self.learned.get(scope))
+                self._buckets[scope] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """ホストのレートに従ってリクエストを開始してよいまで待機する（待機秒数を返す）"""
+        bucket = self._bucket(url)
+        if bucket is None:
+            return 0.0
+        wait = bucket.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url, throttled):
+        """レスポンスが制限を受けたかを範囲のレートに反映する"""
+        bucket = self._bucket(url)
+        if bucket is not None:
+            bucket.record(throttled)
+
+    def total_wait(self):
+        """全範囲でレート制限により待機した秒数"""
+        with self._lock:
+            return sum(bucket.stats['waited'] for bucket in self._buckets.values())
+
+    def save(self):
+        """学習したレートを保存（今回使わなかった範囲は前回の値を残す）"""
+        if not self.path:
+            return
+        with self._lock:
+            rates = dict(self.learned)
+            rates.update({host: bucket.rate for host, bucket in self._buckets.items()})
+        data = {host: {'rate': round(rate, 4)} for host, rate in rates.items()}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def print_stats(self, fixed_wait=None):
+        """
+        範囲ごとのレートと待機時間を表示
+
+        Args:
+            fixed_wait (float): 比較用の従来の固定スケジュールでの待機秒数
+        """
+        print("\n=== 適応レート制限 ===")
+        with self._lock:
+            buckets = sorted(self._buckets.items())
+        if not buckets:
+            print("レート制限の対象となったリクエストなし")
+            return
+        for scope, bucket in buckets:
+            stats = bucket.stats
+            print(f"{scope}: {bucket.start_rate:.2f} → {bucket.rate:.2f}リクエスト/秒 / "
+                  f"{stats['requests']}件（制限 {stats['throttled']}件） / 待機 {stats['waited']:.1f}秒")
+        line = f"待機合計: {self.total_wait():.1f}秒"
+        if fixed_wait is not None:
+            line += f"（従来の固定スケジュール: {fixed_wait:.1f}秒）"
+        print(line)
@@ -0,0 +1,187 @@
+import math
+import os
+import re
+import threading
+import time
+
+# 関連度フィルタの設定（環境変数で変更可能、0以下でフィルタなし）
+RELEVANCE_CUTOFF = float(os.getenv("RELEVANCE_CUTOFF", "0.5"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+MIN_IDF = 0.3               # 多くの記事に出る語も最低限は加点する（小さな検索結果ではIDFが0に近づくため）
+COMPANY_WEIGHT = 2.0        # 対象企業名・指数名の重み
+QUERY_WEIGHT = 1.0          # 検索クエリの語の重み
+MAX_LOGGED_DROPS = 20       # 統計に表示する除外記事の最大数
+
+# 全分析タイプに共通する市場・経済の語
+MARKET_KEYWORDS = [
+    "stock", "share", "equities", "market", "index", "investor", "earnings", "profit", "rally", "selloff",
+    "record high", "bond", "yield", "dollar", "oil", "gold", "economy", "economic", "gdp", "growth",
+    "inflation", "recession", "fed", "central bank", "rate", "rate cut", "tariff", "trade", "bank", "estimate",
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.&'][a-z0-9]+)*")
+_COMPANY_SUFFIXES = {'co', 'ltd', 'inc', 'corp', 'class', 'h', 'holdings', 'group', 'limited', 'plc'}
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'to', 'was', 'with', 'after', 'amid', 'new', 'news', 'how', 'what',
+}
+
+
+def _stem(word):
+    # 所有格・複数形程度の簡易な語幹化（fed's → fed, stocks → stock, rates → rate）
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """小文字化・ストップワード除去・簡易な語幹化をした単語列"""
+    return [_stem(word) for word in _TOKEN_PATTERN.findall((text or '').lower()) if word not in _STOPWORDS]
+
+
+def company_terms(names):
+    """「BYD CO LTD-H」のような銘柄名から会社の種類・株式クラスを除いた検索語"""
+    terms = []
+    for name in names:
+        words = [word for word in tokenize(name.replace('-', ' ')) if word not in _COMPANY_SUFFIXES]
+        if words:
+            terms.append(" ".join(words))
+    return terms
+
+
+def build_profile(keywords, boosted=(), boost=COMPANY_WEIGHT):
+    """
+    キーワードプロファイル（語またはフレーズ -> 重み）を作成
+
+    Args:
+        keywords (list): 分析タイプに関連する語・フレーズ
+        boosted (list): 重みを上げる語・フレーズ（対象企業名・指数名）
+        boost (float): boosted の重み
+
+    Returns:
+        dict: 語幹化した語・フレーズ -> 重み
+    """
+    profile = {}
+    for keyword, weight in [(k, 1.0) for k in keywords] + [(k, boost) for k in boosted]:
+        term = " ".join(tokenize(keyword))
+        if term:
+            profile[term] = max(profile.get(term, 0.0), weight)
+    return profile
+
+
+def _term_counts(tokens, max_phrase):
+    """単語とフレーズ（max_phrase語まで）の出現回数"""
+    counts = {}
+    for size in range(1, max_phrase + 1):
+        for i in range(len(tokens) - size + 1):
+            term = " ".join(tokens[i:i + size])
+            counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def bm25_scores(profile, documents):
+    """
+    キーワードプロファイルに対する各文書のBM25スコア
+
+    IDFは同じ検索結果の記事の中で計算し、プロファイルの重みを掛ける。
+
+    Args:
+        profile (dict): 語・フレーズ -> 重み
+        documents (list): 文書（文字列）のリスト
+
+    Returns:
+        list: 文書ごとのスコア
+    """
+    if not documents:
+        return []
+    max_phrase = max((term.count(' ') + 1 for term in profile), default=1)
+    tokenized = [tokenize(doc) for doc in documents]
+    counts = [_term_counts(tokens, max_phrase) for tokens in tokenized]
+    lengths = [len(tokens) for tokens in tokenized]
+    average_length = sum(lengths) / len(lengths) or 1.0
+
+    total = len(documents)
+    idf = {}
+    for term in profile:
+        containing = sum(1 for doc_counts in counts if term in doc_counts)
+        idf[term] = max(MIN_IDF, math.log(1 + (total - containing + 0.5) / (containing + 0.5)))
+
+    scores = []
+    for doc_counts, length in zip(counts, lengths):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+        score = 0.0
+        for term, weight in profile.items():
+            tf = doc_counts.get(term, 0)
+            if tf:
+                score += weight * idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+class RelevanceFilter:
+    """分析タイプごとのキーワードプロファイルで記事の関連度を計算し、無関係な記事を除く"""
+    def __init__(self, profiles, cutoff=RELEVANCE_CUTOFF):
+        self.profiles = profiles    # 分析タイプ -> build_profile の結果
+        self.cutoff = cutoff
+        self.dropped = []           # (スコア, クエリ, タイトル) 調整用
+        self._lock = threading.Lock()
+        self.stats = {
+            'articles': 0,
+            'kept': 0,
+            'dropped': 0,
+            'elapsed': 0.0,   # スコア計算の合計時間（秒）
+        }
+
+    def filter(self, query, analysis_type, news_data):
+        """
+        関連度が閾値未満の記事を除き、残した記事に 'relevance' キーでスコアを付ける
+
+        Args:
+            query (str): 検索クエリ（語をプロファイルに加える）
+            analysis_type (str): 分析タイプ（プロファイルの選択）
+            news_data (list): 記事リスト
+
+        Returns:
+            tuple: (残した記事のリスト, 除外した記事のリスト)
+        """
+        if not news_data or self.cutoff <= 0:
+            return news_data, []
+
+        start = time.perf_counter()
+        profile = dict(self.profiles.get(analysis_type, {}))
+        for term, weight in build_profile(query.split()).items():
+            profile[term] = max(profile.get(term, 0.0), weight * QUERY_WEIGHT)
+        documents = [f"{item.get('title', '')} {item.get('snippet', '')}" for item in news_data]
+        scores = bm25_scores(profile, documents)
+
+        kept, dropped = [], []
+        for item, score in zip(news_data, scores):
+            if score >= self.cutoff:
+                kept.append(dict(item, relevance=round(score, 3)))
+            else:
+                dropped.append(item)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.stats['articles'] += len(news_data)
+            self.stats['kept'] += len(kept)
+            self.stats['dropped'] += len(dropped)
+            self.stats['elapsed'] += elapsed
+            self.dropped.extend((score, query, item.get('title', ''))
+                                for item, score in zip(news_data, scores) if score < self.cutoff)
+        return kept, dropped
+
+    def print_stats(self):
+        """採用・除外件数と除外した記事（閾値の調整用）を表示"""
+        print("\n=== 関連度フィルタ ===")
+        if self.cutoff <= 0:
+            print("フィルタなし（--relevance-cutoff 0）")
+            return
+        print(f"閾値: {self.cutoff:g} / 記事数: {self.stats['articles']}件 / "
+              f"採用: {self.stats['kept']}件 / 除外: {self.stats['dropped']}件 / "
+              f"計算時間: {self.stats['elapsed'] * 1000:.1f}ms")
+        for score, query, title in sorted(self.dropped, reverse=True)[:MAX_LOGGED_DROPS]:
+            print(f"  除外 {score:.2f} [{query}] {title[:70]}")
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from news_dedup import article_keys
+
+# クエリごとの分析結果の保存先（環境変数で変更可能）
+JOURNAL_DIR = os.getenv("NEWS_JOURNAL_DIR", ".run_journal")
+KEEP_DAYS = 7   # これより古い日付のジャーナルは削除する
+
+
+def config_fingerprint(config, options=None):
+    """
+    分析設定（クエリ・プロンプト・モデル等）と結果に影響するオプションのハッシュ
+
+    Args:
+        config (dict): load_config の結果
+        options (dict): 重複除去モード等、分析結果が変わるオプション
+
+    Returns:
+        str: 16桁のハッシュ
+    """
+    data = json.dumps({'config': config, 'options': options or {}}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def journal_path(config, options=None, day=None, directory=JOURNAL_DIR):
+    """日付・設定ごとのジャーナルファイルのパス（例: .run_journal/spac-20260101-<ハッシュ>.jsonl）"""
+    day = day or datetime.now().strftime('%Y%m%d')
+    return os.path.join(directory, f"{config['name']}-{day}-{config_fingerprint(config, options)}.jsonl")
+
+
+class RunJournal:
+    """
+    完了したクエリの分析結果を1行ずつ追記し、中断した実行を同じ日・同じ設定で再開する
+
+    1行は {'category', 'query', 'analysis', 'news_count', 'fingerprints'} のJSON。
+    書き込みごとにfsyncするため、プロセスが強制終了されても完了済みのクエリは残る
+    （書きかけの最終行は読み込み時に無視する）。
+    """
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.resume = resume
+        self.completed = self._load() if resume else {}   # (カテゴリ, クエリ) -> 記録
+        self._lock = threading.Lock()
+        self.stats = {
+            'restored': 0,      # 再開時に分析を省略したクエリ
+            'recorded': 0,      # 今回の実行で記録したクエリ
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._remove_old(directory)
+        # 再開しない場合は同じ日・同じ設定の記録をやり直す
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    completed[(record['category'], record['query'])] = record
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return completed
+
+    def _remove_old(self, directory):
+        # ファイル名の日付が KEEP_DAYS より古いジャーナルを削除
+        cutoff = (datetime.now().toordinal() - KEEP_DAYS)
+        for name in os.listdir(directory):
+            parts = name.rsplit('-', 2)
+            if len(parts) != 3 or not name.endswith('.jsonl'):
+                continue
+            try:
+                day = datetime.strptime(parts[1], '%Y%m%d').toordinal()
+            except ValueError:
+                continue
+            if day < cutoff:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def lookup(self, category, query):
+        """
+        再開前の実行で完了したクエリの記録
+
+        Returns:
+            dict: {'query', 'analysis', 'news_count', 'fingerprints'}。未完了なら None
+        """
+        return self.completed.get((category, query))
+
+    def restore(self, category, query):
+        """完了済みのクエリの分析結果を返し、省略したクエリとして数える（未完了なら None）"""
+        record = self.lookup(category, query)
+        if record is None:
+            return None
+        with self._lock:
+            self.stats['restored'] += 1
+        return {'query': record['query'], 'analysis': record['analysis'], 'news_count': record['news_count']}
+
+    def record(self, category, query, analysis, news_data):
+        """
+        完了したクエリの分析結果を追記
+
+        Args:
+            category (str): 分析タイプ（カテゴリ名）
+            query (str): 検索クエリ
+            analysis (str): 分析結果
+            news_data (list): 分析した記事（参照のみの記事は指紋に含めない）
+        """
+        record = {
+            'category': category,
+            'query': query,
+            'analysis': analysis,
+            'news_count': len(news_data),
+            'fingerprints': [article_keys(item) for item in news_data if not item.get('shared_with')],
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.completed[(category, query)] = record
+            self.stats['recorded'] += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def print_stats(self):
+        """再開で省略したクエリ数・記録したクエリ数を表示"""
+        print("\n=== 実行ジャーナル ===")
+        print(f"保存先: {self.path}")
+        if self.resume:
+            print(f"再開: 完了済み {self.stats['restored']}件の検索・分析を省略")
+        print(f"記録: {self.stats['recorded']}件")
@@ -0,0 +1 @@
+python pipeline.py
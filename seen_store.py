@@ -0,0 +1,271 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from news_dedup import article_keys
+
+# 保存先DB（環境変数で変更可能）
+SEEN_DB = os.getenv("SEEN_DB", "seen_articles.db")
+RETENTION_DAYS = 7  # 検索対象（直近1週間）を過ぎた記事・分析は削除する
+
+# 分析結果の形式（structured: JSON / freeform: 自由記述）
+MODES = ('structured', 'freeform')
+
+# 分析済み記事・分析結果は (分析設定, 形式, 分析タイプ, クエリ) ごとに持つ
+# （同じクエリを複数の設定・カテゴリで使っても、互いの分析済み記事を上書きしない。
+#   別の形式で書いた分析結果は差分更新・再利用に使わない）
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_articles (
+    config TEXT NOT NULL,          -- 分析設定の name（例: spac）
+    mode TEXT NOT NULL,            -- 分析結果の形式（structured / freeform）
+    analysis_type TEXT NOT NULL,   -- カテゴリの name（例: us_economy）
+    query TEXT NOT NULL,
+    article_key TEXT NOT NULL,     -- 'link:' / 'title:' + 正規化した値のハッシュ
+    first_seen REAL NOT NULL,      -- 初めて分析に含めた時刻（UNIX秒）
+    PRIMARY KEY (config, mode, analysis_type, query, article_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_articles_first_seen ON seen_articles (first_seen);
+CREATE TABLE IF NOT EXISTS query_analyses (
+    config TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    analysis_type TEXT NOT NULL,
+    query TEXT NOT NULL,
+    analysis TEXT NOT NULL,        -- 直近の分析結果
+    created_at REAL NOT NULL,      -- 最初に全件を分析した時刻（UNIX秒）
+    updated_at REAL NOT NULL,      -- 最後に更新した時刻（UNIX秒）
+    PRIMARY KEY (config, mode, analysis_type, query)
+);
+"""
+# 各表のキーに必要な列（これがない旧形式の表は作り直す）
+KEY_COLUMNS = ('config', 'mode', 'analysis_type')
+
+UPDATE_INSTRUCTIONS = """
+
+【Previous Analysis (as of {updated_at})】
+{previous}
+
+Incremental Update Instructions:
+- The news list above contains ONLY articles published since the previous analysis
+- Update the previous analysis with these new articles and output the complete updated analysis
+- Keep the same output format and language as the previous analysis
+- Keep points from the previous analysis that are still valid; revise those contradicted by the new articles
+"""
+
+
+def build_update_prompt(prompt, previous_analysis, updated_at):
+    """新着記事のみのプロンプトに前回の分析を付けて差分更新用のプロンプトにする"""
+    return prompt + UPDATE_INSTRUCTIONS.format(
+        updated_at=time.strftime('%Y/%m/%d %H:%M', time.localtime(updated_at)),
+        previous=previous_analysis,
+    )
+
+
+def _upgrade(conn):
+    """
+    キーの列が足りない旧形式の表を削除する（差分実行用のため、削除しても次回は全件分析するだけ）
+
+    Returns:
+        bool: 削除したか
+    """
+    outdated = False
+    for table in ('seen_articles', 'query_analyses'):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if columns and not set(KEY_COLUMNS) <= columns:
+            outdated = True
+    if outdated:
+        conn.execute("DROP TABLE IF EXISTS seen_articles")
+        conn.execute("DROP TABLE IF EXISTS query_analyses")
+    return outdated
+
+
+class SeenStore:
+    """分析設定・形式のクエリ（分析タイプ・クエリ）ごとに分析済みの記事と直近の分析結果を保存するSQLiteストア"""
+    def __init__(self, db_path=SEEN_DB, config_name='', mode='freeform', retention_days=RETENTION_DAYS):
+        if mode not in MODES:
+            raise ValueError(f"不明な分析結果の形式: {mode}")
+        self.db_path = db_path
+        self.config_name = config_name    # 分析設定の name（同じDBを共有する設定を区別する）
+        self.mode = mode                  # 分析結果の形式（--structured の有無で分ける）
+        self.retention = retention_days * 24 * 3600
+        self._local = threading.local()
+        with self._connection() as conn:
+            _upgrade(conn)
+            conn.executescript(SCHEMA)
+        self.stats = {
+            'new': 0,          # 新着記事
+            'seen': 0,         # 分析済みの記事
+            'reused': 0,       # 新着なしで前回の分析を再利用したクエリ
+            'updated': 0,      # 新着記事のみで差分更新したクエリ
+            'full': 0,         # 前回の分析がなく全件を分析したクエリ
+            'compacted': 0,    # 保持期間を過ぎて削除した行
+        }
+        self._stats_lock = threading.Lock()
+
+    def _connection(self):
+        # sqlite3の接続はスレッドをまたげないためスレッドごとに作成する
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def count(self, name, value=1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def split_new(self, query, analysis_type, news_data):
+        """
+        記事を新着と分析済みに分ける
+
+        Args:
+            query (str): 検索クエリ
+            analysis_type (str): 分析タイプ（カテゴリの name）
+            news_data (list): 記事リスト
+
+        Returns:
+            tuple: (新着記事のリスト, 分析済み記事のリスト)
+        """
+        conn = self._connection()
+        new_items, seen_items = [], []
+        for item in news_data:
+            keys = article_keys(item)
+            placeholders = ",".join("?" * len(keys))
+            row = conn.execute(
+                f"SELECT 1 FROM seen_articles WHERE config = ? AND mode = ? AND analysis_type = ? AND query = ? "
+                f"AND article_key IN ({placeholders}) LIMIT 1",
+                [self.config_name, self.mode, analysis_type, query, *keys]
+            ).fetchone() if keys else None
+            (seen_items if row else new_items).append(item)
+        self.count('new', len(new_items))
+        self.count('seen', len(seen_items))
+        return new_items, seen_items
+
+    def previous_analysis(self, query, analysis_type):
+        """
+        前回の分析結果を返す（同じ形式で書いたもののみ）
+
+        Returns:
+            tuple: (分析結果, 更新時刻)。なければ (None, None)
+        """
+        row = self._connection().execute(
+            """
+            SELECT analysis, updated_at FROM query_analyses
+            WHERE config = ? AND mode = ? AND analysis_type = ? AND query = ?
+            """,
+            (self.config_name, self.mode, analysis_type, query)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def save_analysis(self, query, analysis_type, analysis, news_data, full=False):
+        """分析結果を保存し、分析に含めた記事を分析済みにする（1トランザクション）"""
+        now = time.time()
+        scope = (self.config_name, self.mode, analysis_type, query)
+        conn = self._connection()
+        with conn:
+            if full:
+                # 全件分析した場合は同じ設定・形式・分析タイプ・クエリの分析済み記事を入れ替える
+                conn.execute(
+                    "DELETE FROM seen_articles WHERE config = ? AND mode = ? AND analysis_type = ? AND query = ?",
+                    scope
+                )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO query_analyses
+                        (config, mode, analysis_type, query, analysis, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (*scope, analysis, now, now)
+                )
+            else:
+                conn.execute(
+                    """
+                    UPDATE query_analyses SET analysis = ?, updated_at = ?
+                    WHERE config = ? AND mode = ? AND analysis_type = ? AND query = ?
+                    """,
+                    (analysis, now, *scope)
+                )
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO seen_articles (config, mode, analysis_type, query, article_key, first_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [(*scope, key, now) for item in news_data for key in article_keys(item)]
+            )
+
+    def compact(self, now=None):
+        """
+        保持期間（検索対象の1週間）を過ぎた記事と分析結果を削除する
+
+        全件分析から保持期間が経過した分析結果は、差分の積み重ねで古い記事の内容が
+        残り続けないように削除し、次回は全件を分析し直す。
+
+        Returns:
+            int: 削除した行数
+        """
+        cutoff = (now or time.time()) - self.retention
+        conn = self._connection()
+        with conn:
+            deleted = conn.execute("DELETE FROM seen_articles WHERE first_seen < ?", (cutoff,)).rowcount
+            deleted += conn.execute("DELETE FROM query_analyses WHERE created_at < ?", (cutoff,)).rowcount
+        self.count('compacted', deleted)
+        return deleted
+
+    def print_stats(self):
+        """差分実行の統計を表示"""
+        print("\n=== 差分実行（--incremental） ===")
+        print(f"新着記事: {self.stats['new']}件 / 分析済み記事: {self.stats['seen']}件")
+        print(f"前回の分析を再利用: {self.stats['reused']}クエリ / 差分更新: {self.stats['updated']}クエリ / "
+              f"全件分析: {self.stats['full']}クエリ")
+        print(f"保持期間切れで削除: {self.stats['compacted']}行")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析済み記事ストア（SQLite）")
+    parser.add_argument('--db', default=SEEN_DB, help="DBファイルのパス（既定: $SEEN_DB）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('info', help="クエリごとの分析済み記事数と最終更新")
+    subparsers.add_parser('compact', help="保持期間を過ぎた記事・分析を削除")
+    p = subparsers.add_parser('reset', help="クエリの記録を削除（次回は全件分析）")
+    p.add_argument('query')
+    p.add_argument('--config', help="分析設定の name（省略時はすべての設定）")
+    args = parser.parse_args()
+
+    store = SeenStore(args.db)
+    conn = store._connection()
+    if args.command == 'compact':
+        print(f"削除: {store.compact()}行")
+    elif args.command == 'reset':
+        where = "query = ?" + (" AND config = ?" if args.config else "")
+        params = (args.query, args.config) if args.config else (args.query,)
+        with conn:
+            conn.execute(f"DELETE FROM seen_articles WHERE {where}", params)
+            conn.execute(f"DELETE FROM query_analyses WHERE {where}", params)
+        print(f"削除しました: {args.query}")
+    else:
+        rows = conn.execute(
+            """
+            SELECT a.config, a.mode, a.analysis_type, a.query, a.updated_at,
+                   (SELECT COUNT(*) FROM seen_articles s
+                    WHERE s.config = a.config AND s.mode = a.mode AND s.analysis_type = a.analysis_type
+                      AND s.query = a.query)
+            FROM query_analyses a ORDER BY a.config, a.query, a.analysis_type, a.mode
+            """
+        ).fetchall()
+        for config, mode, analysis_type, query, updated_at, keys in rows:
+            updated = time.strftime('%Y/%m/%d %H:%M', time.localtime(updated_at))
+            print(f"{query} [{config}:{analysis_type} {mode}]: 指紋{keys}件 / 最終更新 {updated}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import structured_analysis
+
+# 保存先DB（環境変数で変更可能）
+SENTIMENT_DB = os.getenv("SENTIMENT_DB", "news_sentiment.db")
+# 表示する指数（「設定:カテゴリ」のカンマ区切り、例: spac:sp500,china:china。空ならすべて）
+SENTIMENT_SERIES = [name for name in os.getenv("SENTIMENT_SERIES", "").split(',') if name]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_index (
+    config TEXT NOT NULL,          -- 分析設定の name（例: spac）
+    category TEXT NOT NULL,        -- カテゴリの name（例: sp500）
+    date TEXT NOT NULL,            -- 実行日 YYYY/MM/DD（文字列順 = 日付順、fund_history と同じ形式。基準日との結合は align_to_trading_days）
+    title TEXT NOT NULL,           -- 表示名（カテゴリの title）
+    score REAL NOT NULL,           -- -100（弱気）〜 +100（強気）
+    impact TEXT,                   -- 最大の影響度（超大/高/中/低）
+    queries INTEGER NOT NULL,      -- スコアに使ったクエリ数
+    news_count INTEGER NOT NULL,   -- スコアに使った記事数
+    source TEXT NOT NULL,          -- 'structured'（JSON分析）/ 'freeform'（自由記述の要因の数）
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (config, category, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sentiment_index_date ON sentiment_index (date);
+"""
+
+_IMPACT_TAG = re.compile(r'\[(超大|高|中|低)\]')
+_HEADING = re.compile(r'^\s*(\*\*|【)')
+_IMPACT_LINE = re.compile(r'影響度:\s*\**\s*(超大|高|中|低)')
+
+
+def freeform_score(text):
+    """
+    自由記述の分析結果から要因の数でスコアを概算する（-100〜+100）
+
+    「上昇要因」「ポジティブ要因」の見出し以下の項目を正、「下落要因」「ネガティブ要因」以下を負とし、
+    項目の [影響度] で重み付けする。要因の項目がなければ None。
+    """
+    sign = 0
+    positive = negative = 0
+    for line in text.splitlines():
+        if _HEADING.match(line):
+            if '要因' in line and ('上昇' in line or 'ポジティブ' in line):
+                sign = 1
+            elif '要因' in line and ('下落' in line or 'ネガティブ' in line):
+                sign = -1
+            else:
+                sign = 0
+            continue
+        if sign == 0 or not line.lstrip().startswith('-'):
+            continue
+        match = _IMPACT_TAG.search(line)
+        weight = structured_analysis.IMPACT_LEVELS[match.group(1)] if match else 1
+        if sign > 0:
+            positive += weight
+        else:
+            negative += weight
+    if positive + negative == 0:
+        return None
+    return round((positive - negative) / (positive + negative) * 100, 1)
+
+
+def category_index(results, structured=False):
+    """
+    カテゴリの分析結果から当日の指数を計算する（LLMは使わない）
+
+    構造化モードでは structured_analysis.aggregate と同じスコア、自由記述では freeform_score を
+    クエリの記事数で加重平均する。
+
+    Args:
+        results (list): {'query', 'analysis', 'news_count'} のリスト
+        structured (bool): 分析結果がJSON（--structured）か
+
+    Returns:
+        dict: {'score', 'impact', 'queries', 'news_count', 'source'}。スコアを付けられなければ None
+    """
+    if structured:
+        summary = structured_analysis.aggregate([('', 1.0, results)])['categories'][0]
+        if summary['score'] is None:
+            return None
+        scored = {query['query'] for query in summary['queries']}
+        return {
+            'score': summary['score'],
+            'impact': summary['impact'],
+            'queries': len(summary['queries']),
+            'news_count': sum(result['news_count'] for result in results if result['query'] in scored),
+            'source': 'structured',
+        }
+
+    scored = [(result, freeform_score(result['analysis'])) for result in results]
+    scored = [(result, score) for result, score in scored if score is not None]
+    if not scored:
+        return None
+    total = sum(max(1, result['news_count']) for result, _ in scored)
+    impacts = [match.group(1) for match in (_IMPACT_LINE.search(result['analysis']) for result, _ in scored) if match]
+    return {
+        'score': round(sum(max(1, result['news_count']) * score for result, score in scored) / total, 1),
+        'impact': max(impacts, key=structured_analysis.IMPACT_LEVELS.get, default=None),
+        'queries': len(scored),
+        'news_count': sum(result['news_count'] for result, _ in scored),
+        'source': 'freeform',
+    }
+
+
+class SentimentStore:
+    """カテゴリごとの日次ニュースセンチメント指数を (設定, カテゴリ, 日付) をキーに保存するSQLiteストア"""
+    def __init__(self, db_path=SENTIMENT_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite3の接続はスレッドをまたげないためスレッドごとに作成する
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def record(self, config_name, category, date, index):
+        """
+        当日の指数を保存する（同じ日に再実行した場合は上書き）
+
+        Args:
+            config_name (str): 分析設定の name
+            category (dict): カテゴリ設定（'name', 'title'）
+            date (str): 実行日 YYYY/MM/DD
+            index (dict): category_index の結果
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO sentiment_index
+                    (config, category, date, title, score, impact, queries, news_count, source, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (config, category, date) DO UPDATE SET
+                    title = excluded.title,
+                    score = excluded.score,
+                    impact = excluded.impact,
+                    queries = excluded.queries,
+                    news_count = excluded.news_count,
+                    source = excluded.source,
+                    updated_at = excluded.updated_at
+                """,
+                (config_name, category['name'], date, category['title'], index['score'], index['impact'],
+                 index['queries'], index['news_count'], index['source'], time.time())
+            )
+
+    def series(self, selected=None):
+        """
+        保存済みの指数の一覧（表示順）
+
+        Args:
+            selected (list): 「設定:カテゴリ」で指定した表示する指数（指定順に並べる）。Noneならすべて
+
+        Returns:
+            list: (設定, カテゴリ, 表示名) のリスト（表示名は最新の記録のもの）
+        """
+        cursor = self._connection().execute(
+            """
+            SELECT config, category, title FROM sentiment_index AS s
+            WHERE date = (SELECT MAX(date) FROM sentiment_index WHERE config = s.config AND category = s.category)
+            ORDER BY config, category
+            """
+        )
+        series = [tuple(row) for row in cursor]
+        if selected is None:
+            return series
+        by_name = {f"{config}:{category}": (config, category, title) for config, category, title in series}
+        return [by_name[name] for name in selected if name in by_name]
+
+    def read_range(self, start_date=None, end_date=None):
+        """
+        日付範囲の指数を読み込む
+
+        Args:
+            start_date (str): 開始日 YYYY/MM/DD（含む）。Noneなら最初から
+            end_date (str): 終了日 YYYY/MM/DD（含む）。Noneなら最後まで
+
+        Returns:
+            dict: 日付 -> {(設定, カテゴリ): {'score', 'impact', 'queries', 'news_count', 'source'}}
+        """
+        sql = "SELECT date, config, category, score, impact, queries, news_count, source FROM sentiment_index WHERE 1 = 1"
+        params = []
+        if start_date:
+            sql += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND date <= ?"
+            params.append(end_date)
+        index = {}
+        for date, config, category, score, impact, queries, news_count, source in self._connection().execute(sql, params):
+            index.setdefault(date, {})[(config, category)] = {
+                'score': score, 'impact': impact, 'queries': queries, 'news_count': news_count, 'source': source,
+            }
+        return index
+
+
+def align_to_trading_days(index, trading_dates, since=None):
+    """
+    実行日ごとの指数を基準価額の日付（取引日）に結合する
+
+    各取引日には、前の取引日の翌日からその取引日までに実行した記録のうち、指数ごとに最新のものを結合する。
+    休日・週末に実行した記録は次の取引日に表示され、取引日より後に実行した記録は使わない（先読みしない）。
+    実行日と取引日が異なる記録には 'run_date'（実行日）を付ける。
+
+    Args:
+        index (dict): read_range の結果（実行日 -> {(設定, カテゴリ): 指数}）
+        trading_dates (list): 取引日 YYYY/MM/DD のリスト（昇順）
+        since (str): 最初の取引日の前の取引日（これ以前の実行日は結合しない）。Noneなら制限なし
+
+    Returns:
+        dict: 取引日 -> {(設定, カテゴリ): 指数}（記録のない取引日は含めない）
+    """
+    run_dates = sorted(index)
+    aligned = {}
+    position = 0
+    for trading_date in trading_dates:
+        entries = {}
+        while position < len(run_dates) and run_dates[position] <= trading_date:
+            run_date = run_dates[position]
+            position += 1
+            if since is not None and run_date <= since:
+                continue
+            for key, entry in index[run_date].items():
+                # 実行日の昇順に上書きするため、指数ごとに最新の記録が残る
+                entries[key] = entry if run_date == trading_date else dict(entry, run_date=run_date)
+        if entries:
+            aligned[trading_date] = entries
+    return aligned
+
+
+def open_default_index():
+    """SENTIMENT_DB があればストアを開く（なければNone。表示側は新たにDBを作らない）"""
+    if not os.path.exists(SENTIMENT_DB):
+        return None
+    return SentimentStore(SENTIMENT_DB)
+
+
+def format_row(series, entries):
+    """
+    1日分の指数を1行の表示にする（記録のない指数は「記録なし」）
+
+    Args:
+        series (list): SentimentStore.series の結果
+        entries (dict): read_range・align_to_trading_days の1日分（記録のない日は空の辞書）
+
+    Returns:
+        list: (テキスト, スコア) のリスト（スコアは色分け用、記録なしは None）
+    """
+    parts = []
+    for config, category, title in series:
+        entry = entries.get((config, category))
+        if entry is None:
+            parts.append((f"{title} 記録なし", None))
+            continue
+        text = f"{title} {entry['score']:+.1f}（{structured_analysis.outlook(entry['score'])}）"
+        if entry['source'] == 'freeform':
+            text += "*"
+        if entry.get('run_date'):
+            text += f"［{entry['run_date'][5:]}実行］"
+        parts.append((text, entry['score']))
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日次ニュースセンチメント指数（SQLite）")
+    parser.add_argument('--db', default=SENTIMENT_DB, help="DBファイルのパス（既定: $SENTIMENT_DB）")
+    parser.add_argument('--days', type=int, default=14, help="表示する日数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"指数が保存されていません: {args.db}")
+        return
+    store = SentimentStore(args.db)
+    series = store.series()
+    end = datetime.now()
+    index = store.read_range((end - timedelta(days=args.days - 1)).strftime('%Y/%m/%d'), end.strftime('%Y/%m/%d'))
+    for offset in range(args.days - 1, -1, -1):
+        date = (end - timedelta(days=offset)).strftime('%Y/%m/%d')
+        print(f"{date}: " + " / ".join(text for text, _ in format_row(series, index.get(date, {}))))
+    print("* 自由記述の分析結果の要因の数から概算")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+HISTORY_PATH = re.compile(r'^/quote/(?P<fund_id>[0-9A-Za-z]+)/history/?$')
+NEWS_SEARCH_PATH = '/search'
+NEWS_FEED_PATH = '/rss/search'
+CHAT_COMPLETIONS_PATH = '/api/v1/chat/completions'
+
+QUERY_IN_PROMPT = re.compile(r'Search Query: "(?P<query>[^"]*)"')
+CATEGORY_IN_PROMPT = re.compile(r'Category: "(?P<category>[^"]*)"')
+STRUCTURED_IN_PROMPT = 'Respond with a single JSON object'
+FEED_DATE = re.compile(rb'<(?P<tag>pubDate|lastBuildDate)>(?P<date>[^<]+)</(?P=tag)>')
+
+
+def query_slug(query):
+    """検索クエリからフィクスチャ名を作成（例: "S&P 500" -> "s_p_500"）"""
+    return re.sub(r'[^a-z0-9]+', '_', query.lower()).strip('_')
+
+
+def load_fixture_bytes(*parts):
+    path = os.path.join(FIXTURE_DIR, *parts)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def shift_feed_dates(body):
+    """
+    RSSフィクスチャの日時を、lastBuildDate（記録時刻）が現在になるようずらす
+
+    検索ページのフィクスチャの「2 hours ago」等と同じく、記事の新しさが実行日に対して保たれる。
+    """
+    built = re.search(rb'<lastBuildDate>([^<]+)</lastBuildDate>', body)
+    if not built:
+        return body
+    offset = datetime.now(timezone.utc) - parsedate_to_datetime(built.group(1).decode())
+
+    def shifted(match):
+        date = format_datetime(parsedate_to_datetime(match.group('date').decode()) + offset, usegmt=True)
+        return b'<%s>%s</%s>' % (match.group('tag'), date.encode(), match.group('tag'))
+    return FEED_DATE.sub(shifted, body)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """記録済みフィクスチャを返すスタンドインサーバーのハンドラ"""
+    protocol_version = 'HTTP/1.1'
+    # keep-alive接続でヘッダーと本文を別々に送る際のNagle + 遅延ACKによる待ちを避ける
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        # 応答を送る前に数える（送信後だとクライアントの次の reset_counts より後に数えることがある）
+        self.server.count_request(urlparse(self.path).path, status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_fault(self):
+        """遅延・エラー・429を設定に従って注入する（注入した場合True）"""
+        server = self.server
+        if server.latency > 0 or server.jitter > 0:
+            time.sleep(server.latency + server.random() * server.jitter)
+
+        roll = server.random()
+        if roll < server.rate_429:
+            self._send(429, b'Too Many Requests', 'text/plain',
+                       headers={'Retry-After': f"{server.retry_after:g}"})
+            return True
+        if roll < server.rate_429 + server.error_rate:
+            self._send(500, b'Internal Server Error', 'text/plain')
+            return True
+        return False
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if self._inject_fault():
+            return
+
+        match = HISTORY_PATH.match(parsed.path)
+        if match:
+            page = int(query.get('page', ['1'])[0])
+            body = load_fixture_bytes('yahoo', f"{match.group('fund_id')}_history_p{page}.html")
+            if body is None:
+                self._send(404, b'Not Found')
+            else:
+                self._send(200, body)
+            return
+
+        if parsed.path == NEWS_SEARCH_PATH:
+            search_query = query.get('q', [''])[0]
+            body = load_fixture_bytes('google_news', f"{query_slug(search_query)}.html")
+            if body is None:
+                body = load_fixture_bytes('google_news', 'default.html')
+            self._send(200, body)
+            return
+
+        if parsed.path == NEWS_FEED_PATH:
+            search_query = query.get('q', [''])[0]
+            body = load_fixture_bytes('google_news_rss', f"{query_slug(search_query)}.xml")
+            if body is None:
+                body = load_fixture_bytes('google_news_rss', 'default.xml')
+            self._send(200, shift_feed_dates(body), 'application/rss+xml; charset=utf-8')
+            return
+
+        self._send(404, b'Not Found')
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if self._inject_fault():
+            return
+
+        if parsed.path != CHAT_COMPLETIONS_PATH:
+            self._send(404, b'Not Found')
+            return
+
+        try:
+            payload = json.loads(raw.decode('utf-8'))
+            prompt = payload['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError):
+            self._send(400, b'{"error": "invalid request"}', 'application/json')
+            return
+
+        model = payload.get('model')
+        self.server.count_model(model)
+        if model in self.server.failing_models:
+            # プロバイダー障害の再現
+            self._send(503, b'{"error": {"message": "provider unavailable"}}', 'application/json')
+            return
+
+        if payload.get('stream'):
+            self._send_stream(payload, prompt)
+            return
+
+        self._send(200, json.dumps(self.server.completion(payload, prompt), ensure_ascii=False).encode('utf-8'),
+                   'application/json')
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, payload, prompt):
+        """chat/completions のストリーミング応答（server-sent-events, chunked）"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.server.count_request(urlparse(self.path).path, 200)
+
+        # OpenRouterと同様に生成開始までコメント行を送る
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+        for delay, event in self.server.completion_events(payload, prompt):
+            if delay > 0:
+                time.sleep(delay)
+            self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Yahoo!ファイナンス・Google News・OpenRouterの代わりにローカルで応答するサーバー"""
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, rate_429=0.0,
+                 retry_after=1.0, llm_latency=0.0, llm_ttft=None, failing_models=(), model_latency=None,
+                 llm_tail_rate=0.0, llm_tail_latency=0.0, llm_prompt_latency=0.0, seed=None):
+        super().__init__(address, StandInHandler)
+        self.latency = latency          # 全レスポンス共通の遅延（秒）
+        self.jitter = jitter            # 遅延に加える一様乱数の幅（秒）
+        self.error_rate = error_rate    # 500を返す確率
+        self.rate_429 = rate_429        # 429を返す確率
+        self.retry_after = retry_after  # 429のRetry-After（秒）
+        self.llm_latency = llm_latency  # LLM応答に追加する生成時間（秒）
+        # ストリーミング時の最初のトークンまでの時間（秒、既定は生成時間の1割）
+        self.llm_ttft = llm_ttft
+        self.model_latency = dict(model_latency or {})  # モデルごとの生成時間（秒、llm_latencyより優先）
+        self.llm_tail_rate = llm_tail_rate              # 生成時間が長引く（テールレイテンシ）確率
+        self.llm_tail_latency = llm_tail_latency        # 長引いた場合に追加する秒数
+        self.llm_prompt_latency = llm_prompt_latency    # プロンプト1000トークンごとに追加する生成時間（秒）
+        self.failing_models = set(failing_models)  # 常に503を返すモデル
+        self.request_counts = {}
+        self.model_counts = {}          # モデルごとのLLMリクエスト数
+        self.status_counts = {}
+        self.prompt_tokens = 0          # 受け付けたプロンプトのトークン数（概算）の合計
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openrouter_base_url(self):
+        return f"{self.base_url}/api/v1"
+
+    def random(self):
+        with self._lock:
+            return self._rng.random()
+
+    def count_request(self, path, status):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def count_model(self, model):
+        with self._lock:
+            self.model_counts[model] = self.model_counts.get(model, 0) + 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+            self.model_counts.clear()
+            self.status_counts.clear()
+            self.prompt_tokens = 0
+
+    def completion_text(self, prompt):
+        """プロンプトに応じた記録済みの応答本文を返す"""
+        match = CATEGORY_IN_PROMPT.search(prompt)
+        if match:
+            template = load_fixture_bytes('openrouter', 'digest.txt').decode('utf-8')
+            return template.replace('{category}', match.group('category'))
+        match = QUERY_IN_PROMPT.search(prompt)
+        if match and STRUCTURED_IN_PROMPT in prompt:
+            template = load_fixture_bytes('openrouter', 'analysis.json').decode('utf-8')
+            return template.replace('{query}', json.dumps(match.group('query'), ensure_ascii=False)[1:-1])
+        if match:
+            template = load_fixture_bytes('openrouter', 'analysis.txt').decode('utf-8')
+            return template.replace('{query}', match.group('query'))
+        return load_fixture_bytes('openrouter', 'summary.txt').decode('utf-8')
+
+    def _accept_prompt(self, prompt):
+        text = self.completion_text(prompt)
+        with self._lock:
+            self.prompt_tokens += len(prompt) // 4
+        return text
+
+    def generation_time(self, model, prompt=''):
+        """モデルごとの生成時間（プロンプトの長さに比例する時間とテールレイテンシを加える）"""
+        latency = self.model_latency.get(model, self.llm_latency)
+        latency += self.llm_prompt_latency * len(prompt) / 4 / 1000
+        if self.llm_tail_rate > 0 and self.random() < self.llm_tail_rate:
+            latency += self.llm_tail_latency
+        return latency
+
+    def completion(self, payload, prompt):
+        """OpenRouterのchat/completions形式のレスポンスを作成"""
+        latency = self.generation_time(payload.get('model'), prompt)
+        if latency > 0:
+            time.sleep(latency)
+        text = self._accept_prompt(prompt)
+        return {
+            'id': f"standin-{int(time.time() * 1000)}",
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 2},
+        }
+
+    def completion_events(self, payload, prompt, chunk_lines=1):
+        """
+        ストリーミング応答のイベントを (送信前の待機秒数, イベント) の順に返す
+
+        最初のチャンクは llm_ttft（既定は生成時間の1割）後に送り、残りの生成時間を以降のチャンクに均等に割り振る。
+        """
+        latency = self.generation_time(payload.get('model'), prompt)
+        ttft = latency * 0.1 if self.llm_ttft is None else min(self.llm_ttft, latency)
+        text = self._accept_prompt(prompt)
+        lines = text.splitlines(keepends=True) or ['']
+        pieces = [''.join(lines[i:i + chunk_lines]) for i in range(0, len(lines), chunk_lines)]
+        interval = (latency - ttft) / max(1, len(pieces) - 1)
+        response_id = f"standin-{int(time.time() * 1000)}"
+        for i, piece in enumerate(pieces):
+            yield (ttft if i == 0 else interval), {
+                'id': response_id,
+                'model': payload.get('model'),
+                'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': piece}, 'finish_reason': None}],
+            }
+        yield 0, {
+            'id': response_id,
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 2},
+        }
+
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """
+    スタンドインサーバーをバックグラウンドスレッドで起動する
+
+    Args:
+        host (str): 待ち受けアドレス
+        port (int): ポート番号（0なら空きポート）
+        **options: StandInServerの遅延・エラー注入設定
+
+    Returns:
+        StandInServer: 起動したサーバー（base_urlで接続先を取得できる）
+    """
+    server = StandInServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def parse_model_latency(values):
+    """MODEL=SECONDS 形式の指定を辞書にする"""
+    latencies = {}
+    for value in values:
+        model, _, seconds = value.rpartition('=')
+        latencies[model] = float(seconds)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オフライン検証用スタンドインHTTPサーバー")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="レスポンス遅延（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="遅延のばらつき（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="500を返す確率")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="429を返す確率")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="429のRetry-After（秒）")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="LLM応答の追加遅延（秒）")
+    parser.add_argument('--llm-ttft', type=float, default=None,
+                        help="ストリーミング時の最初のトークンまでの時間（秒、既定は遅延の1割）")
+    parser.add_argument('--failing-models', nargs='*', default=[], help="常に503を返すモデル")
+    parser.add_argument('--model-latency', nargs='*', default=[], metavar='MODEL=SECONDS',
+                        help="モデルごとの生成時間（秒）")
+    parser.add_argument('--llm-tail-rate', type=float, default=0.0, help="LLM応答が長引く確率")
+    parser.add_argument('--llm-tail-latency', type=float, default=0.0, help="長引いた場合の追加遅延（秒）")
+    parser.add_argument('--llm-prompt-latency', type=float, default=0.0,
+                        help="プロンプト1000トークンごとに追加する生成時間（秒）")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, rate_429=args.rate_429,
+                           retry_after=args.retry_after, llm_latency=args.llm_latency,
+                           llm_ttft=args.llm_ttft, failing_models=args.failing_models,
+                           model_latency=parse_model_latency(args.model_latency),
+                           llm_tail_rate=args.llm_tail_rate, llm_tail_latency=args.llm_tail_latency,
+                           llm_prompt_latency=args.llm_prompt_latency, seed=args.seed)
+    print(f"スタンドインサーバー起動: {server.base_url}")
+    print(f"  YAHOO_BASE_URL={server.base_url}")
+    print(f"  GOOGLE_NEWS_BASE_URL={server.base_url}")
+    print(f"  OPENROUTER_BASE_URL={server.openrouter_base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import re
+
+# 影響度・方向の重み（スコアは -100〜+100）
+IMPACT_LEVELS = {'超大': 4, '高': 3, '中': 2, '低': 1}
+DIRECTIONS = {'positive': 1, 'negative': -1, 'neutral': 0, 'mixed': 0}
+CONFIDENCE_LEVELS = ('高', '中', '低')
+ARTICLE_SCORE_RANGE = (-2, 2)   # 記事ごとのスコア（-2: 強いネガティブ 〜 +2: 強いポジティブ）
+BULLISH_THRESHOLD = 20          # これ以上なら強気、-BULLISH_THRESHOLD 以下なら弱気
+
+_CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+class SchemaError(ValueError):
+    """LLMの応答がJSONでない、またはスキーマに合わない"""
+
+
+def create_structured_prompt(today, query, title, news_text, target_companies=()):
+    """
+    クエリ分析の結果を決まったJSONで返させるプロンプトを作成
+
+    Args:
+        today (str): 今日の日付
+        query (str): 検索クエリ
+        title (str): カテゴリ名（英語、評価の対象）
+        news_text (str): ニュース一覧テキスト
+        target_companies (list): 影響を評価する対象企業
+
+    Returns:
+        str: プロンプト
+    """
+    companies = f"\nTarget companies: {', '.join(target_companies)}" if target_companies else ""
+    return f"""
+Today's Date: {today}
+Search Query: "{query}"
+Subject: {title}{companies}
+
+Assess how the following news affects the subject above.
+
+News Articles:
+{news_text}
+
+Respond with a single JSON object and nothing else, using exactly these keys:
+{{
+  "impact": "超大" | "高" | "中" | "低",
+  "direction": "positive" | "negative" | "neutral" | "mixed",
+  "confidence": "高" | "中" | "低",
+  "articles": [
+    {{"date": "YYYY/MM/DD", "title": "original article title", "impact": "超大" | "高" | "中" | "低",
+      "score": integer from -2 (strongly negative) to 2 (strongly positive), "reason": "short reason in JAPANESE"}}
+  ],
+  "summary": "overall assessment in JAPANESE, 1-2 sentences"
+}}
+
+Important Notes:
+- "articles" lists only the articles that matter for the subject, most important first (at most 10)
+- Use the article dates and titles exactly as given
+- Write "reason" and "summary" in JAPANESE
+"""
+
+
+def _require(condition, message, errors):
+    if not condition:
+        errors.append(message)
+
+
+def validate(data):
+    """
+    分析結果のJSONをスキーマに照らして検証する
+
+    Args:
+        data: json.loads の結果
+
+    Returns:
+        dict: 検証済みの分析結果（余分なキーを除いたもの）
+
+    Raises:
+        SchemaError: スキーマに合わない場合（問題点をまとめて報告）
+    """
+    if not isinstance(data, dict):
+        raise SchemaError("JSONオブジェクトではありません")
+    errors = []
+    _require(data.get('impact') in IMPACT_LEVELS, f"impact が不正: {data.get('impact')!r}", errors)
+    _require(data.get('direction') in DIRECTIONS, f"direction が不正: {data.get('direction')!r}", errors)
+    _require(data.get('confidence') in CONFIDENCE_LEVELS, f"confidence が不正: {data.get('confidence')!r}", errors)
+    _require(isinstance(data.get('summary'), str), "summary が文字列ではありません", errors)
+    articles = data.get('articles')
+    _require(isinstance(articles, list), "articles がリストではありません", errors)
+
+    cleaned = []
+    low, high = ARTICLE_SCORE_RANGE
+    for i, article in enumerate(articles if isinstance(articles, list) else []):
+        if not isinstance(article, dict):
+            errors.append(f"articles[{i}] がオブジェクトではありません")
+            continue
+        score = article.get('score')
+        _require(isinstance(score, int) and not isinstance(score, bool) and low <= score <= high,
+                 f"articles[{i}].score が不正: {score!r}", errors)
+        _require(article.get('impact') in IMPACT_LEVELS, f"articles[{i}].impact が不正: {article.get('impact')!r}", errors)
+        for key in ('date', 'title', 'reason'):
+            _require(isinstance(article.get(key), str), f"articles[{i}].{key} が文字列ではありません", errors)
+        cleaned.append({key: article.get(key) for key in ('date', 'title', 'impact', 'score', 'reason')})
+
+    if errors:
+        raise SchemaError("; ".join(errors))
+    return {
+        'impact': data['impact'],
+        'direction': data['direction'],
+        'confidence': data['confidence'],
+        'articles': cleaned,
+        'summary': data['summary'],
+    }
+
+
+def parse_analysis(text):
+    """
+    LLMの応答から分析結果のJSONを取り出して検証する（コードブロックで囲まれていても可）
+
+    Returns:
+        dict: 検証済みの分析結果
+
+    Raises:
+        SchemaError: JSONとして読めない・スキーマに合わない
+    """
+    body = _CODE_FENCE.sub('', text.strip())
+    start, end = body.find('{'), body.rfind('}')
+    if start < 0 or end < start:
+        raise SchemaError("JSONが見つかりません")
+    try:
+        data = json.loads(body[start:end + 1])
+    except ValueError as e:
+        raise SchemaError(f"JSONとして読めません: {e}") from None
+    return validate(data)
+
+
+def dump_analysis(analysis):
+    """検証済みの分析結果を保存・キャッシュ用の文字列にする（キーの順序を固定）"""
+    return json.dumps(analysis, ensure_ascii=False, sort_keys=True)
+
+
+def query_score(analysis):
+    """
+    クエリ分析1件のスコア（-100〜+100）
+
+    全体の方向×影響度と、記事スコアの影響度による加重平均を半分ずつ合わせる。
+    """
+    headline = DIRECTIONS[analysis['direction']] * IMPACT_LEVELS[analysis['impact']] / max(IMPACT_LEVELS.values())
+    articles = analysis['articles']
+    if not articles:
+        return round(headline * 100, 1)
+    weights = [IMPACT_LEVELS[article['impact']] for article in articles]
+    article_mean = sum(w * article['score'] for w, article in zip(weights, articles)) / sum(weights)
+    return round((headline + article_mean / ARTICLE_SCORE_RANGE[1]) / 2 * 100, 1)
+
+
+def outlook(score):
+    """スコアの判定（強気/中立/弱気）"""
+    if score >= BULLISH_THRESHOLD:
+        return "強気"
+    if score <= -BULLISH_THRESHOLD:
+        return "弱気"
+    return "中立"
+
+
+def aggregate(categories):
+    """
+    カテゴリ・全体のスコアをLLMを使わずに計算する（同じ入力なら常に同じ結果）
+
+    カテゴリのスコアはクエリのスコアを記事数で加重平均し、全体のスコアはカテゴリのスコアを
+    カテゴリの重み（設定の weight、既定は1）で加重平均する。JSONとして読めない分析結果は除く。
+
+    Args:
+        categories (list): (カテゴリ名, 重み, 分析結果リスト) のリスト
+
+    Returns:
+        dict: {'score', 'outlook', 'categories': [{'title', 'weight', 'score', 'outlook', 'impact',
+              'queries', 'invalid', 'top_articles'}]}
+    """
+    summaries = []
+    for title, weight, results in categories:
+        scored = []
+        invalid = 0
+        for result in results:
+            try:
+                analysis = parse_analysis(result['analysis'])
+            except SchemaError:
+                invalid += 1
+                continue
+            scored.append((result, analysis, query_score(analysis)))
+        total_news = sum(max(1, result['news_count']) for result, _, _ in scored)
+        score = round(sum(max(1, result['news_count']) * s for result, _, s in scored) / total_news, 1) if scored else None
+        # 影響の大きい記事（影響度・スコアの絶対値の順、同じならクエリ・記事の順）
+        articles = [article for _, analysis, _ in scored for article in analysis['articles']]
+        top = sorted(articles, key=lambda a: (-IMPACT_LEVELS[a['impact']], -abs(a['score'])))[:5]
+        summaries.append({
+            'title': title,
+            'weight': weight,
+            'score': score,
+            'outlook': outlook(score) if score is not None else None,
+            'impact': max((analysis['impact'] for _, analysis, _ in scored), key=IMPACT_LEVELS.get, default=None),
+            'queries': [{'query': result['query'], 'score': s, 'direction': analysis['direction'],
+                         'impact': analysis['impact'], 'summary': analysis['summary']}
+                        for result, analysis, s in scored],
+            'invalid': invalid,
+            'top_articles': top,
+        })
+
+    weighted = [(summary['weight'], summary['score']) for summary in summaries if summary['score'] is not None]
+    total_weight = sum(weight for weight, _ in weighted)
+    score = round(sum(weight * s for weight, s in weighted) / total_weight, 1) if total_weight else None
+    return {'score': score, 'outlook': outlook(score) if score is not None else None, 'categories': summaries}
+
+
+def render_analysis(analysis, query):
+    """クエリ分析1件を表示用のテキストにする"""
+    direction = {'positive': "ポジティブ", 'negative': "ネガティブ", 'neutral': "中立", 'mixed': "混在"}
+    lines = [
+        f"【クエリ「{query}」の分析結果】",
+        f"影響度: {analysis['impact']} / 方向: {direction[analysis['direction']]} / "
+        f"確信度: {analysis['confidence']} / スコア: {query_score(analysis):+.1f}",
+    ]
+    for article in analysis['articles']:
+        lines.append(f"- {article['date']}: [{article['impact']}] [{article['score']:+d}] [{article['title']}]")
+        lines.append(f" → {article['reason']}")
+    lines.append(f"総合評価: {analysis['summary']}")
+    return "\n".join(lines)
+
+
+def render_summary(summary):
+    """aggregate の結果を表示用のテキストにする"""
+    lines = []
+    for category in summary['categories']:
+        if category['score'] is None:
+            lines.append(f"【{category['title']}】 分析結果なし")
+            continue
+        line = (f"【{category['title']}】 スコア {category['score']:+.1f}（{category['outlook']}） / "
+                f"最大影響度 {category['impact']} / {len(category['queries'])}クエリ")
+        if category['invalid']:
+            line += f"（JSONでない分析結果 {category['invalid']}件を除外）"
+        lines.append(line)
+        for query in category['queries']:
+            lines.append(f"  {query['query']}: {query['score']:+.1f} {query['summary']}")
+        for article in category['top_articles']:
+            lines.append(f"  - {article['date']}: [{article['impact']}] [{article['score']:+d}] {article['title']}")
+    if summary['score'] is not None:
+        lines.append(f"\n総合スコア: {summary['score']:+.1f}（{summary['outlook']}）")
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from token_budget import compact_analysis, estimate_tokens, fit_text
+
+# カテゴリ要約（map段階）の設定（環境変数で変更可能、0以下でカテゴリ要約なし）
+DIGEST_TOKENS = int(os.getenv("SUMMARY_DIGEST_TOKENS", "800"))             # カテゴリ要約1件のトークン数の上限
+DIGEST_INPUT_TOKENS = int(os.getenv("SUMMARY_DIGEST_INPUT_TOKENS", "6000"))  # 要約1回に渡す分析結果のトークン数
+DIGEST_WORKERS = 6          # 同時に実行するカテゴリ要約の数
+
+
+def create_digest_prompt(today, title, entries, digest_tokens):
+    """
+    カテゴリ内の分析結果を1件の要約にまとめるプロンプトを作成
+
+    Args:
+        today (str): 今日の日付
+        title (str): カテゴリ名（英語）
+        entries (list): (見出し, 分析結果) のリスト
+        digest_tokens (int): 要約のトークン数の目安
+
+    Returns:
+        str: プロンプト
+    """
+    analyses = "\n".join(f"【{heading}】\n{text}\n" for heading, text in entries)
+    return f"""
+Today's Date: {today}
+Category: "{title}"
+
+Condense the following {len(entries)} analysis results into a single digest that will be used for a final investment judgment.
+
+{analyses}
+Instructions:
+Create the digest in JAPANESE using this format:
+
+【{title} 要約】
+**影響度: 高/中/低**
+
+**主要なポジティブ要因:**
+- YYYY/MM/DD: [影響度] [要因] → [根拠]
+
+**主要なネガティブ要因:**
+- YYYY/MM/DD: [影響度] [要因] → [根拠]
+
+**総合評価:**
+[カテゴリ全体の評価を1-2文で]
+
+Important Notes:
+- Output everything in JAPANESE
+- Keep it under about {digest_tokens} tokens
+- Merge points repeated across analyses and keep dates, figures and price targets
+- Mention explicitly where the analyses disagree
+"""
+
+
+class CategoryDigester:
+    """
+    最終統合分析の前に、カテゴリごとの分析結果を並列に要約する（map-reduce のmap段階）
+
+    1回に渡す分析結果が DIGEST_INPUT_TOKENS を超えるカテゴリは分割して要約し、
+    要約が1件になるまで要約同士をまとめる。要約の上限以下のカテゴリはそのまま使う。
+    """
+    def __init__(self, digest_tokens=DIGEST_TOKENS, input_tokens=DIGEST_INPUT_TOKENS, workers=DIGEST_WORKERS):
+        self.digest_tokens = digest_tokens
+        self.input_tokens = max(input_tokens, digest_tokens * 2)  # 段ごとに件数が必ず減るようにする
+        self.workers = workers
+        self.records = []   # カテゴリごとの {'title', 'queries', 'before', 'after', 'calls', 'mode', 'error'}
+        self.elapsed = 0.0  # 要約にかかった合計時間（秒）
+        self._lock = threading.Lock()
+
+    def _chunks(self, entries):
+        """分析結果を DIGEST_INPUT_TOKENS 以内のまとまりに分ける（1件だけのまとまりは作らない）"""
+        chunks = []
+        chunk, used = [], 0
+        for heading, text in entries:
+            text = fit_text(text, self.input_tokens)
+            cost = estimate_tokens(text) + 1
+            if chunk and used + cost > self.input_tokens and len(chunk) > 1:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.append((heading, text))
+            used += cost
+        if len(chunk) == 1 and chunks:
+            chunks[-1].extend(chunk)
+        elif chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _condense(self, today, title, entries, complete):
+        prompt = create_digest_prompt(today, title, entries, self.digest_tokens)
+        text = complete(prompt, f"カテゴリ要約 {title}", self.digest_tokens * 2)
+        if not text:
+            raise ValueError("LLMの応答が空です")
+        return fit_text(text, self.digest_tokens)
+
+    def digest(self, today, categories, complete):
+        """
+        カテゴリごとの分析結果を要約する（全カテゴリの要約を並列に実行）
+
+        Args:
+            today (str): 今日の日付
+            categories (list): (カテゴリ名, 分析結果リスト) のリスト
+            complete (callable): (プロンプト, 記録用の名前, max_tokens) を受け取って応答本文を返す関数
+
+        Returns:
+            list: カテゴリごとの (見出し, 本文) のリスト。要約しなかった（または失敗した）カテゴリは
+                  クエリごとの分析結果をそのまま返す
+        """
+        start = time.perf_counter()
+        sections = []
+        records = []
+        pending = {}    # カテゴリの位置 -> 要約する (見出し, 分析結果)
+        for index, (title, results) in enumerate(categories):
+            sections.append([(result['query'], result['analysis']) for result in results])
+            entries = [(result['query'], compact_analysis(result['analysis'])) for result in results]
+            before = sum(estimate_tokens(text) for _, text in entries)
+            records.append({'title': title, 'queries': len(results), 'before': before, 'after': before,
+                            'calls': 0, 'mode': 'pass', 'error': None})
+            if self.digest_tokens > 0 and before > self.digest_tokens:
+                pending[index] = entries
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='digest') as pool:
+                # 段ごとに全カテゴリのまとまりを同時に要約し、2件以上残ったカテゴリは次の段でまとめる
+                while pending:
+                    futures = {
+                        index: [pool.submit(self._condense, today, categories[index][0], chunk, complete)
+                                for chunk in self._chunks(entries)]
+                        for index, entries in pending.items()
+                    }
+                    pending = {}
+                    for index, parts in futures.items():
+                        title = categories[index][0]
+                        record = records[index]
+                        record['calls'] += len(parts)
+                        try:
+                            digests = [future.result() for future in parts]
+                        except Exception as e:
+                            record['mode'] = 'failed'
+                            record['error'] = str(e)
+                            continue
+                        if len(digests) == 1:
+                            sections[index] = [(f"{title} 要約", digests[0])]
+                            record['mode'] = 'digest'
+                            record['after'] = estimate_tokens(digests[0])
+                        else:
+                            pending[index] = [(f"{title} 要約 {part}/{len(digests)}", text)
+                                              for part, text in enumerate(digests, 1)]
+
+        with self._lock:
+            self.records.extend(records)
+            self.elapsed += time.perf_counter() - start
+        return sections
+
+    def print_stats(self):
+        """カテゴリごとの要約前後のトークン数を表示"""
+        print("\n=== カテゴリ要約（最終統合分析のmap段階） ===")
+        if self.digest_tokens <= 0:
+            print("カテゴリ要約なし（--digest-tokens 0）")
+            return
+        if not self.records:
+            print("記録なし")
+            return
+        modes = {'digest': "要約", 'pass': "そのまま使用", 'failed': "要約失敗"}
+        for record in self.records:
+            print(f"{record['title']}: {record['queries']}件 {record['before']} → {record['after']}トークン "
+                  f"({modes[record['mode']]}、LLM呼び出し {record['calls']}回)")
+        print(f"要約時間: {self.elapsed:.1f}秒")
+
+
+def add_digest_arguments(parser):
+    """カテゴリ要約のコマンドライン引数を追加"""
+    parser.add_argument('--digest-tokens', type=int, default=DIGEST_TOKENS,
+                        help="最終統合分析の前にカテゴリごとの分析結果をこのトークン数以内に要約（0で要約なし）")
+
+
+def from_args(args):
+    """コマンドライン引数からカテゴリ要約を作成"""
+    return CategoryDigester(digest_tokens=args.digest_tokens)
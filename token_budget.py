@@ -0,0 +1,223 @@
+import os
+import re
+import threading
+
+import news_dedup
+
+# トークン予算（環境変数で変更可能、0以下は無制限）
+NEWS_TOKEN_BUDGET = int(os.getenv("NEWS_TOKEN_BUDGET", "2500"))        # クエリ分析のニュース部分
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000"))  # 最終統合分析の分析結果部分
+MAX_SNIPPET_CHARS = 300     # スニペットの最大文字数
+MIN_ANALYSIS_TOKENS = 120   # 予算が足りなくても各分析結果に残すトークン数
+
+_CJK_PATTERN = re.compile(r'[　-ヿ㐀-䶿一-鿿＀-￯]')
+_SPACES = re.compile(r'[ \t ]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+
+def estimate_tokens(text):
+    """
+    プロンプトのトークン数の概算
+
+    日本語・中国語は1文字1トークン、それ以外は約4文字1トークンとして数える。
+
+    Args:
+        text (str): 対象テキスト
+
+    Returns:
+        int: 推定トークン数
+    """
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def _truncate(text, max_chars):
+    """文・単語の区切りで max_chars 以内に切り詰める"""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    cut = max(head.rfind('. '), head.rfind('。'))
+    if cut < max_chars // 2:
+        cut = head.rfind(' ')
+    if cut < max_chars // 2:
+        cut = max_chars
+    return head[:cut + 1].rstrip() + "…"
+
+
+def compact_item(item):
+    """
+    記事の定型部分を圧縮する（末尾の「 - 媒体名」・余分な空白・長いスニペット）
+
+    Args:
+        item (dict): search_google_news_single の記事
+
+    Returns:
+        dict: 圧縮した記事（元の辞書は変更しない）
+    """
+    title = _SPACES.sub(' ', item.get('title') or '').strip()
+    source = item.get('source') or ''
+    # Google Newsのタイトルは末尾に媒体名が付くことが多く、Source行と重複する
+    for separator in (' - ', ' | ', ' – ', ' — '):
+        suffix = separator + source
+        if source and title.endswith(suffix):
+            title = title[:-len(suffix)].rstrip()
+            break
+    snippet = _SPACES.sub(' ', item.get('snippet') or '').strip()
+    if snippet.endswith('...'):
+        snippet = snippet[:-3].rstrip()
+    # タイトルと同じ内容のスニペットは送らない
+    if news_dedup.normalize_title(snippet) == news_dedup.normalize_title(title):
+        snippet = ''
+    return dict(item, title=title, snippet=_truncate(snippet, MAX_SNIPPET_CHARS))
+
+
+def _rank_key(indexed_item):
+    # 参照のみの記事を最後に、日付の新しい順、同じ日付は関連度（relevance.py）・検索結果の順
+    index, item = indexed_item
+    date = item.get('date') or ''
+    return (not item.get('shared_with'), '' if date == 'Unknown' else date, item.get('relevance', 0.0), -index)
+
+
+def compact_analysis(text):
+    """分析結果の定型部分（太字記号・連続する空行・行末の空白）を圧縮する"""
+    text = text.replace('**', '')
+    text = "\n".join(line.rstrip() for line in text.splitlines())
+    return _BLANK_LINES.sub('\n', text).strip()
+
+
+def _trim_lines(text, budget):
+    """先頭から行単位で予算内に収める（影響度・総合評価等の見出しを優先して残す）"""
+    lines = text.splitlines()
+    if estimate_tokens(text) <= budget:
+        return text
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept + ["（以下省略）"])
+
+
+def fit_text(text, budget):
+    """分析結果1件を圧縮し、予算を超える場合は行単位で切り詰める"""
+    return _trim_lines(compact_analysis(text), budget)
+
+
+class TokenBudget:
+    """プロンプトのトークン数を見積もり、予算に収まるように記事・分析結果を圧縮・選別する"""
+    def __init__(self, news_budget=NEWS_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+        self.news_budget = news_budget
+        self.summary_budget = summary_budget
+        # 呼び出しごとの {'label', 'before', 'after', 'section', 'kept', 'total'}
+        # before/after はプロンプト全体（render がなければ予算の対象部分のみ）、section は予算の対象部分の圧縮後
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, label, before, after, section, kept, total):
+        with self._lock:
+            self.records.append({'label': label, 'before': before, 'after': after, 'section': section,
+                                 'kept': kept, 'total': total})
+
+    def fit_news(self, label, news_data, render=None):
+        """
+        ニュース一覧を圧縮し、予算を超える場合は優先度の低い記事から除く
+
+        参照のみの記事・日付の古い記事・関連度や検索順位の低い記事の順に除き、残した記事は元の順序で返す。
+        予算はニュース部分に適用し、render を渡すとプロンプト全体の圧縮前後のトークン数を記録する。
+
+        Args:
+            label (str): 記録用の名前（クエリ）
+            news_data (list): 記事リスト
+            render (callable): ニュース一覧のテキストからプロンプト全体を作成する関数
+
+        Returns:
+            list: 予算内に収めた記事リスト
+        """
+        render = render or (lambda text: text)
+        before = estimate_tokens(render(news_dedup.format_news_text(news_data)))
+        compacted = [compact_item(item) for item in news_data]
+        section = estimate_tokens(news_dedup.format_news_text(compacted))
+
+        if self.news_budget > 0 and section > self.news_budget:
+            kept_indices = set()
+            used = 0
+            for index, item in sorted(enumerate(compacted), key=_rank_key, reverse=True):
+                cost = estimate_tokens(news_dedup.format_news_text([item])) + 1
+                if used + cost > self.news_budget and kept_indices:
+                    continue
+                kept_indices.add(index)
+                used += cost
+            compacted = [item for index, item in enumerate(compacted) if index in kept_indices]
+            section = estimate_tokens(news_dedup.format_news_text(compacted))
+
+        after = estimate_tokens(render(news_dedup.format_news_text(compacted)))
+        self.record(label, before, after, section, len(compacted), len(news_data))
+        return compacted
+
+    def fit_analyses(self, label, texts, render=None):
+        """
+        最終統合分析に渡す分析結果を圧縮し、予算を超える場合は各分析結果を均等に切り詰める
+
+        短い分析結果はそのまま残し、余った予算を長い分析結果に割り振る。
+        予算は分析結果の部分に適用し、render を渡すとプロンプト全体の圧縮前後のトークン数を記録する。
+
+        Args:
+            label (str): 記録用の名前
+            texts (list): 分析結果のテキスト
+            render (callable): 分析結果のテキストのリストからプロンプト全体を作成する関数
+
+        Returns:
+            list: 予算内に収めたテキスト（同じ順序）
+        """
+        render = render or (lambda items: "\n".join(items))
+        before = estimate_tokens(render(texts))
+        compacted = [compact_analysis(text) for text in texts]
+        costs = [estimate_tokens(text) for text in compacted]
+
+        if self.summary_budget > 0 and sum(costs) > self.summary_budget:
+            # 短いものから順に必要な分だけ割り当て、残りを長いものに均等に割り振る
+            remaining = self.summary_budget
+            allowances = [0] * len(compacted)
+            order = sorted(range(len(compacted)), key=lambda i: costs[i])
+            for position, index in enumerate(order):
+                share = max(MIN_ANALYSIS_TOKENS, remaining // (len(order) - position))
+                allowances[index] = min(costs[index], share)
+                remaining = max(0, remaining - allowances[index])
+            compacted = [_trim_lines(text, allowance) for text, allowance in zip(compacted, allowances)]
+
+        section = sum(estimate_tokens(text) for text in compacted)
+        after = estimate_tokens(render(compacted))
+        trimmed = sum(1 for text in compacted if text.endswith("（以下省略）"))
+        self.record(label, before, after, section, len(texts) - trimmed, len(texts))
+        return compacted
+
+    def print_stats(self):
+        """呼び出しごとのプロンプトの圧縮前後のトークン数を表示"""
+        print("\n=== プロンプトのトークン予算 ===")
+        print(f"予算: ニュース {self.news_budget or '無制限'} / 最終統合分析 {self.summary_budget or '無制限'}")
+        if not self.records:
+            print("記録なし")
+            return
+        for record in self.records:
+            print(f"{record['label']}: {record['before']} → {record['after']}トークン "
+                  f"({record['kept']}/{record['total']}件をそのまま使用)")
+        before = sum(r['before'] for r in self.records)
+        after = sum(r['after'] for r in self.records)
+        rate = (before - after) / before * 100 if before else 0.0
+        print(f"合計: {before} → {after}トークン ({rate:.1f}%削減)")
+
+
+def add_budget_arguments(parser):
+    """トークン予算のコマンドライン引数を追加"""
+    parser.add_argument('--token-budget', type=int, default=NEWS_TOKEN_BUDGET,
+                        help="クエリ分析のニュース部分のトークン予算（0で無制限）")
+    parser.add_argument('--summary-token-budget', type=int, default=SUMMARY_TOKEN_BUDGET,
+                        help="最終統合分析に渡す分析結果のトークン予算（0で無制限）")
+
+
+def from_args(args):
+    """コマンドライン引数からトークン予算を作成"""
+    return TokenBudget(news_budget=args.token_budget, summary_budget=args.summary_token_budget)
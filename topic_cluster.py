@@ -0,0 +1,183 @@
+import math
+import os
+import threading
+import time
+
+from relevance import tokenize
+
+# トピック分割の設定（環境変数で変更可能）
+CLUSTER_SIMILARITY = float(os.getenv("TOPIC_CLUSTER_SIMILARITY", "0.2"))   # これ以上似たトピックをまとめる
+MAX_CLUSTERS = int(os.getenv("TOPIC_MAX_CLUSTERS", "2"))                   # カテゴリあたりのトピック数の上限
+SNIPPET_WEIGHT = 0.5        # スニペットの語の重み（タイトルの語を1とする）
+MAX_LABEL_CHARS = 90        # トピック名（代表記事のタイトル）の最大文字数
+
+
+def _vectors(items):
+    """タイトル・スニペットのTF-IDFベクトル（L2正規化済みの 語 -> 重み）"""
+    counts = []
+    for item in items:
+        weights = {}
+        for term in tokenize(item.get('title')):
+            weights[term] = weights.get(term, 0.0) + 1.0
+        for term in tokenize(item.get('snippet')):
+            weights[term] = weights.get(term, 0.0) + SNIPPET_WEIGHT
+        counts.append(weights)
+
+    document_frequency = {}
+    for weights in counts:
+        for term in weights:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    total = len(items)
+    vectors = []
+    for weights in counts:
+        vector = {term: tf * math.log(1 + total / document_frequency[term]) for term, tf in weights.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        vectors.append({term: value / norm for term, value in vector.items()})
+    return vectors
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(term, 0.0) for term, value in a.items())
+
+
+def cluster_items(items, similarity=CLUSTER_SIMILARITY, max_clusters=MAX_CLUSTERS):
+    """
+    記事を凝集型クラスタリング（平均連結法）でトピックに分ける
+
+    平均類似度が similarity 以上の組を順にまとめ、それでも max_clusters を超える場合は
+    上限に収まるまで最も似た組をまとめ続ける。同じ入力なら常に同じ結果になる。
+
+    Args:
+        items (list): 記事のリスト
+        similarity (float): まとめる平均コサイン類似度の下限
+        max_clusters (int): トピック数の上限（0以下で上限なし）
+
+    Returns:
+        list: トピックごとの記事番号のリスト（記事数の多い順、同数なら最初の記事の順）
+    """
+    if not items:
+        return []
+    vectors = _vectors(items)
+    clusters = {i: [i] for i in range(len(items))}
+    # クラスタ間の類似度の合計（平均連結法: 合計 / (件数 × 件数)）
+    totals = {}
+    for i in range(len(items)):
+        for j in range(i + 1, len(items)):
+            totals[(i, j)] = _cosine(vectors[i], vectors[j])
+
+    def average(pair):
+        a, b = pair
+        return totals[pair] / (len(clusters[a]) * len(clusters[b]))
+
+    while len(clusters) > 1:
+        # 最も似た組（同じ類似度なら番号の小さい組）
+        pair = max(totals, key=lambda p: (average(p), -p[0], -p[1]))
+        within_cap = max_clusters <= 0 or len(clusters) <= max_clusters
+        if average(pair) < similarity and within_cap:
+            break
+        keep, merged = pair
+        for other in clusters:
+            if other in pair:
+                continue
+            key_keep = (min(keep, other), max(keep, other))
+            key_merged = (min(merged, other), max(merged, other))
+            totals[key_keep] += totals.pop(key_merged)
+        del totals[pair]
+        clusters[keep].extend(clusters.pop(merged))
+
+    return sorted((sorted(members) for members in clusters.values()), key=lambda members: (-len(members), members[0]))
+
+
+def _medoid(members, vectors):
+    # トピック内の他の記事との類似度の合計が最も大きい記事
+    return max(members, key=lambda i: (sum(_cosine(vectors[i], vectors[j]) for j in members), -i))
+
+
+class TopicClusterer:
+    """
+    カテゴリ内の全クエリの記事をトピックにまとめ、クエリごとではなくトピックごとにLLM分析させる
+
+    カテゴリごとのクエリ数・トピック数を記録し、削減したLLM呼び出し数を表示する。
+    """
+    def __init__(self, similarity=CLUSTER_SIMILARITY, max_clusters=MAX_CLUSTERS):
+        self.similarity = similarity
+        self.max_clusters = max_clusters
+        self.records = []   # カテゴリごとの {'title', 'queries', 'total_queries', 'articles', 'clusters', 'elapsed'}
+        self._lock = threading.Lock()
+
+    def cluster(self, title, queries, articles):
+        """
+        カテゴリの記事をトピックに分ける
+
+        トピック数は max_clusters と記事があったクエリ数の小さい方を上限とし、
+        クエリごとの分析よりLLM呼び出しが増えないようにする。
+
+        Args:
+            title (str): カテゴリ名（記録用）
+            queries (list): 記事を取得したクエリ（記事があったクエリ数を記録する）
+            articles (list): (クエリ, 記事) のリスト（重複除去済み、クエリ順）
+
+        Returns:
+            list: トピックごとの {'label', 'queries', 'items'}（label は代表記事のタイトル）
+        """
+        start = time.perf_counter()
+        items = [item for _, item in articles]
+        answered = len({query for query, _ in articles})
+        cap = min(self.max_clusters, answered) if self.max_clusters > 0 else answered
+        groups = cluster_items(items, similarity=self.similarity, max_clusters=cap)
+        vectors = _vectors(items) if groups else []
+
+        topics = []
+        labels = set()
+        for members in groups:
+            label = (items[_medoid(members, vectors)].get('title') or '').strip()[:MAX_LABEL_CHARS]
+            if label in labels:
+                label = f"{label} ({len(topics) + 1})"
+            labels.add(label)
+            source_queries = []
+            for i in members:
+                if articles[i][0] not in source_queries:
+                    source_queries.append(articles[i][0])
+            topics.append({'label': label, 'queries': source_queries, 'items': [items[i] for i in members]})
+
+        with self._lock:
+            self.records.append({
+                'title': title,
+                'queries': answered,
+                'total_queries': len(queries),
+                'articles': len(items),
+                'clusters': len(topics),
+                'elapsed': time.perf_counter() - start,
+            })
+        return topics
+
+    def print_stats(self):
+        """カテゴリごとのトピック数と、クエリごとの分析と比べて削減したLLM呼び出し数を表示"""
+        print("\n=== トピック分割 ===")
+        if not self.records:
+            print("記録なし")
+            return
+        for record in self.records:
+            print(f"{record['title']}: {record['queries']}/{record['total_queries']}クエリ・{record['articles']}記事 → "
+                  f"{record['clusters']}トピック（{record['elapsed'] * 1000:.0f}ms）")
+        per_query = sum(record['queries'] for record in self.records)
+        per_topic = sum(record['clusters'] for record in self.records)
+        print(f"クエリ分析のLLM呼び出し: クエリごと {per_query}回 → トピックごと {per_topic}回"
+              f"（{per_query - per_topic}回削減）")
+
+
+def add_topic_arguments(parser):
+    """トピック分割のコマンドライン引数を追加"""
+    parser.add_argument('--topics', action='store_true',
+                        help="カテゴリ内の記事をトピックにまとめ、クエリごとではなくトピックごとにLLM分析")
+    parser.add_argument('--max-topics', type=int, default=MAX_CLUSTERS,
+                        help="カテゴリあたりのトピック数の上限（0で上限なし）")
+
+
+def from_args(args):
+    """コマンドライン引数からトピック分割を作成（--topics がなければNone）"""
+    if not args.topics:
+        return None
+    return TopicClusterer(max_clusters=args.max_topics)
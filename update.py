@@ -1,17 +1,43 @@
 import requests
-from bs4 import BeautifulSoup
 import csv
 from datetime import datetime
 import re
 import os
-import sys
+import argparse
+import http_client
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fund_parser import parse_history_table, extract_table_region
+from http_cache import ResponseCache, content_hash
+from fund_store import open_default_store, CSV_HEADER
 
-def load_existing_data(csv_file):
+# テーブル解析バックエンド（'fast' または 'bs4'）
+PARSER_BACKEND = os.getenv("FUND_PARSER_BACKEND", "fast")
+
+# 取得先（スタンドインサーバー等に向ける場合は環境変数で上書き）
+YAHOO_BASE_URL = os.getenv("YAHOO_BASE_URL", "https://finance.yahoo.co.jp").rstrip('/')
+
+# HTTPヘッダー（User-Agent等の共通ヘッダーは http_client で付与）
+REQUEST_HEADERS = {
+    'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
+}
+
+# バックフィル設定
+BACKFILL_MAX_PAGES = 100  # 遡る最大ページ数
+BACKFILL_WORKERS = 4      # 同時取得ページ数の上限
+
+# 時系列ストア（環境変数FUND_DB設定時のみ。未設定ならCSVファイルを使用）
+FUND_STORE = open_default_store()
+
+# レスポンスキャッシュ（TTL内は再取得せず、期限切れ後は条件付きリクエストで再検証）
+RESPONSE_CACHE = ResponseCache()
+
+def load_existing_data(csv_file, verbose=True):
     """
     既存のCSVファイルからデータを読み込む
     
     Args:
         csv_file (str): CSVファイルのパス
+        verbose (bool): 読み込み結果を表示するか
         
     Returns:
         dict: 日付をキーとした既存データの辞書
@@ -32,14 +58,133 @@ def load_existing_data(csv_file):
                         existing_dates.add(date_str)
                         existing_data.append(row)
                         
-            print(f"既存データを読み込みました: {len(existing_data)}件")
+            if verbose:
+                print(f"既存データを読み込みました: {len(existing_data)}件")
         except Exception as e:
             print(f"既存ファイル読み込みエラー: {e}")
-    else:
+    elif verbose:
         print("新しいCSVファイルを作成します")
     
     return existing_dates, existing_data
 
+def convert_cell_row(cell_texts):
+    """
+    時系列テーブルの1行をCSVの行形式に変換する
+    
+    Args:
+        cell_texts (list): セル文字列のリスト
+        
+    Returns:
+        list: [年月日, 基準価額, 前日比, 純資産総額]（日付行でない場合はNone）
+    """
+    if len(cell_texts) < 4:
+        return None
+    
+    # 日付の形式を確認
+    date_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', cell_texts[0])
+    if not date_match:
+        return None
+    
+    # 日付を変換
+    year, month, day = date_match.groups()
+    formatted_date = f"{year}/{month:0>2}/{day:0>2}"
+    
+    # 数値データをクリーンアップ
+    base_price = cell_texts[1].replace(',', '').replace('+', '')
+    daily_change = cell_texts[2].replace(',', '')
+    # +記号の処理（前日比）
+    if daily_change.startswith('+'):
+        daily_change = daily_change[1:]
+    net_assets = cell_texts[3].replace(',', '').replace('+', '')
+    
+    return [formatted_date, base_price, daily_change, net_assets]
+
+def write_csv(csv_file, all_data):
+    """
+    日付順に並んだ全データをCSVに書き込む
+    
+    Args:
+        csv_file (str): CSVファイルのパス
+        all_data (list): 全データの行リスト
+    """
+    with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        
+        # ヘッダーを書き込み
+        writer.writerow(CSV_HEADER)
+        
+        # データを書き込み
+        for row in all_data:
+            writer.writerow(row)
+
+def merge_and_save(csv_file, existing_data, new_data_rows):
+    """
+    既存データと新規データをマージし、日付順にソートしてCSVに保存する
+    
+    Args:
+        csv_file (str): CSVファイルのパス
+        existing_data (list): 既存データの行リスト
+        new_data_rows (list): 新規データの行リスト
+        
+    Returns:
+        list: 保存した全データの行リスト
+    """
+    all_data = existing_data + new_data_rows
+    
+    # 日付で昇順にソート
+    all_data.sort(key=lambda x: datetime.strptime(x[0], '%Y/%m/%d'))
+    
+    # CSVファイルに保存
+    write_csv(csv_file, all_data)
+    
+    return all_data
+
+def load_fund_data(fund_id):
+    """
+    既存データを読み込む（FUND_DB設定時はストア、それ以外はCSV）
+    
+    Args:
+        fund_id (str): 投資信託のID
+        
+    Returns:
+        set: 既存データの日付の集合
+        list: 全てのデータ行のリスト（ストア使用時はNone。マージはストア側で行う）
+    """
+    if FUND_STORE is None:
+        return load_existing_data(f"{fund_id}_.csv")
+    
+    existing_dates = FUND_STORE.existing_dates(fund_id)
+    print(f"既存データを読み込みました: {len(existing_dates)}件 (DB: {FUND_STORE.db_path})")
+    return existing_dates, None
+
+def save_fund_data(fund_id, existing_data, new_data_rows):
+    """
+    新規データを保存する（FUND_DB設定時はストアへ一括upsert、それ以外はCSVをマージして書き直し）
+    
+    Args:
+        fund_id (str): 投資信託のID
+        existing_data (list): 既存データの行リスト（CSV使用時のみ）
+        new_data_rows (list): 新規データの行リスト
+        
+    Returns:
+        int: 保存後の総データ数
+    """
+    if FUND_STORE is None:
+        csv_file = f"{fund_id}_.csv"
+        all_data = merge_and_save(csv_file, existing_data, new_data_rows)
+        print(f"CSVファイルを更新しました: {csv_file}")
+        return len(all_data)
+    
+    FUND_STORE.upsert_rows(fund_id, new_data_rows)
+    print(f"DBを更新しました: {FUND_STORE.db_path}")
+    return FUND_STORE.count_rows(fund_id)
+
+def has_fund_data(fund_id):
+    """保存済みのデータがあるか"""
+    if FUND_STORE is None:
+        return os.path.exists(f"{fund_id}_.csv")
+    return FUND_STORE.count_rows(fund_id) > 0
+
 def scrape_fund_data(fund_id):
     """
     Yahoo Finance Japanから投資信託のデータを取得し、既存CSVに追加する
@@ -49,126 +194,72 @@ def scrape_fund_data(fund_id):
     """
     
     # URLとファイル名を生成
-    url = f"https://finance.yahoo.co.jp/quote/{fund_id}/history"
+    url = f"{YAHOO_BASE_URL}/quote/{fund_id}/history"
     csv_file = f"{fund_id}_.csv"
     
     print(f"投資信託ID: {fund_id}")
     print(f"URL: {url}")
-    print(f"CSVファイル: {csv_file}")
-    
-    # 既存データを読み込み
-    existing_dates, existing_data = load_existing_data(csv_file)
-    
-    # HTTPヘッダーを設定
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-    }
+    if FUND_STORE is None:
+        print(f"CSVファイル: {csv_file}")
+    else:
+        print(f"DB: {FUND_STORE.db_path}")
     
     try:
         # ページを取得
         print("ページを取得中...")
-        response = requests.get(url, headers=headers)
-        response.encoding = 'utf-8'
+        response = RESPONSE_CACHE.fetch(url, headers=REQUEST_HEADERS)
         
         if response.status_code != 200:
             print(f"エラー: HTTPステータス {response.status_code}")
             return
         
-        # BeautifulSoupでHTMLを解析
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # テーブルを探す
-        table = None
-        selectors = [
-            'table',
-            '.historyTable',
-            '#historicalDataTable',
-            '[data-test="historical-prices"]',
-            'table[class*="history"]',
-            'table[class*="data"]'
-        ]
-        
-        for selector in selectors:
-            table = soup.select_one(selector)
-            if table:
-                print(f"テーブルが見つかりました: {selector}")
-                break
+        if response.cache_status != 'miss':
+            print(f"キャッシュを使用: {response.cache_status}")
+        
+        # テーブル内容が前回処理時と同じなら解析とマージを省略
+        table_region = extract_table_region(response.content)
+        table_hash = content_hash(table_region) if table_region else None
+        if table_hash and table_hash == response.table_hash and has_fund_data(fund_id):
+            RESPONSE_CACHE.mark_table_unchanged()
+            print("テーブルに変更がないため解析とマージをスキップします")
+            return
+        
+        # 既存データを読み込み
+        existing_dates, existing_data = load_fund_data(fund_id)
         
-        if not table:
-            # より広範囲に探す
-            tables = soup.find_all('table')
-            if tables:
-                table = tables[0]
-                print(f"最初のテーブルを使用: {len(tables)}個のテーブルが見つかりました")
-            else:
-                print("テーブル要素が見つかりません")
-                return
+        # 時系列テーブルを解析
+        cell_rows, used_backend = parse_history_table(response.content, backend=PARSER_BACKEND)
+        if cell_rows is None:
+            print("テーブル要素が見つかりません")
+            return
+        print(f"テーブルを解析しました: {len(cell_rows)}行 (パーサー: {used_backend})")
         
         # 新しいデータを抽出
         new_data_rows = []
-        rows = table.find_all('tr')
         
-        for row in rows:
-            cells = row.find_all(['td', 'th'])
-            if len(cells) >= 4:
-                cell_texts = [cell.get_text(strip=True) for cell in cells]
-                date_text = cell_texts[0]
-                
-                # 日付の形式を確認
-                if re.search(r'\d{4}年\d{1,2}月\d{1,2}日', date_text):
-                    try:
-                        # 日付を変換
-                        date_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', date_text)
-                        if date_match:
-                            year, month, day = date_match.groups()
-                            formatted_date = f"{year}/{month:0>2}/{day:0>2}"
-                            
-                            # 既存データに存在するかチェック
-                            if formatted_date in existing_dates:
-                                print(f"スキップ（既存）: {formatted_date}")
-                                continue
-                            
-                            # 数値データをクリーンアップ
-                            base_price = cell_texts[1].replace(',', '').replace('+', '')
-                            daily_change = cell_texts[2].replace(',', '')
-                            # +記号の処理（前日比）
-                            if daily_change.startswith('+'):
-                                daily_change = daily_change[1:]
-                            net_assets = cell_texts[3].replace(',', '').replace('+', '')
-                            
-                            new_data_rows.append([formatted_date, base_price, daily_change, net_assets])
-                            print(f"新規データ: {formatted_date}")
-                            
-                    except (ValueError, IndexError) as e:
-                        print(f"データ解析エラー: {cell_texts} - {e}")
-                        continue
+        for cell_texts in cell_rows:
+            try:
+                data_row = convert_cell_row(cell_texts)
+            except (ValueError, IndexError) as e:
+                print(f"データ解析エラー: {cell_texts} - {e}")
+                continue
+            if data_row is None:
+                continue
+            
+            # 既存データに存在するかチェック
+            if data_row[0] in existing_dates:
+                print(f"スキップ（既存）: {data_row[0]}")
+                continue
+            
+            new_data_rows.append(data_row)
+            print(f"新規データ: {data_row[0]}")
         
         print(f"新規データ: {len(new_data_rows)}件")
         
         if new_data_rows:
-            # 既存データと新規データをマージ
-            all_data = existing_data + new_data_rows
-            
-            # 日付で昇順にソート
-            all_data.sort(key=lambda x: datetime.strptime(x[0], '%Y/%m/%d'))
-            
-            # CSVファイルに保存
-            with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # ヘッダーを書き込み
-                writer.writerow(['年月日', '基準価額（円）', '前日比（円）', '純資産総額（百万円）'])
-                
-                # データを書き込み
-                for row in all_data:
-                    writer.writerow(row)
-            
-            print(f"CSVファイルを更新しました: {csv_file}")
-            print(f"総データ数: {len(all_data)}件")
+            # 既存データと新規データをマージして保存
+            total_count = save_fund_data(fund_id, existing_data, new_data_rows)
+            print(f"総データ数: {total_count}件")
             
             # 新規追加されたデータを表示
             print(f"\n新規追加データ ({len(new_data_rows)}件):")
@@ -176,12 +267,152 @@ def scrape_fund_data(fund_id):
                 print(f'"{row[0]}","{row[1]}","{row[2]}","{row[3]}"')
         else:
             print("新規データはありませんでした")
+        
+        # 処理済みテーブルとして記録
+        if table_hash:
+            RESPONSE_CACHE.set_table_hash(url, table_hash)
             
     except requests.RequestException as e:
         print(f"リクエストエラー: {e}")
     except Exception as e:
         print(f"予期しないエラー: {e}")
 
+def fetch_history_page(fund_id, page, timeout=30):
+    """
+    時系列ページを1ページ取得してCSV行形式に変換する
+    
+    Args:
+        fund_id (str): 投資信託のID
+        page (int): ページ番号（1始まり）
+        timeout (float): タイムアウト秒数
+        
+    Returns:
+        list: CSV行形式のデータ（ページが存在しない場合は空リスト）
+    """
+    url = f"{YAHOO_BASE_URL}/quote/{fund_id}/history"
+    params = {'page': page} if page > 1 else None
+    response = http_client.get(url, params=params, headers=REQUEST_HEADERS, timeout=timeout)
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    
+    cell_rows, _ = parse_history_table(response.content, backend=PARSER_BACKEND)
+    rows = []
+    for cell_texts in cell_rows or []:
+        try:
+            data_row = convert_cell_row(cell_texts)
+        except (ValueError, IndexError):
+            continue
+        if data_row is not None:
+            rows.append(data_row)
+    return rows
+
+def backfill_fund_data(fund_id, max_pages=BACKFILL_MAX_PAGES, max_workers=BACKFILL_WORKERS, until_date=None):
+    """
+    時系列のページ送りを遡って欠損期間をまとめて取得する
+    
+    最大max_workersページを並行して取得し、ページ順に処理する。既存データの日付
+    （until_date指定時はその日付以前）に到達した時点で停止し、取得した全データを
+    一度だけソートしてCSVに書き込む。
+    
+    途中のページの取得に失敗した場合・max_pagesまでに既存データに到達しなかった場合は
+    保存しない（途中まで保存すると、次回は1ページ目で既存データに到達して欠損期間が残るため）。
+    
+    Args:
+        fund_id (str): 投資信託のID
+        max_pages (int): 遡る最大ページ数
+        max_workers (int): 同時取得ページ数の上限
+        until_date (str): この日付（YYYY/MM/DD）まで遡る。Noneなら既存データに到達するまで
+        
+    Returns:
+        int: 追加した件数（保存しなかった場合は None）
+    """
+    print(f"投資信託ID: {fund_id}")
+    print(f"バックフィル: 最大{max_pages}ページ, 同時取得{max_workers}件")
+    
+    existing_dates, existing_data = load_fund_data(fund_id)
+    until = datetime.strptime(until_date, '%Y/%m/%d') if until_date else None
+    
+    def reached_known_data(rows):
+        if until is not None:
+            return any(datetime.strptime(row[0], '%Y/%m/%d') <= until for row in rows)
+        return any(row[0] in existing_dates for row in rows)
+    
+    collected = {}   # 日付 -> 行
+    results = {}     # ページ番号 -> 行リスト（エラー時はNone）
+    in_flight = {}
+    next_page = 1
+    next_to_process = 1
+    stop = False
+    complete = False  # 既存データ・指定日・最終ページまで途切れずに遡れたか
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while not stop:
+            # 上限まで先読みリクエストを投入
+            while next_page <= max_pages and len(in_flight) < max_workers:
+                in_flight[executor.submit(fetch_history_page, fund_id, next_page)] = next_page
+                next_page += 1
+            if not in_flight:
+                break
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = in_flight.pop(future)
+                try:
+                    results[page] = future.result()
+                except requests.RequestException as e:
+                    print(f"ページ{page}の取得エラー: {e}")
+                    results[page] = None
+            
+            # 取得済みのページをページ順に処理
+            while not stop and next_to_process in results:
+                page = next_to_process
+                rows = results.pop(page)
+                next_to_process += 1
+                
+                if rows is None:
+                    # 途中が欠けると連続性が保証できないためここで打ち切る（保存しない）
+                    stop = True
+                    break
+                if not rows:
+                    print(f"ページ{page}: データなし（最終ページ）")
+                    stop = complete = True
+                    break
+                
+                new_rows = [row for row in rows if row[0] not in existing_dates and row[0] not in collected]
+                if not new_rows and all(row[0] in collected for row in rows):
+                    # 最終ページ以降で同じページが返される場合
+                    print(f"ページ{page}: 前ページと重複（最終ページ）")
+                    stop = complete = True
+                    break
+                
+                for row in new_rows:
+                    collected[row[0]] = row
+                print(f"ページ{page}: {rows[0][0]} ～ {rows[-1][0]} 新規{len(new_rows)}件")
+                
+                if reached_known_data(rows):
+                    print("既存データに到達したため停止します")
+                    stop = complete = True
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    new_data_rows = list(collected.values())
+    print(f"新規データ: {len(new_data_rows)}件")
+    
+    # 既存データも指定日もなければ、max_pagesで打ち切っても欠損期間は残らない
+    if not complete and (existing_dates or until is not None):
+        print("既存データまで遡れなかったため保存しません（取得エラーの解消後、または --max-pages を増やして再実行してください）")
+        return None
+    
+    if new_data_rows:
+        total_count = save_fund_data(fund_id, existing_data, new_data_rows)
+        print(f"総データ数: {total_count}件")
+    else:
+        print("新規データはありませんでした")
+    
+    return len(new_data_rows)
+
 def scrape_multiple_funds(fund_ids):
     """
     複数の投資信託データを一度に取得する
@@ -195,6 +426,9 @@ def scrape_multiple_funds(fund_ids):
         print('='*50)
         scrape_fund_data(fund_id)
         print(f"投資信託 {fund_id} の処理完了")
+    
+    RESPONSE_CACHE.print_stats()
+    http_client.print_stats()
 
 def show_csv_summary(fund_id):
     """
@@ -205,15 +439,19 @@ def show_csv_summary(fund_id):
     """
     csv_file = f"{fund_id}_.csv"
     
-    if not os.path.exists(csv_file):
+    if FUND_STORE is None and not os.path.exists(csv_file):
         print(f"ファイルが見つかりません: {csv_file}")
         return
     
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader, None)
-            data = list(reader)
+        if FUND_STORE is not None:
+            csv_file = f"{FUND_STORE.db_path} [{fund_id}]"
+            data = FUND_STORE.read_rows(fund_id)
+        else:
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                data = list(reader)
         
         if not data:
             print("データがありません")
@@ -237,14 +475,32 @@ def show_csv_summary(fund_id):
 
 # 使用例
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yahoo!ファイナンスから投資信託の時系列データを取得してCSVを更新")
+    parser.add_argument('fund_id', help="投資信託ID（例: 04315213）")
+    parser.add_argument('--backfill', action='store_true', help="ページ送りを遡って欠損期間を取得")
+    parser.add_argument('--max-pages', type=int, default=BACKFILL_MAX_PAGES, help="バックフィルで遡る最大ページ数")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help="バックフィルの同時取得ページ数")
+    parser.add_argument('--until', help="バックフィルでこの日付(YYYY/MM/DD)まで遡る")
+    args = parser.parse_args()
+    
     # 投資信託ID
-    fund_id = sys.argv[1]
+    fund_id = args.fund_id
     
-    # データをスクレイピングしてCSVを更新
-    scrape_fund_data(fund_id)
+    failed = False
+    if args.backfill:
+        # 欠損期間をまとめて取得（途中で失敗した場合は保存せず終了コード1）
+        failed = backfill_fund_data(fund_id, max_pages=args.max_pages, max_workers=args.workers,
+                                    until_date=args.until) is None
+    else:
+        # データをスクレイピングしてCSVを更新
+        scrape_fund_data(fund_id)
     
     # 結果の要約を表示
     show_csv_summary(fund_id)
+    RESPONSE_CACHE.print_stats()
+    http_client.print_stats()
+    if failed:
+        raise SystemExit(1)
     
     # 複数の投資信託を処理する場合の例
     # fund_ids = ["04315213", "04315214", "04315215"]